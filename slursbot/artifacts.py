@@ -0,0 +1,131 @@
+# artifacts.py — content digests for report outputs, so unchanged artifacts are not rebuilt or re-posted
+# - An artifact's digest hashes the data it is built from (the rows a summary shows, the messages frame, ...)
+# - Digests (and the files they produced) persist in REPORTS_DIR/.artifacts.json between runs
+# - needs() is False only when the digest matches the last build and its outputs still exist; force=True
+#   (--force) rebuilds everything. summary() logs rebuilt vs skipped for the run
+from __future__ import annotations
+
+import os
+import re
+import json
+import hashlib
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("slursbot")
+
+# bump when a renderer's output changes for the same data, so old digests stop matching
+VERSION = "1"
+STATE_NAME = ".artifacts.json"
+
+
+def digest(*parts: Any) -> str:
+    """sha256 over parts (bytes, numpy arrays, or anything str()-able), with VERSION mixed in."""
+    h = hashlib.sha256(VERSION.encode())
+    for p in parts:
+        if isinstance(p, np.ndarray):
+            b = np.ascontiguousarray(p).tobytes()
+        elif isinstance(p, (bytes, bytearray)):
+            b = bytes(p)
+        else:
+            b = str(p).encode("utf-8")
+        h.update(len(b).to_bytes(8, "little"))
+        h.update(b)
+    return h.hexdigest()
+
+
+def row_hashes(df: pd.DataFrame, cols: Optional[Sequence[str]] = None) -> np.ndarray:
+    """One uint64 per row over cols (all columns by default); index ignored."""
+    cols = [c for c in (cols if cols is not None else df.columns) if c in df.columns]
+    return pd.util.hash_pandas_object(df[cols], index=False).to_numpy()
+
+
+def frame_digest(df: pd.DataFrame, cols: Optional[Sequence[str]] = None) -> str:
+    """digest of a frame's values (row order matters) and column names."""
+    cols = [c for c in (cols if cols is not None else df.columns) if c in df.columns]
+    return digest(",".join(map(str, cols)), row_hashes(df, cols))
+
+
+_GENERATED_RE = re.compile(rb"<div class='meta'>Generated [^<]*</div>")
+
+
+def html_digest(paths: Sequence[str]) -> str:
+    """digest of HTML files' bytes, ignoring the 'Generated <time>' line, so a re-render of the same data matches."""
+    parts = []
+    for p in paths:
+        with open(p, "rb") as f:
+            parts += [os.path.basename(p), _GENERATED_RE.sub(b"", f.read())]
+    return digest(*parts)
+
+
+class ArtifactState:
+    def __init__(self, out_dir: str, force: bool = False, label: str = "run", path: Optional[str] = None):
+        self.path = path or os.path.join(out_dir, STATE_NAME)
+        self.force = force
+        self.label = label
+        self.current: Dict[str, str] = {}
+        self.rebuilt: List[str] = []
+        self.skipped: List[str] = []
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._saved: Dict[str, Dict[str, Any]] = json.load(f)
+        except FileNotFoundError:
+            self._saved = {}
+        except Exception as e:
+            logger.warning("artifact state %s unreadable (%s); rebuilding everything", self.path, e)
+            self._saved = {}
+
+    def needs(self, name: str, dig: str, outputs: Iterable[str] = ()) -> bool:
+        """True if name must be (re)built: forced, digest changed, or one of its outputs is missing."""
+        self.current[name] = dig
+        prev = self._saved.get(name) or {}
+        outputs = list(outputs) or prev.get("outputs", [])
+        if not self.force and prev.get("digest") == dig and all(os.path.exists(p) for p in outputs):
+            self.skipped.append(name)
+            logger.debug("artifact %s unchanged (%s); skipped", name, dig[:12])
+            return False
+        return True
+
+    def done(self, name: str, outputs: Iterable[str] = ()) -> None:
+        """Record a successful build of name (with the digest needs() saw) and persist the state."""
+        self._saved[name] = {"digest": self.current[name], "outputs": list(outputs),
+                             "built_utc": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")}
+        self.rebuilt.append(name)
+        self._save()
+
+    def digest_of(self, name: str) -> Optional[str]:
+        """Digest name was checked against this run (None if not checked)."""
+        return self.current.get(name)
+
+    def _save(self) -> None:
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._saved, f, indent=1, sort_keys=True)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning("artifact state not saved (%s): %s", self.path, e)
+
+    def summary(self) -> None:
+        logger.info("%s artifacts: rebuilt=%d [%s] skipped=%d [%s]%s", self.label,
+                    len(self.rebuilt), ", ".join(self.rebuilt), len(self.skipped), ", ".join(self.skipped),
+                    " (forced)" if self.force else "")
+
+
+def needs(state: Optional[ArtifactState], name: str, dig, outputs: Iterable[str] = ()) -> bool:
+    """state.needs(...), or True without a state. dig may be a callable, only evaluated with a state."""
+    if state is None:
+        return True
+    return state.needs(name, dig() if callable(dig) else dig, outputs)
+
+
+def done(state: Optional[ArtifactState], name: str, outputs: Iterable[str] = ()) -> None:
+    if state is not None:
+        state.done(name, outputs)
+
+
+__all__ = ["ArtifactState", "digest", "row_hashes", "frame_digest", "html_digest", "needs", "done", "VERSION"]
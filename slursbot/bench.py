@@ -0,0 +1,672 @@
+# bench.py — offline micro-benchmarks for slursbot hot paths (no network; only `counts` needs a DB)
+#   python bench.py matcher [--messages 1000000] [--extra-terms 0]
+#   python bench.py paging  [--messages 12000] [--offset-cost-us 20] [--insert-every 0]
+#   python bench.py ingest  [--players 200] [--workers 4] [--latency-ms 50] [--error-rate 0.02] ...
+#   python bench.py counts  [--rows 5000000] [--extra-days 14,90,365]   (SQL Server; builds #temp tables)
+#   python bench.py html    [--rows 6000,60000,600000]
+#   python bench.py excel   [--players 6000] [--messages 50000] [--memory]
+# Each subcommand times the current implementation against a frozen copy of the code it replaced,
+# checks they agree, and prints one line per variant.
+from __future__ import annotations
+
+import os
+import re
+import sys
+import time
+import random
+import argparse
+from datetime import datetime, timezone
+from typing import Callable, List, Optional, Sequence
+
+import daily_counts
+import matcher
+import stub_server
+
+
+def _timed(label: str, n: int, fn: Callable[[], object]) -> object:
+    t0 = time.perf_counter()
+    out = fn()
+    dt = time.perf_counter() - t0
+    print(f"{label:<28} {dt:8.2f}s  {n / dt if dt else 0:12,.0f} msg/s")
+    return out
+
+
+# -------------------------
+# matcher: lexicon / allowlist scanning
+# -------------------------
+# Baseline, as main.py / slurs_api.py did it before matcher.py.
+def _baseline_compile_word_re(words: list[str]) -> re.Pattern | None:
+    if not words:
+        return None
+    pat = r"\b(?:" + "|".join(re.escape(w) for w in words) + r")\b"
+    return re.compile(pat, re.IGNORECASE)
+
+
+def _baseline_text_contains_any(text: str, words: List[str]) -> bool:
+    if not text or not words:
+        return False
+    t = text.lower()
+    return any(w in t for w in words)
+
+
+_VOCAB = ("gg", "wp", "nice", "medic", "uber", "pop", "push", "mid", "last", "heal", "me", "lol",
+          "scout", "soldier", "demo", "sniper", "spy", "pyro", "heavy", "engi", "why", "rollout",
+          "ez", "noob", "team", "hold", "forward", "drop", "sentry", "crit", "rocket", "jump")
+
+
+def synthetic_messages(n: int, terms: Sequence[str], hit_rate: float = 0.02, seed: int = 7) -> List[str]:
+    """n chat-like lines of 3-16 words; ~hit_rate of them contain a term (some glued into a longer word)."""
+    rnd = random.Random(seed)
+    out: List[str] = []
+    for _ in range(n):
+        words = [rnd.choice(_VOCAB) for _ in range(rnd.randint(3, 16))]
+        if terms and rnd.random() < hit_rate:
+            t = rnd.choice(terms)
+            words.insert(rnd.randrange(len(words) + 1), t if rnd.random() < 0.7 else t + "s")
+        if rnd.random() < 0.3:
+            words[0] = words[0].upper()
+        out.append(" ".join(words) + rnd.choice(("", "!", "?", " :)")))
+    return out
+
+
+def _extra_terms(n: int, seed: int = 11) -> List[str]:
+    rnd = random.Random(seed)
+    alpha = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rnd.choice(alpha) for _ in range(rnd.randint(4, 10))) for _ in range(n)]
+
+
+def cmd_matcher(args: argparse.Namespace) -> int:
+    terms = matcher.load_terms(args.lexicon, matcher.LEXICON_KEYS) + _extra_terms(args.extra_terms)
+    if not terms:
+        print(f"no terms in {args.lexicon}")
+        return 1
+    msgs = synthetic_messages(args.messages, terms[: max(1, len(terms))])
+    n = len(msgs)
+    print(f"{n:,} messages, {len(terms)} terms, backend={matcher.Matcher(terms).backend}")
+
+    base_re = _baseline_compile_word_re(terms)
+    m_word = matcher.Matcher(terms, whole_word=True)
+    m_sub = matcher.Matcher(terms, whole_word=False)
+
+    want = _timed("baseline regex (word)", n, lambda: [bool(base_re.search(t)) for t in msgs])
+    got = _timed("matcher.search (word)", n, lambda: [m_word.search(t) for t in msgs])
+    want_sub = _timed("baseline any(w in t) (sub)", n, lambda: [_baseline_text_contains_any(t, terms) for t in msgs])
+    got_sub = _timed("matcher.search (sub)", n, lambda: [m_sub.search(t) for t in msgs])
+    _timed("matcher.matches (word)", n, lambda: [m_word.matches(t) for t in msgs])
+
+    bad = sum(1 for a, b in zip(want, got) if a != b) + sum(1 for a, b in zip(want_sub, got_sub) if a != b)
+    print(f"hits: word={sum(got):,} sub={sum(got_sub):,} mismatches={bad}")
+    return 0 if bad == 0 else 1
+
+
+# -------------------------
+# paging: cursor (keyset) vs offset against the local stub
+# -------------------------
+def _slurs_api_for(base_url: str):
+    """Import slurs_api pointed at base_url (BASE is read at import time)."""
+    os.environ["SLURS_API_BASE"] = base_url
+    import slurs_api
+    slurs_api.BASE = base_url
+    slurs_api.API_MESSAGES = f"{base_url}/api/messages"
+    return slurs_api
+
+
+def cmd_paging(args: argparse.Namespace) -> int:
+    print(f"1 player, {args.messages:,} flagged messages, limit={args.limit}, "
+          f"offset cost {args.offset_cost_us}us/row, insert every {args.insert_every or '-'} requests")
+    rc = 0
+    for mode in ("offset", "cursor"):
+        cfg = stub_server.StubConfig(players=1, messages=args.messages, flagged=1.0,
+                                     offset_cost_us=args.offset_cost_us, insert_every=args.insert_every)
+        srv = stub_server.serve(cfg)
+        try:
+            api = _slurs_api_for(srv.base_url)
+            sid = srv.store.steamids()[0]
+            want = {int(r["logid"]) for r in srv.store.rows[sid]}
+            t0 = time.perf_counter()
+            rows: List[dict] = []
+            for res in api.iter_chunk_results(steamids=[sid], after_iso=None, before_iso=None, limit=args.limit,
+                                              sleep_ms=0, retries_s=[], workers=1, paging=mode):
+                rows.extend(res.rows)
+            dt = time.perf_counter() - t0
+        finally:
+            srv.shutdown()
+            srv.server_close()
+        got = [r.logid for r in rows]
+        dups = len(got) - len(set(got))
+        missing = len(want - set(got))
+        print(f"{mode:<7} {dt:7.2f}s  requests={srv.requests:<5} rows={len(got):<7,} "
+              f"dups={dups:<5} missing={missing}")
+        if mode == "cursor" and (dups or missing):
+            rc = 1
+    return rc
+
+
+# -------------------------
+# ingest: full fetch pipeline against the stub (latency / errors / rate limits)
+# -------------------------
+def cmd_ingest(args: argparse.Namespace) -> int:
+    """
+    Runs iter_chunk_results exactly as run_pull does (workers, limiter, breaker, retries,
+    bisect/fallback, paging) against the stub and reports throughput. No SQL is involved.
+    """
+    os.environ["SLURS_HTTP_TIMEOUT_S"] = str(args.client_timeout_s)
+    cfg = stub_server.StubConfig(players=args.players, messages=args.messages, flagged=args.flagged,
+                                 **stub_server.fault_kwargs(args))
+    srv = stub_server.serve(cfg)
+    try:
+        api = _slurs_api_for(srv.base_url)
+        sids = srv.store.steamids()
+        want = {int(r["logid"]) for sid in sids if sid not in srv.bad
+                for r, f in zip(srv.store.rows[sid], srv.store.flags[sid]) if f}
+        if args.client_rate:
+            limiter = api.TokenBucket(args.client_rate, args.client_rate_window_s, burst=args.client_rate_burst)
+        else:
+            # effectively unlimited (workers > 1 would otherwise get the production budget)
+            limiter = api.TokenBucket(10**9, 1.0, burst=10**6)
+        breaker = api.CircuitBreaker(threshold=args.breaker_threshold, cooldown_s=args.breaker_cooldown_s,
+                                     max_cooldown_s=max(args.breaker_cooldown_s, 30.0))
+        retries = [int(x) for x in args.retries_s.split(",") if x.strip()]
+
+        api.reset_fetch_stats()
+        t0 = time.perf_counter()
+        rows = 0
+        got = set()
+        chunks = failed = 0
+        for res in api.iter_chunk_results(steamids=sids, after_iso=None, before_iso=None, batch_size=args.batch_size,
+                                          limit=args.limit, sleep_ms=0, retries_s=retries, workers=args.workers,
+                                          limiter=limiter, breaker=breaker, paging=args.paging):
+            chunks += 1
+            failed += 0 if res.ok else 1
+            rows += len(res.rows)
+            got.update(r.logid for r in res.rows)
+        dt = time.perf_counter() - t0
+    finally:
+        srv.shutdown()
+        srv.server_close()
+
+    st = api.fetch_stats()
+    n_req = st.get("requests", 0)
+    print(f"players={args.players} msgs/player={args.messages} flagged={args.flagged} workers={args.workers} "
+          f"batch={args.batch_size} limit={args.limit} paging={args.paging}")
+    print(f"wall        {dt:10.2f}s")
+    print(f"requests    {n_req:10,d}  ({n_req / dt:,.1f} req/s; server saw {srv.requests:,})")
+    print(f"rows        {rows:10,d}  ({rows / dt:,.0f} rows/s)")
+    print(f"retries     {st.get('retries', 0):10,d}  refused={st.get('refused', 0)} bisects={st.get('bisects', 0)} "
+          f"fallbacks={st.get('fallbacks', 0)} cursor_to_offset={st.get('cursor_to_offset', 0)}")
+    print(f"chunks      {chunks:10,d}  failed={failed}")
+    fails = {k[10:]: v for k, v in st.items() if k.startswith("soft_fail:")}
+    print(f"soft fails  {sum(fails.values()):10,d}  {fails or ''}")
+    print(f"server      {dict(sorted(srv.responses.items()))}")
+    print(f"coverage    {len(want & got):,}/{len(want):,} flagged rows of healthy players")
+    return 0 if not failed else 1
+
+
+# -------------------------
+# counts: report._fetch_counts_master SQL on a synthetic table (needs SQL Server)
+# -------------------------
+# Baseline, as report._fetch_counts_master did it before the single-pass query: one scan per window.
+_BASELINE_COUNTS_SQL = """
+DECLARE @since  DATETIME2(3) = ?;
+DECLARE @before DATETIME2(3) = ?;
+DECLARE @now    DATETIME2(3) = ?;   -- SYSUTCDATETIME() in report.py; pinned so both queries share "now"
+
+WITH base AS (
+  SELECT v.steamid64_bigint AS steamid64, v.player_id, v.oz_id, v.current_name
+  FROM {roster} AS v
+  WHERE v.steamid64_bigint IS NOT NULL
+),
+c1 AS (
+  SELECT m.steamid64, COUNT(*) AS c1
+  FROM {msg} AS m
+  JOIN {roster} AS v ON v.steamid64_bigint = m.steamid64
+  WHERE m.msg_time_utc >= @since AND m.msg_time_utc < @before
+  GROUP BY m.steamid64
+),
+c7 AS (
+  SELECT m.steamid64, COUNT(*) AS c7
+  FROM {msg} AS m
+  JOIN {roster} AS v ON v.steamid64_bigint = m.steamid64
+  WHERE m.msg_time_utc >= DATEADD(DAY,-7,@now) AND m.msg_time_utc < @now
+  GROUP BY m.steamid64
+),
+c31 AS (
+  SELECT m.steamid64, COUNT(*) AS c31
+  FROM {msg} AS m
+  JOIN {roster} AS v ON v.steamid64_bigint = m.steamid64
+  WHERE m.msg_time_utc >= DATEADD(DAY,-31,@now) AND m.msg_time_utc < @now
+  GROUP BY m.steamid64
+),
+c180 AS (
+  SELECT m.steamid64, COUNT(*) AS c180
+  FROM {msg} AS m
+  JOIN {roster} AS v ON v.steamid64_bigint = m.steamid64
+  WHERE m.msg_time_utc >= DATEADD(DAY,-180,@now) AND m.msg_time_utc < @now
+  GROUP BY m.steamid64
+),
+call AS (
+  SELECT m.steamid64, COUNT(*) AS c_all,
+         CAST(MIN(m.msg_time_utc) AS DATETIME2(3)) AS first_hit_utc,
+         CAST(MAX(m.msg_time_utc) AS DATETIME2(3)) AS last_hit_utc
+  FROM {msg} AS m
+  JOIN {roster} AS v ON v.steamid64_bigint = m.steamid64
+  GROUP BY m.steamid64
+)
+SELECT b.steamid64, b.player_id, b.oz_id, b.current_name,
+       ISNULL(c1.c1,0)   AS c1,
+       ISNULL(c7.c7,0)   AS c7,
+       ISNULL(c31.c31,0) AS c31,
+       ISNULL(c180.c180,0) AS c180,
+       ISNULL(call.c_all,0) AS c_all,
+       call.first_hit_utc,
+       call.last_hit_utc
+FROM base AS b
+LEFT JOIN c1   ON c1.steamid64 = b.steamid64
+LEFT JOIN c7   ON c7.steamid64 = b.steamid64
+LEFT JOIN c31  ON c31.steamid64 = b.steamid64
+LEFT JOIN c180 ON c180.steamid64 = b.steamid64
+LEFT JOIN call ON call.steamid64 = b.steamid64
+"""
+
+_IO_RE = re.compile(r"Table '([^']+)'\. Scan count (\d+), logical reads (\d+)")
+
+
+def _run_with_io(cur, sql: str, params: list):
+    """Execute with STATISTICS IO on; returns (rows, seconds, logical reads by table, scans)."""
+    t0 = time.perf_counter()
+    cur.execute(sql, params)
+    while cur.description is None and cur.nextset():
+        pass
+    rows = cur.fetchall()
+    dt = time.perf_counter() - t0
+    msgs = list(getattr(cur, "messages", None) or [])
+    while cur.nextset():
+        msgs += list(getattr(cur, "messages", None) or [])
+    reads: dict = {}
+    scans = 0
+    for _, text in msgs:
+        for table, n_scan, n_reads in _IO_RE.findall(str(text)):
+            name = table.split("__")[0]  # #temp tables carry a long session suffix
+            reads[name] = reads.get(name, 0) + int(n_reads)
+            scans += int(n_scan)
+    return rows, dt, reads, scans
+
+
+def cmd_counts(args: argparse.Namespace) -> int:
+    """
+    Builds #bench_msg (args.rows messages over args.players players and args.days days) and a
+    #bench_roster in tempdb, then times the old per-window CTE query against the single-pass
+    _counts_master_sql with SET STATISTICS IO, best of args.repeat. Needs SQLSERVER_CONN_STR.
+    """
+    import db
+    import report
+
+    with db.get_conn() as conn, conn.cursor() as cur:
+        print(f"building #bench_msg: {args.rows:,} rows, {args.players:,} players, {args.days} days ...")
+        t0 = time.perf_counter()
+        cur.execute("""
+            IF OBJECT_ID('tempdb..#bench_msg') IS NOT NULL DROP TABLE #bench_msg;
+            IF OBJECT_ID('tempdb..#bench_roster') IS NOT NULL DROP TABLE #bench_roster;
+            CREATE TABLE #bench_msg(
+              id           BIGINT IDENTITY(1,1) PRIMARY KEY,
+              steamid64    BIGINT            NOT NULL,
+              msg_time_utc DATETIMEOFFSET(3) NOT NULL
+            );
+            CREATE TABLE #bench_roster(
+              steamid64_bigint BIGINT PRIMARY KEY, player_id INT, oz_id INT, current_name NVARCHAR(64)
+            );
+        """)
+        cur.execute("""
+            WITH n AS (
+              SELECT TOP (?) ROW_NUMBER() OVER (ORDER BY (SELECT NULL)) AS i
+              FROM sys.all_columns a CROSS JOIN sys.all_columns b CROSS JOIN sys.all_columns c
+            )
+            INSERT INTO #bench_msg WITH (TABLOCK) (steamid64, msg_time_utc)
+            SELECT 76561197960265728 + (ABS(CHECKSUM(NEWID())) % ?),
+                   DATEADD(SECOND, -(ABS(CHECKSUM(NEWID())) % (? * 86400)), SYSUTCDATETIME())
+            FROM n
+        """, [args.rows, args.players, args.days])
+        cur.execute("""
+            INSERT INTO #bench_roster(steamid64_bigint, player_id, oz_id, current_name)
+            SELECT s, ROW_NUMBER() OVER (ORDER BY s), ROW_NUMBER() OVER (ORDER BY s), CONCAT('p', s % 100000)
+            FROM (SELECT DISTINCT steamid64 AS s FROM #bench_msg) AS d
+            WHERE s % 10 <> 0;   -- ~10% of talkers are not on the roster
+            CREATE INDEX ix_bench_time ON #bench_msg(msg_time_utc) INCLUDE (steamid64);
+            CREATE INDEX ix_bench_sid ON #bench_msg(steamid64, msg_time_utc);
+        """)
+        conn.commit()
+        print(f"built in {time.perf_counter() - t0:.1f}s")
+
+        since, before = report._adelaide_window_22h()
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+        extra = [int(d) for d in args.extra_days.split(",") if d.strip() and int(d) not in (7, 31, 180)]
+        windows = [("c1", since, before)] + daily_counts.last_days([7, 31, 180] + extra, now)
+        new_sql, new_params = report._counts_master_sql(windows, rollup=False, msg_table="#bench_msg",
+                                                        roster="#bench_roster")
+        old_sql = _BASELINE_COUNTS_SQL.format(msg="#bench_msg", roster="#bench_roster")
+        old_params = [since.replace(tzinfo=None), before.replace(tzinfo=None), now]
+
+        cur.execute("SET STATISTICS IO ON")
+        results = {}
+        for label, sql, params in (("baseline (scan per window)", old_sql, old_params),
+                                   ("single pass SUM(CASE)", new_sql, new_params)):
+            best = None
+            for _ in range(max(1, args.repeat)):
+                rows, dt, reads, scans = _run_with_io(cur, sql, params)
+                if best is None or dt < best[1]:
+                    best = (rows, dt, reads, scans)
+            rows, dt, reads, scans = best
+            results[label] = rows
+            io = ", ".join(f"{t}={n:,}" for t, n in sorted(reads.items())) or "n/a (driver returned no messages)"
+            print(f"{label:<28} {dt:8.2f}s  rows={len(rows):<7,} scans={scans:<4} logical reads: {io}")
+        cur.execute("SET STATISTICS IO OFF")
+
+    # same players and the same c1/c7/c31/c180/c_all
+    base_rows, new_rows = results.values()
+    key = lambda r: int(r[0])
+    a = {key(r): tuple(r[4:9]) for r in base_rows}
+    b = {key(r): (r[4], r[5], r[6], r[7], r[4 + len(windows)]) for r in new_rows}
+    bad = sum(1 for k in a if a[k] != b.get(k))
+    print(f"players={len(a):,} mismatches={bad}")
+    return 0 if bad == 0 else 1
+
+
+# -------------------------
+# html: summary / messages table rendering
+# -------------------------
+# Baseline, as report.py rendered before the column-wise version (iterrows + one f-string per row).
+def _baseline_player_links(row) -> str:
+    import pandas as pd
+    name = str(row.get("current_name") or row.get("player_name") or "")
+    ozid = row.get("oz_id")
+    sid  = row.get("steamid64")
+    oz   = f"https://ozfortress.com/users/{int(ozid)}" if pd.notna(ozid) else None
+    sl   = f"https://slurs.tf/player?steamid={int(sid)}" if pd.notna(sid) else None
+    st   = f"https://steamcommunity.com/profiles/{int(sid)}" if pd.notna(sid) else None
+    links = []
+    if oz: links.append(f'<a href="{oz}" target="_blank">ozf</a>')
+    if sl: links.append(f'<a href="{sl}" target="_blank">slurs</a>')
+    if st: links.append(f'<a href="{st}" target="_blank">steam</a>')
+    suffix = " <span class='muted'>(" + " · ".join(links) + ")</span>" if links else ""
+    return f"{name}{suffix}"
+
+
+def _baseline_render_html_summary(counts, title: str, rank_col: str) -> str:
+    from report import _CSS
+    df = counts.copy()
+    if rank_col not in df.columns:
+        rank_col = "c_all"
+    df = df[df[rank_col] > 0].copy()
+    df.sort_values([rank_col, "current_name"], ascending=[False, True], inplace=True)
+    rows = []
+    for _, r in df.iterrows():
+        rows.append(
+            "<tr>"
+            f"<td>{_baseline_player_links(r)}</td>"
+            f"<td class='num'>{int(r.get('c1',0))}</td>"
+            f"<td class='num'>{int(r.get('c7',0))}</td>"
+            f"<td class='num'>{int(r.get('c31',0))}</td>"
+            f"<td class='num'>{int(r.get('c180',0))}</td>"
+            f"<td class='num'>{int(r.get('c_all',0))}</td>"
+            "</tr>"
+        )
+    table = (
+        "<table>"
+        "<thead><tr>"
+        "<th>Player</th><th>1d</th><th>7d</th><th>31d</th><th>180d</th><th>All</th>"
+        "</tr></thead>"
+        "<tbody>" + "".join(rows) + "</tbody>"
+        "</table>"
+    )
+    now_txt = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return f"<!doctype html><html><head><meta charset='utf-8'>{_CSS}</head><body>" \
+           f"<h1>{title}</h1><div class='meta'>Generated {now_txt}</div>{table}</body></html>"
+
+
+def _baseline_render_html_messages(msgs_1d, title: str) -> str:
+    from report import _CSS
+    rows = []
+    for _, r in msgs_1d.iterrows():
+        logs = r["logs.tf"]
+        logs_html = f'<a href="{logs}" target="_blank">logs.tf</a>' if logs else ""
+        rows.append(
+            "<tr>"
+            f"<td>{r['date_local']}</td>"
+            f"<td>{_baseline_player_links({'current_name': r['player_name'], 'oz_id': r['oz_id'], 'steamid64': r['steamid64']})}</td>"
+            f"<td>{(r['message_text'] or '').replace('<','&lt;').replace('>','&gt;')}</td>"
+            f"<td>{logs_html}</td>"
+            "</tr>"
+        )
+    table = (
+        "<table>"
+        "<thead><tr><th>Local Time</th><th>Player</th><th>Message</th><th>Log</th></tr></thead>"
+        "<tbody>" + "".join(rows) + "</tbody></table>"
+    )
+    now_txt = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return f"<!doctype html><html><head><meta charset='utf-8'>{_CSS}</head><body>" \
+           f"<h1>{title}</h1><div class='meta'>Generated {now_txt}</div>{table}</body></html>"
+
+
+def synthetic_counts(n: int, seed: int = 5):
+    """Counts-master shaped frame: ~15% off-roster (no oz_id), some blank / missing names, heavy-tailed counts."""
+    import pandas as pd
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(n):
+        c_all = int(rnd.paretovariate(1.2))
+        c180 = min(c_all, int(c_all * rnd.random()))
+        c31 = min(c180, int(c180 * rnd.random()))
+        c7 = min(c31, int(c31 * rnd.random()))
+        on_roster = rnd.random() > 0.15
+        name = rnd.choice([None, "", f"p{i}", f"<b>p{i}</b>", f"pl&yer {i}"]) if rnd.random() < 0.05 else f"player{i % 5000}"
+        rows.append({"steamid64": 76561197960265728 + i, "player_id": i if on_roster else None,
+                     "oz_id": i if on_roster else None, "current_name": name,
+                     "c1": min(c7, rnd.randint(0, 2)), "c7": c7, "c31": c31, "c180": c180, "c_all": c_all})
+    return pd.DataFrame(rows, columns=["steamid64", "player_id", "oz_id", "current_name",
+                                       "c1", "c7", "c31", "c180", "c_all"])
+
+
+def synthetic_messages_1d(n: int, seed: int = 6):
+    """messages_1d shaped frame (as report._fetch_messages_1d returns it)."""
+    import pandas as pd
+    rnd = random.Random(seed)
+    texts = synthetic_messages(min(n, 5000), ["<slur>", "x>y"], hit_rate=0.1, seed=seed) + [""]
+    rows = []
+    for i in range(n):
+        on_roster = rnd.random() > 0.15
+        logid = rnd.randint(3_000_000, 4_000_000) if rnd.random() > 0.1 else None
+        rows.append({"date_local": f"2025-09-17 {i // 60 % 24:02d}:{i % 60:02d}",
+                     "player_name": f"player{i % 700}" if rnd.random() > 0.03 else None,
+                     "player_id": i if on_roster else None, "oz_id": i % 700 if on_roster else None,
+                     "steamid64": 76561197960265728 + i % 900, "message_text": rnd.choice(texts),
+                     "logs.tf": f"https://logs.tf/{logid}" if logid else ""})
+    return pd.DataFrame(rows, columns=["date_local", "player_name", "player_id", "oz_id", "steamid64",
+                                       "message_text", "logs.tf"])
+
+
+_GENERATED_RE = re.compile(r"Generated [0-9: -]+")
+
+
+def cmd_html(args: argparse.Namespace) -> int:
+    import report
+
+    bad = 0
+    for n in [int(x) for x in args.rows.split(",") if x.strip()]:
+        counts, msgs = synthetic_counts(n), synthetic_messages_1d(n)
+        for label, old, new, df, kw in (
+            ("summary", _baseline_render_html_summary, report._render_html_summary, counts,
+             {"title": "bench", "rank_col": "c_all"}),
+            ("messages", _baseline_render_html_messages, report._render_html_messages, msgs, {"title": "bench"}),
+        ):
+            a = _timed(f"{label} {n:,} baseline", n, lambda: old(df, **kw))
+            b = _timed(f"{label} {n:,} column-wise", n, lambda: new(df, **kw))
+            same = _GENERATED_RE.sub("", a) == _GENERATED_RE.sub("", b)
+            bad += not same
+            print(f"{label} {n:,}: {len(b):,} bytes, identical={same}")
+    return 0 if bad == 0 else 1
+
+
+# -------------------------
+# excel: daily workbook
+# -------------------------
+# Baseline, as report.make_excel_daily wrote before the constant_memory writer: six re-sorted
+# copies of the roster through pandas.ExcelWriter, hyperlinks added via per-row .iloc.
+def _baseline_write_counts_sheet(writer, name: str, counts, by_col: str):
+    df = counts.copy()
+    if by_col not in df.columns:
+        by_col = "c_all"
+    df.sort_values([by_col, "current_name"], ascending=[False, True], inplace=True)
+    cols = ["current_name","player_id","oz_id","steamid64","c1","c7","c31","c180","c_all"]
+    for c in cols:
+        if c not in df.columns:
+            df[c] = 0
+    df = df[cols]
+    df.to_excel(writer, sheet_name=name, index=False, startrow=1, header=False)
+    ws = writer.book.get_worksheet_by_name(name)
+    fmt_header = writer.book.add_format({"bold": True, "bg_color": "#f3f4f6", "border": 1})
+    for i, h in enumerate(cols):
+        ws.write(0, i, h, fmt_header)
+    ws.set_column(0, 0, 26)
+    ws.set_column(1, 1, 10)
+    ws.set_column(2, 2, 10)
+    ws.set_column(3, 3, 18)
+    ws.set_column(4, 8, 8)
+    ws.freeze_panes(1, 0)
+
+
+def _baseline_write_messages_1d_pages(writer, base_name: str, msgs, page_size: int = 50000):
+    import math
+    import pandas as pd
+    cols = ["date_local","player_name","player_id","oz_id","steamid64","message_text","logs.tf"]
+    n = len(msgs)
+    if n == 0:
+        pd.DataFrame(columns=cols).to_excel(writer, sheet_name=base_name, index=False)
+        return
+    for p in range(math.ceil(n / page_size)):
+        lo, hi = p * page_size, min((p + 1) * page_size, n)
+        sl = msgs.iloc[lo:hi][cols]
+        name = base_name if p == 0 else f"{base_name}_{p+1}"
+        sl.to_excel(writer, sheet_name=name, index=False, startrow=1, header=False)
+        ws = writer.book.get_worksheet_by_name(name)
+        fmt_header = writer.book.add_format({"bold": True, "bg_color": "#f3f4f6", "border": 1})
+        for i, h in enumerate(cols):
+            ws.write(0, i, h, fmt_header)
+        widths = {"date_local":12, "player_name":26, "player_id":10, "oz_id":10,
+                  "steamid64":18, "message_text":80, "logs.tf":16}
+        for i, c in enumerate(cols):
+            ws.set_column(i, i, widths.get(c, 12))
+        ws.freeze_panes(1, 0)
+        ws.autofilter(0, 0, 0 + len(sl), len(cols) - 1)
+        log_col = cols.index("logs.tf")
+        for ridx in range(len(sl)):
+            url = sl.iloc[ridx]["logs.tf"]
+            if url:
+                ws.write_url(1 + ridx, log_col, url, string="logs.tf")
+
+
+def _baseline_write_excel(path: str, counts, msgs_1d) -> None:
+    import pandas as pd
+    with pd.ExcelWriter(path, engine="xlsxwriter") as writer:
+        _baseline_write_counts_sheet(writer, "Summary", counts[counts["c1"] > 0], by_col="c1")
+        for name, col in (("1d", "c1"), ("7d", "c7"), ("31d", "c31"), ("180d", "c180"), ("All", "c_all")):
+            _baseline_write_counts_sheet(writer, name, counts, by_col=col)
+        _baseline_write_messages_1d_pages(writer, "Messages_1d", msgs_1d, page_size=50000)
+
+
+def cmd_excel(args: argparse.Namespace) -> int:
+    import tempfile
+    import tracemalloc
+    import warnings
+    import report
+
+    counts, msgs = synthetic_counts(args.players), synthetic_messages_1d(args.messages)
+    print(f"{args.players:,} players, {args.messages:,} messages")
+    with tempfile.TemporaryDirectory() as d:
+        for label, fn in (("baseline (pandas, 6 sheets)", lambda p: _baseline_write_excel(p, counts, msgs)),
+                          ("constant_memory", lambda p: report._write_excel_workbook(p, counts, msgs)),
+                          ("constant_memory nonzero", lambda p: report._write_excel_workbook(p, counts, msgs,
+                                                                                            nonzero_only=True))):
+            path = os.path.join(d, "bench.xlsx")
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter("always")
+                t0 = time.perf_counter()
+                fn(path)
+                dt = time.perf_counter() - t0
+            dropped = sum(1 for w in caught if "URLs per worksheet" in str(w.message))
+            peak = ""
+            if args.memory:  # second, traced run: tracemalloc slows the writers several times over
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore")
+                    tracemalloc.start()
+                    fn(path)
+                    peak = f"  peak={tracemalloc.get_traced_memory()[1] / 1e6:7.1f} MB"
+                    tracemalloc.stop()
+            print(f"{label:<28} {dt:8.2f}s  file={os.path.getsize(path) / 1e6:6.1f} MB  "
+                  f"urls dropped={dropped:<6,}{peak}")
+    return 0
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    p = argparse.ArgumentParser(prog="bench", description="slursbot offline benchmarks")
+    subs = p.add_subparsers(dest="cmd", required=True)
+
+    sp = subs.add_parser("matcher", help="Lexicon/allowlist matcher vs the old regex / substring scans")
+    sp.add_argument("--messages", type=int, default=1_000_000)
+    sp.add_argument("--lexicon", type=str, default="lexicon.yaml")
+    sp.add_argument("--extra-terms", type=int, default=0, help="Add N random terms to simulate a large list")
+    sp.set_defaults(func=cmd_matcher)
+
+    sp = subs.add_parser("paging", help="Cursor vs offset paging for one heavy player on the local stub")
+    sp.add_argument("--messages", type=int, default=12_000)
+    sp.add_argument("--limit", type=int, default=100)
+    sp.add_argument("--offset-cost-us", type=float, default=20.0, help="Stub time per skipped row")
+    sp.add_argument("--insert-every", type=int, default=0, help="New message every N requests (mid-scan inserts)")
+    sp.set_defaults(func=cmd_paging)
+
+    sp = subs.add_parser("ingest", help="Full fetch pipeline against the stub: req/s, rows/s, wall time, retries")
+    sp.add_argument("--players", type=int, default=200)
+    sp.add_argument("--messages", type=int, default=300, help="Messages per player")
+    sp.add_argument("--flagged", type=float, default=0.25)
+    sp.add_argument("--workers", type=int, default=4)
+    sp.add_argument("--batch-size", type=int, default=10)
+    sp.add_argument("--limit", type=int, default=100)
+    sp.add_argument("--paging", choices=["cursor", "offset"], default="cursor")
+    sp.add_argument("--retries-s", type=str, default="1,2,4", help="Client retry schedule (comma list)")
+    sp.add_argument("--client-timeout-s", type=float, default=2.0)
+    sp.add_argument("--client-rate", type=int, default=0, help="Client token bucket requests per window (0 = unlimited)")
+    sp.add_argument("--client-rate-window-s", type=float, default=1.0)
+    sp.add_argument("--client-rate-burst", type=int, default=10)
+    sp.add_argument("--breaker-threshold", type=int, default=5)
+    sp.add_argument("--breaker-cooldown-s", type=float, default=1.0)
+    stub_server.add_fault_args(sp)
+    sp.set_defaults(func=cmd_ingest)
+
+    sp = subs.add_parser("counts", help="Counts-master SQL: per-window scans vs single pass (needs SQL Server)")
+    sp.add_argument("--rows", type=int, default=5_000_000)
+    sp.add_argument("--players", type=int, default=3000)
+    sp.add_argument("--days", type=int, default=400)
+    sp.add_argument("--extra-days", type=str, default="", help="Extra windows for the new query, e.g. 14,90,365")
+    sp.add_argument("--repeat", type=int, default=3)
+    sp.set_defaults(func=cmd_counts)
+
+    sp = subs.add_parser("html", help="Summary/messages HTML: iterrows renderer vs column-wise (byte-identical check)")
+    sp.add_argument("--rows", type=str, default="6000,60000,600000", help="Comma list of table sizes")
+    sp.set_defaults(func=cmd_html)
+
+    sp = subs.add_parser("excel", help="Daily workbook: pandas ExcelWriter baseline vs constant_memory writer")
+    sp.add_argument("--players", type=int, default=6000)
+    sp.add_argument("--messages", type=int, default=50_000)
+    sp.add_argument("--memory", action="store_true", help="Also report tracemalloc peak (extra, slower run)")
+    sp.set_defaults(func=cmd_excel)
+
+    return p.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,314 @@
+# daily_counts.py — per-player daily rollup of slurs_msg (kiancat.dbo.slurs_daily_counts)
+# - One row per (steamid64, day_utc, local_day) bucket: hits n, plus the first/last hit inside it
+# - db.upsert_messages bumps it in the same transaction as the inserts it counts
+# - `python main.py rollup-rebuild` creates it / recomputes it from history; until then nothing is
+#   bumped and readers keep scanning slurs_msg (see exists())
+# - counts_sql(): per-player counts over any list of [start, end) windows in one grouped query.
+#   Whole UTC days come from the rollup; the partial days at a window's edges come from slurs_msg
+#   (a msg_time_utc range of < 1 day per edge), so the counts are exact, not day-rounded.
+# - scan_counts_sql(): the same columns from slurs_msg alone, in a single conditional-aggregate pass
+from __future__ import annotations
+
+import os
+import time
+import logging
+from functools import lru_cache
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger("slursbot")
+
+TABLE = os.getenv("SLURS_DAILY_TABLE", "kiancat.dbo.slurs_daily_counts")
+MSG_TABLE = os.getenv("SLURS_MSG_TABLE", "kiancat.dbo.slurs_msg")
+
+# (column name, start, end): naive-UTC (or aware) datetimes; None = unbounded on that side
+Window = Tuple[str, Optional[datetime], Optional[datetime]]
+
+
+# -------------------------
+# Buckets
+# -------------------------
+def _local_tz():
+    try:
+        from zoneinfo import ZoneInfo
+        return ZoneInfo(os.getenv("DISPLAY_TZ", "Australia/Adelaide"))
+    except Exception:
+        return timezone.utc
+
+
+@lru_cache(maxsize=16384)
+def _local_day_of_slot(slot: datetime) -> Optional[date]:
+    """Local day of a 15-minute slot, or None if the offset there is not a whole number of quarter hours."""
+    local = slot.replace(tzinfo=timezone.utc).astimezone(_local_tz())
+    if local.utcoffset() % timedelta(minutes=15):
+        return None
+    return local.date()
+
+
+def local_day(ts_utc: datetime) -> date:
+    """
+    DISPLAY_TZ calendar day of a naive-UTC timestamp, cached per 15-minute slot.
+    Every current offset is a multiple of 15 min (e.g. Kathmandu +5:45, Eucla +8:45), so local
+    midnight never falls inside a slot; odd historical offsets (LMT) are computed exactly.
+    """
+    d = _local_day_of_slot(ts_utc.replace(minute=ts_utc.minute - ts_utc.minute % 15, second=0, microsecond=0))
+    if d is None:
+        d = ts_utc.replace(tzinfo=timezone.utc).astimezone(_local_tz()).date()
+    return d
+
+
+def bucket(ts_utc: datetime) -> Tuple[date, date]:
+    """(day_utc, local_day) for a naive-UTC timestamp."""
+    return ts_utc.date(), local_day(ts_utc)
+
+
+def _naive_utc(dt: Optional[datetime]) -> Optional[datetime]:
+    if dt is None or dt.tzinfo is None:
+        return dt
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _midnight(d: date) -> datetime:
+    return datetime(d.year, d.month, d.day)
+
+
+# -------------------------
+# Table
+# -------------------------
+def exists(conn, table: str = TABLE) -> bool:
+    with conn.cursor() as cur:
+        cur.execute("SELECT CASE WHEN OBJECT_ID(?) IS NULL THEN 0 ELSE 1 END", table)
+        return bool(cur.fetchone()[0])
+
+
+def ensure_table(conn, table: str = TABLE) -> None:
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            IF OBJECT_ID('{table}') IS NULL
+            BEGIN
+              CREATE TABLE {table}(
+                steamid64 BIGINT       NOT NULL,
+                day_utc   DATE         NOT NULL,
+                local_day DATE         NOT NULL,
+                n         INT          NOT NULL,
+                first_utc DATETIME2(3) NOT NULL,
+                last_utc  DATETIME2(3) NOT NULL,
+                CONSTRAINT PK_{table.split('.')[-1]} PRIMARY KEY (steamid64, day_utc, local_day)
+              );
+              CREATE INDEX IX_{table.split('.')[-1]}_day ON {table}(day_utc) INCLUDE (n);
+            END
+        """)
+    conn.commit()
+
+
+def bump_sql(new_rows: str, table: str = TABLE) -> str:
+    """
+    MERGE that adds a set of just-inserted messages to the rollup. new_rows must be a query
+    yielding (steamid64, day_utc, local_day, msg_utc) for exactly the rows that were inserted.
+    """
+    return f"""
+    MERGE {table} WITH (HOLDLOCK) AS t
+    USING (
+      SELECT r.steamid64, r.day_utc, r.local_day, COUNT(*) AS n,
+             MIN(r.msg_utc) AS first_utc, MAX(r.msg_utc) AS last_utc
+      FROM ({new_rows}) AS r
+      GROUP BY r.steamid64, r.day_utc, r.local_day
+    ) AS s
+    ON t.steamid64 = s.steamid64 AND t.day_utc = s.day_utc AND t.local_day = s.local_day
+    WHEN MATCHED THEN UPDATE SET
+      t.n = t.n + s.n,
+      t.first_utc = CASE WHEN s.first_utc < t.first_utc THEN s.first_utc ELSE t.first_utc END,
+      t.last_utc  = CASE WHEN s.last_utc  > t.last_utc  THEN s.last_utc  ELSE t.last_utc  END
+    WHEN NOT MATCHED THEN
+      INSERT (steamid64, day_utc, local_day, n, first_utc, last_utc)
+      VALUES (s.steamid64, s.day_utc, s.local_day, s.n, s.first_utc, s.last_utc);
+    """
+
+
+def rebuild(conn, table: str = TABLE, msg_table: str = MSG_TABLE, fetch: int = 50000) -> Tuple[int, int]:
+    """
+    Recompute the rollup from msg_table (creating it if missing) in one transaction.
+    The scan holds a shared table lock on msg_table, so a concurrent pull waits rather than
+    inserting rows the rebuild would miss. Returns (messages scanned, buckets written).
+    """
+    ensure_table(conn, table)
+    t0 = time.perf_counter()
+    agg: Dict[Tuple[int, date, date], List[Any]] = {}
+    scanned = 0
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT steamid64, CAST(SWITCHOFFSET(msg_time_utc, '+00:00') AS DATETIME2(3))
+            FROM {msg_table} WITH (TABLOCK, HOLDLOCK)
+        """)
+        while True:
+            rows = cur.fetchmany(fetch)
+            if not rows:
+                break
+            scanned += len(rows)
+            for sid, ts in rows:
+                key = (int(sid), ts.date(), local_day(ts))
+                b = agg.get(key)
+                if b is None:
+                    agg[key] = [1, ts, ts]
+                else:
+                    b[0] += 1
+                    if ts < b[1]:
+                        b[1] = ts
+                    if ts > b[2]:
+                        b[2] = ts
+            logger.info("rollup rebuild: scanned %d messages, %d buckets", scanned, len(agg))
+        params = [(sid, d, ld, b[0], b[1], b[2]) for (sid, d, ld), b in agg.items()]
+        cur.execute(f"DELETE FROM {table}")
+        cur.fast_executemany = True
+        for k in range(0, len(params), fetch):
+            cur.executemany(f"INSERT INTO {table}(steamid64, day_utc, local_day, n, first_utc, last_utc) "
+                            "VALUES (?,?,?,?,?,?)", params[k:k + fetch])
+    conn.commit()
+    logger.info("rollup rebuild: %d messages -> %d buckets in %.1fs", scanned, len(params), time.perf_counter() - t0)
+    return scanned, len(params)
+
+
+# -------------------------
+# Windowed counts
+# -------------------------
+def _split(start: Optional[datetime], end: Optional[datetime]):
+    """
+    [start, end) -> (day_lo, day_hi, edges): whole UTC days day_lo <= day_utc < day_hi (None = open)
+    are read from the rollup, the [a, b) ranges in edges from slurs_msg. day_lo >= day_hi means no whole day.
+    """
+    start, end = _naive_utc(start), _naive_utc(end)
+    day_lo = day_hi = None
+    edges: List[Tuple[datetime, datetime]] = []
+    if start is not None:
+        day_lo = start.date() if start == _midnight(start.date()) else start.date() + timedelta(days=1)
+    if end is not None:
+        day_hi = end.date()
+    if day_lo is not None and day_hi is not None and day_lo >= day_hi:
+        return day_lo, day_hi, ([(start, end)] if start < end else [])
+    if start is not None and start < _midnight(day_lo):
+        edges.append((start, _midnight(day_lo)))
+    if end is not None and _midnight(day_hi) < end:
+        edges.append((_midnight(day_hi), end))
+    return day_lo, day_hi, edges
+
+
+def counts_sql(windows: Sequence[Window], *, all_col: Optional[str] = "c_all", bounds: bool = True,
+               table: str = TABLE, msg_table: str = MSG_TABLE) -> Tuple[str, list]:
+    """
+    (sql, params) for a derived table: steamid64, one count column per window, then all_col
+    (lifetime count) and first_hit_utc / last_hit_utc when requested. Only players with a
+    rollup bucket or an edge hit appear; LEFT JOIN and ISNULL(...,0) against the roster.
+    """
+    day_cols: List[str] = []
+    day_params: list = []
+    edge_cols: List[str] = []
+    edge_params: list = []
+    all_edges: List[Tuple[datetime, datetime]] = []
+    for name, start, end in windows:
+        day_lo, day_hi, edges = _split(start, end)
+        if day_lo is not None and day_hi is not None and day_lo >= day_hi:
+            day_cols.append(f"0 AS {name}")
+        else:
+            cond = []
+            if day_lo is not None:
+                cond.append("d.day_utc >= ?")
+                day_params.append(day_lo)
+            if day_hi is not None:
+                cond.append("d.day_utc < ?")
+                day_params.append(day_hi)
+            if cond:
+                day_cols.append(f"SUM(CASE WHEN {' AND '.join(cond)} THEN d.n ELSE 0 END) AS {name}")
+            else:
+                day_cols.append(f"SUM(d.n) AS {name}")
+        if edges:
+            edge_cols.append("SUM(CASE WHEN " + " OR ".join(
+                "(m.msg_time_utc >= ? AND m.msg_time_utc < ?)" for _ in edges) + f" THEN 1 ELSE 0 END) AS {name}")
+            for a, b in edges:
+                edge_params += [a, b]
+        else:
+            edge_cols.append(f"0 AS {name}")
+        all_edges += [ab for ab in edges if ab not in all_edges]
+
+    names = [w[0] for w in windows]
+    extra_day: List[str] = []
+    extra_edge: List[str] = []
+    if all_col:
+        names.append(all_col)
+        extra_day.append(f"SUM(d.n) AS {all_col}")
+        extra_edge.append(f"0 AS {all_col}")
+    outer = [f"SUM(x.{c}) AS {c}" for c in names]
+    if bounds:
+        extra_day += ["MIN(d.first_utc) AS first_hit_utc", "MAX(d.last_utc) AS last_hit_utc"]
+        extra_edge += ["CAST(NULL AS DATETIME2(3)) AS first_hit_utc", "CAST(NULL AS DATETIME2(3)) AS last_hit_utc"]
+        outer += ["MIN(x.first_hit_utc) AS first_hit_utc", "MAX(x.last_hit_utc) AS last_hit_utc"]
+
+    parts = [f"""
+      SELECT d.steamid64, {', '.join(day_cols + extra_day)}
+      FROM {table} AS d
+      GROUP BY d.steamid64"""]
+    params = list(day_params)
+    if all_edges:
+        parts.append(f"""
+      SELECT m.steamid64, {', '.join(edge_cols + extra_edge)}
+      FROM {msg_table} AS m
+      WHERE {' OR '.join('(m.msg_time_utc >= ? AND m.msg_time_utc < ?)' for _ in all_edges)}
+      GROUP BY m.steamid64""")
+        params += edge_params
+        for a, b in all_edges:
+            params += [a, b]
+    sql = f"""
+    SELECT x.steamid64, {', '.join(outer)}
+    FROM ({' UNION ALL '.join(parts)}
+    ) AS x
+    GROUP BY x.steamid64"""
+    return sql, params
+
+
+def scan_counts_sql(windows: Sequence[Window], *, all_col: Optional[str] = "c_all", bounds: bool = True,
+                    msg_table: str = MSG_TABLE) -> Tuple[str, list]:
+    """
+    Same derived table as counts_sql, straight from msg_table (for when there is no rollup):
+    one grouped pass with a SUM(CASE ...) column per window instead of a scan per window.
+    Without all_col/bounds the scan is limited to the union of the windows.
+    """
+    cols: List[str] = []
+    params: list = []
+    spans: List[Tuple[Optional[datetime], Optional[datetime]]] = []
+    for name, start, end in windows:
+        start, end = _naive_utc(start), _naive_utc(end)
+        cond = []
+        if start is not None:
+            cond.append("m.msg_time_utc >= ?")
+            params.append(start)
+        if end is not None:
+            cond.append("m.msg_time_utc < ?")
+            params.append(end)
+        cols.append(f"SUM(CASE WHEN {' AND '.join(cond)} THEN 1 ELSE 0 END) AS {name}" if cond
+                    else f"COUNT(*) AS {name}")
+        spans.append((start, end))
+    if all_col:
+        cols.append(f"COUNT(*) AS {all_col}")
+    if bounds:
+        cols += ["CAST(MIN(m.msg_time_utc) AS DATETIME2(3)) AS first_hit_utc",
+                 "CAST(MAX(m.msg_time_utc) AS DATETIME2(3)) AS last_hit_utc"]
+    where = ""
+    if not all_col and not bounds and spans and all(a is not None for a, _ in spans):
+        # only windowed columns: nothing older than the earliest start can count
+        where = "\n      WHERE m.msg_time_utc >= ?"
+        params.append(min(a for a, _ in spans))
+    sql = f"""
+      SELECT m.steamid64, {', '.join(cols)}
+      FROM {msg_table} AS m{where}
+      GROUP BY m.steamid64"""
+    return sql, params
+
+
+def last_days(days: Sequence[int], now: Optional[datetime] = None, prefix: str = "c",
+              open_end: bool = False) -> List[Window]:
+    """[("c7", now-7d, now), ...]; open_end=True leaves the end unbounded (>= now-Nd only)."""
+    now = _naive_utc(now) or datetime.now(timezone.utc).replace(tzinfo=None)
+    return [(f"{prefix}{d}", now - timedelta(days=int(d)), None if open_end else now) for d in days]
+
+
+__all__ = ["TABLE", "Window", "local_day", "bucket", "exists", "ensure_table", "bump_sql", "rebuild",
+           "counts_sql", "scan_counts_sql", "last_days"]
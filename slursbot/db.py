@@ -1,16 +1,16 @@
 import os
-import pyodbc
-from hashlib import sha256
-from dotenv import load_dotenv
-import re
-import os
+import gzip
+import atexit
+import json
+import time
 import logging
-from hashlib import sha256
-from typing import Iterable, List, Dict, Any, Optional
+import threading
+from typing import Iterable, List, Dict, Any, Optional, Sequence, Set, Tuple
 
 import pyodbc
 
-STEAM64_BASE = 76561197960265728
+import daily_counts
+from rows import MessageRow, STEAM64_BASE  # STEAM64_BASE kept importable from db
 
 # db.py — DB helpers for slursbot
 
@@ -54,8 +54,246 @@ def _resolve_conn_str() -> str:
 
 CONN_STR = _resolve_conn_str()
 
+# ---- pooled connections ----
+# get_conn() hands out pooled connections so a run (roster, pull, reports, Discord) and the
+# bot reuse a few sessions instead of logging in per call. `with db.get_conn() as conn:` keeps
+# pyodbc's semantics (commit on success, rollback on error) and then returns the connection
+# to the pool. SQL_POOL=0 restores a fresh pyodbc.connect per call.
+def _env_num(key: str, default: float) -> float:
+    try:
+        return float(os.getenv(key, str(default)))
+    except Exception:
+        return default
+
+
+class PoolTimeout(RuntimeError):
+    pass
+
+
+class PooledConnection:
+    """pyodbc connection proxy; close() / with-exit hand it back to its pool instead of closing it."""
+    __slots__ = ("_pool", "_conn", "_done")
+
+    def __init__(self, pool: "ConnectionPool", conn):
+        object.__setattr__(self, "_pool", pool)
+        object.__setattr__(self, "_conn", conn)
+        object.__setattr__(self, "_done", False)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)
+
+    def __enter__(self) -> "PooledConnection":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        try:
+            if exc_type is None:
+                self._conn.commit()
+            else:
+                self._conn.rollback()
+        except Exception:
+            self._release(True)
+            if exc_type is None:
+                raise
+            return False
+        self._release(False)
+        return False
+
+    def close(self) -> None:
+        self._release(False)
+
+    def _release(self, broken: bool) -> None:
+        if self._done:
+            return
+        object.__setattr__(self, "_done", True)
+        self._pool._checkin(self._conn, broken)
+
+    def __del__(self):
+        try:
+            if not self._done:
+                self._release(True)  # leaked without close(): don't trust its transaction state
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """
+    Thread-safe pyodbc pool.
+      min_size       idle connections kept even past max_idle_s
+      max_size       connections open at once; further checkouts wait up to timeout_s
+      max_idle_s     idle connections older than this are closed
+      ping_after_s   a connection idle longer than this is checked with SELECT 1 on checkout
+    """
+
+    def __init__(self, conn_str: str, min_size: int = 1, max_size: int = 8, max_idle_s: float = 300.0,
+                 timeout_s: float = 30.0, ping_after_s: float = 10.0):
+        self.conn_str = conn_str
+        self.min_size = max(0, int(min_size))
+        self.max_size = max(1, int(max_size), self.min_size)
+        self.max_idle_s = max_idle_s
+        self.timeout_s = timeout_s
+        self.ping_after_s = ping_after_s
+        self._cond = threading.Condition()
+        self._idle: List[Tuple[Any, float]] = []   # (conn, idle since); LIFO keeps hot connections hot
+        self._out = 0
+        self._stats: Dict[str, float] = dict.fromkeys(
+            ("checkouts", "opened", "reused", "pings", "ping_failed", "discarded", "idle_closed",
+             "waits", "wait_s", "wait_max_s", "saturated", "timeouts", "peak_out"), 0)
+
+    def _bump(self, key: str) -> None:
+        with self._cond:
+            self._stats[key] += 1
+
+    def _open(self):
+        conn = pyodbc.connect(self.conn_str)
+        self._bump("opened")
+        return conn
+
+    def _ping(self, conn) -> bool:
+        self._bump("pings")
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1").fetchone()
+            cur.close()
+            return True
+        except Exception:
+            self._bump("ping_failed")
+            return False
+
+    @staticmethod
+    def _close_quietly(conn) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _prune(self, now: float) -> List[Any]:
+        """Detach idle connections past max_idle_s beyond min_size (caller closes them outside the lock)."""
+        stale = []
+        while len(self._idle) > self.min_size and now - self._idle[0][1] > self.max_idle_s:
+            stale.append(self._idle.pop(0)[0])
+        self._stats["idle_closed"] += len(stale)
+        return stale
+
+    def acquire(self) -> PooledConnection:
+        t0 = time.monotonic()
+        deadline = t0 + self.timeout_s
+        waited = False
+        conn = None
+        idle_for = 0.0
+        with self._cond:
+            stale = self._prune(t0)
+            while not self._idle and self._out >= self.max_size:
+                if not waited:
+                    waited = True
+                    self._stats["saturated"] += 1
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeout(f"no SQL connection free after {self.timeout_s:g}s "
+                                      f"({self._out}/{self.max_size} in use)")
+                self._cond.wait(left)
+            if self._idle:
+                conn, since = self._idle.pop()
+                idle_for = time.monotonic() - since
+            self._out += 1
+            self._stats["peak_out"] = max(self._stats["peak_out"], self._out)
+        for c in stale:
+            self._close_quietly(c)
+        try:
+            if conn is not None and idle_for > self.ping_after_s and not self._ping(conn):
+                self._close_quietly(conn)
+                self._bump("discarded")
+                conn = None
+            if conn is None:
+                conn = self._open()
+            else:
+                self._bump("reused")
+        except Exception:
+            self._checkin(None, True)
+            raise
+        wait = time.monotonic() - t0
+        with self._cond:
+            self._stats["checkouts"] += 1
+            if waited:
+                self._stats["waits"] += 1
+            self._stats["wait_s"] += wait
+            self._stats["wait_max_s"] = max(self._stats["wait_max_s"], wait)
+        return PooledConnection(self, conn)
+
+    def _checkin(self, conn, broken: bool) -> None:
+        if conn is not None and not broken:
+            try:
+                conn.rollback()  # nothing half-done leaks into the next borrower
+            except Exception:
+                broken = True
+        with self._cond:
+            self._out -= 1
+            if conn is not None and not broken:
+                self._idle.append((conn, time.monotonic()))
+            elif conn is not None:
+                self._stats["discarded"] += 1
+            self._cond.notify()
+        if conn is not None and broken:
+            self._close_quietly(conn)
+
+    def close_all(self) -> None:
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+    def stats(self) -> Dict[str, float]:
+        with self._cond:
+            out = dict(self._stats)
+            out.update(in_use=self._out, idle=len(self._idle), max_size=self.max_size)
+        return out
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+def _pool_enabled() -> bool:
+    return os.getenv("SQL_POOL", "1").strip().lower() not in {"0", "false", "no", "off"}
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    CONN_STR,
+                    min_size=int(_env_num("SQL_POOL_MIN", 1)),
+                    max_size=int(_env_num("SQL_POOL_MAX", 8)),
+                    max_idle_s=_env_num("SQL_POOL_MAX_IDLE_S", 300),
+                    timeout_s=_env_num("SQL_POOL_TIMEOUT_S", 30),
+                    ping_after_s=_env_num("SQL_POOL_PING_AFTER_S", 10),
+                )
+                atexit.register(_pool.close_all)
+    return _pool
+
 def get_conn():
-    return pyodbc.connect(CONN_STR)
+    """A pooled connection (see ConnectionPool); use as `with db.get_conn() as conn:`."""
+    if not _pool_enabled():
+        return pyodbc.connect(CONN_STR)
+    return get_pool().acquire()
+
+def pool_stats() -> Dict[str, float]:
+    return _pool.stats() if _pool is not None else {}
+
+def log_pool_stats(label: str = "sql") -> None:
+    st = pool_stats()
+    if not st:
+        return
+    n = max(1, st["checkouts"])
+    logger.info("%s pool: checkouts=%d opened=%d reused=%d discarded=%d idle_closed=%d peak=%d/%d "
+                "saturated=%d timeouts=%d wait avg=%.1fms max=%.1fms",
+                label, st["checkouts"], st["opened"], st["reused"], st["discarded"], st["idle_closed"],
+                st["peak_out"], st["max_size"], st["saturated"], st["timeouts"],
+                1000 * st["wait_s"] / n, 1000 * st["wait_max_s"])
 
 # ---- roster helpers (some code uses this) ----
 def get_ozf_steamids() -> List[str]:
@@ -73,116 +311,490 @@ def get_ozf_steamids() -> List[str]:
     return good
 
 # ---- raw ingest ----
-def insert_raw_rows(rows: List[Dict[str, Any]], table: str = "dbo.slurs_raw") -> int:
+RAW_BATCH = int(os.getenv("SLURS_RAW_BATCH", "1000"))
+RAW_MODE = os.getenv("SLURS_RAW_MODE", "rows").strip().lower()     # rows | pages | off
+RAW_PAGE_ROWS = int(os.getenv("SLURS_RAW_PAGE_ROWS", "100"))
+
+def insert_raw_rows(rows: Sequence[MessageRow], table: str = "dbo.slurs_raw",
+                    batch_size: Optional[int] = None, mode: Optional[str] = None) -> int:
     """
-    Insert original API rows into a raw table for auditing.
+    Insert ingested rows (rows.MessageRow) into a raw table for auditing.
     Expected columns in the target table:
       source nvarchar, message_id nvarchar, steamid64 bigint, logid bigint,
       logdate_txt nvarchar, text nvarchar, payload_json nvarchar(max)
+
+    Parameters go out with fast_executemany in chunks of batch_size (SLURS_RAW_BATCH, default 1000),
+    one round trip per chunk. mode (SLURS_RAW_MODE): "rows" (default), "pages" to store one
+    compressed payload per API page in {table}_pages instead (see insert_raw_pages), "off" to skip.
+    Returns the rows written.
     """
-    if not rows:
+    mode = (mode or RAW_MODE or "rows").lower()
+    if not rows or mode == "off":
         return 0
+    if mode == "pages":
+        return insert_raw_pages(rows, f"{table}_pages", batch_size=batch_size)
+    batch_size = max(1, int(batch_size or RAW_BATCH))
     sql = f"""
     INSERT INTO {table}
       (source, message_id, steamid64, logid, logdate_txt, text, payload_json)
     VALUES (?,?,?,?,?,?,?)
     """
+    params = [(r.source, r.message_id, r.steamid64, r.logid, r.msg_time_iso, r.text, None) for r in rows]
     inserted = 0
+    t0 = time.perf_counter()
     with get_conn() as conn, conn.cursor() as cur:
-        try:
-            cur.fast_executemany = True
-        except Exception:
-            pass
-        for r in rows:
-            source   = r.get("source", "slurs.tf")
-            message_id = r.get("message_id")
-            steamid64  = r.get("steamid") or r.get("steamid64")
-            logid      = r.get("logid")
-            logdate    = r.get("logdate") or r.get("msg_time_iso") or r.get("messagedate")
-            text       = r.get("message") or r.get("text")
-            payload    = r.get("payload_json")
-
-            cur.execute(
-                sql,
-                source,
-                message_id,
-                int(steamid64) if steamid64 is not None and str(steamid64).strip().isdigit() else None,
-                int(logid) if logid is not None and str(logid).strip().isdigit() else None,
-                str(logdate) if logdate is not None else None,
-                text,
-                payload
-            )
-            inserted += 1
+        cur.fast_executemany = True
+        for k in range(0, len(params), batch_size):
+            part = params[k:k + batch_size]
+            cur.executemany(sql, part)
+            inserted += len(part)
         conn.commit()
+    dt = time.perf_counter() - t0
+    logger.info("Raw insert: %d rows in %.2fs (%.0f rows/s, batch=%d)", inserted, dt, inserted / max(1e-6, dt), batch_size)
     return inserted
 
-# ---- typed upsert (dedupe by hash_key) ----
-def upsert_messages(rows: List[Dict[str, Any]], table: str = "dbo.slurs_msg") -> int:
+def ensure_raw_pages(conn, table: str = "dbo.slurs_raw_pages") -> None:
+    """
+    One row per API page: gzip'd JSON (UTF-16LE) of its rows, readable in SQL as
+    CAST(DECOMPRESS(payload) AS NVARCHAR(MAX)).
     """
-    Accepts either:
-      - {'steamid','message','logdate','logid'}  (slurs_api shape)
-      - {'steamid64','text','msg_time_iso','logid'} (older shape)
-    Uses SHA256(steamid64|iso|text) as dedupe key stored in hash_key.
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            IF OBJECT_ID('{table}') IS NULL
+            BEGIN
+              CREATE TABLE {table}(
+                page_id        BIGINT IDENTITY(1,1) PRIMARY KEY,
+                source         NVARCHAR(32)   NOT NULL,
+                ingested_utc   DATETIME2(3)   NOT NULL DEFAULT SYSUTCDATETIME(),
+                n_rows         INT            NOT NULL,
+                first_time_txt NVARCHAR(40)   NULL,
+                last_time_txt  NVARCHAR(40)   NULL,
+                raw_bytes      INT            NOT NULL,
+                payload        VARBINARY(MAX) NOT NULL
+              );
+            END
+        """)
+    conn.commit()
+
+def _page_payload(page: Sequence[MessageRow]) -> Tuple[bytes, int]:
+    doc = json.dumps([{"source": r.source, "message_id": r.message_id, "steamid64": r.steamid64,
+                       "logid": r.logid, "msg_time_iso": r.msg_time_iso, "text": r.text} for r in page],
+                     ensure_ascii=False, separators=(",", ":")).encode("utf-16-le")
+    return gzip.compress(doc, compresslevel=6), len(doc)
+
+def insert_raw_pages(rows: Sequence[MessageRow], table: str = "dbo.slurs_raw_pages",
+                     page_rows: Optional[int] = None, batch_size: Optional[int] = None) -> int:
+    """
+    Compressed raw audit: rows are cut into pages of page_rows (SLURS_RAW_PAGE_ROWS, default
+    100 = one API page) and each page is stored as a single gzip payload. Returns the rows covered.
     """
     if not rows:
         return 0
-
-    import logging
-    logger = logging.getLogger("slursbot")
-
+    page_rows = max(1, int(page_rows or RAW_PAGE_ROWS))
+    batch_size = max(1, int(batch_size or RAW_BATCH))
+    t0 = time.perf_counter()
+    params = []
+    raw_total = packed_total = 0
+    for k in range(0, len(rows), page_rows):
+        page = rows[k:k + page_rows]
+        blob, raw_len = _page_payload(page)
+        raw_total += raw_len
+        packed_total += len(blob)
+        params.append((page[0].source, len(page), page[0].msg_time_iso, page[-1].msg_time_iso, raw_len, blob))
     sql = f"""
-    IF NOT EXISTS (SELECT 1 FROM {table} WHERE hash_key = ?)
-    INSERT INTO {table} (message_id, steamid64, logid, msg_time_utc, text, hash_key)
+    INSERT INTO {table} (source, n_rows, first_time_txt, last_time_txt, raw_bytes, payload)
     VALUES (?,?,?,?,?,?)
     """
-    inserted = 0
-    skipped  = 0
+    with get_conn() as conn:
+        ensure_raw_pages(conn, table)
+        with conn.cursor() as cur:
+            cur.fast_executemany = True
+            for k in range(0, len(params), batch_size):
+                cur.executemany(sql, params[k:k + batch_size])
+        conn.commit()
+    dt = time.perf_counter() - t0
+    logger.info("Raw insert: %d rows as %d pages in %.2fs (%.0f rows/s, %d -> %d bytes)",
+                len(rows), len(params), dt, len(rows) / max(1e-6, dt), raw_total, packed_total)
+    return len(rows)
 
-    with get_conn() as conn, conn.cursor() as cur:
-        for r in rows:
-            sid = r.get("steamid64") or r.get("steamid")
-            iso = (r.get("msg_time_iso") or r.get("logdate") or r.get("messagedate") or "").strip()
-            text = r.get("text") or r.get("message")
-            sid_str = str(sid).strip() if sid is not None else ""
-
-            if not (sid_str.isdigit() and len(sid_str) == 17):
-                skipped += 1
-                logger.warning("Skipping row: invalid steamid64=%r", sid)
-                continue
-            if not iso or not text:
-                skipped += 1
-                logger.warning("Skipping row: missing timestamp/text (steamid64=%s)", sid_str)
-                continue
-
-            logid_raw = r.get("logid")
-            try:
-                logid = int(logid_raw) if logid_raw is not None and str(logid_raw).strip().isdigit() else None
-            except Exception:
-                logid = None
-
-            sid_int = int(sid_str)
-            hk = sha256(f"{sid_str}|{iso}|{text}".encode("utf-8")).hexdigest()
-
-            cur.execute(sql,
-                        hk,                         # WHERE hash_key = ?
-                        r.get("message_id"),
-                        sid_int,
-                        logid,
-                        iso,                        # DATETIMEOFFSET-compatible ISO
-                        text,
-                        hk)
-            if cur.rowcount:
-                inserted += 1
+# ---- typed upsert (dedupe by hash_key) ----
+UPSERT_BATCH = int(os.getenv("SLURS_UPSERT_BATCH", "5000"))
 
-        conn.commit()
+def upsert_messages(rows: Sequence[MessageRow], table: str = "dbo.slurs_msg",
+                    batch_size: Optional[int] = None) -> int:
+    """
+    Insert rows.MessageRow into the typed table unless their hash_key is already there.
+    hash_key = SHA256(steamid64|msg_time_iso|text); rows with empty text are skipped.
 
+    Set-based: per batch (SLURS_UPSERT_BATCH, default 5000) the rows are de-duplicated and
+    hashed client-side, bulk-loaded into #slurs_msg_stage with fast_executemany, and moved
+    with one INSERT ... SELECT ... WHERE NOT EXISTS. Each batch commits on its own, so a
+    failure keeps earlier batches (re-running is harmless). Returns the rows inserted.
+
+    Once the daily rollup exists (daily_counts, `rollup-rebuild`), each batch also adds exactly
+    the rows it inserted to it before the same commit.
+    """
+    if not rows:
+        return 0
+    batch_size = max(1, int(batch_size or UPSERT_BATCH))
+
+    staged: Dict[str, MessageRow] = {}
+    skipped = 0
+    for r in rows:
+        if not r.text:
+            skipped += 1
+            continue
+        staged.setdefault(r.hash_key(), r)
     if skipped:
-        logger.info("Upsert: inserted=%d, skipped_invalid=%d", inserted, skipped)
-    else:
-        logger.info("Upsert: inserted=%d", inserted)
+        logger.warning("Upsert: skipping %d row(s) with empty text", skipped)
+    if not staged:
+        return 0
 
+    params = [(hk, r.message_id, r.steamid64, r.logid, r.msg_time_iso, r.text, r.msg_time_utc)
+              + daily_counts.bucket(r.msg_time_utc) for hk, r in staged.items()]
+    bump_sql = daily_counts.bump_sql("""
+        SELECT s.steamid64, s.day_utc, s.local_day, s.msg_utc
+        FROM #slurs_msg_stage AS s JOIN #slurs_msg_new AS i ON i.hash_key = s.hash_key
+    """)
+    inserted = 0
+    n_batches = (len(params) + batch_size - 1) // batch_size
+    t0 = time.perf_counter()
+    with get_conn() as conn, conn.cursor() as cur:
+        rollup = daily_counts.exists(conn)
+        output = "OUTPUT inserted.hash_key INTO #slurs_msg_new(hash_key)" if rollup else ""
+        move_sql = f"""
+        INSERT INTO {table} (message_id, steamid64, logid, msg_time_utc, text, hash_key)
+        {output}
+        SELECT s.message_id, s.steamid64, s.logid, s.msg_time_iso, s.text, s.hash_key
+        FROM #slurs_msg_stage AS s
+        WHERE NOT EXISTS (SELECT 1 FROM {table} AS t WHERE t.hash_key = s.hash_key)
+        """
+        cur.execute("""
+            IF OBJECT_ID('tempdb..#slurs_msg_new') IS NOT NULL DROP TABLE #slurs_msg_new;
+            CREATE TABLE #slurs_msg_new(hash_key VARCHAR(64) NOT NULL PRIMARY KEY);
+            IF OBJECT_ID('tempdb..#slurs_msg_stage') IS NOT NULL DROP TABLE #slurs_msg_stage;
+            CREATE TABLE #slurs_msg_stage(
+              hash_key     VARCHAR(64)    NOT NULL PRIMARY KEY,
+              message_id   NVARCHAR(200)  NULL,
+              steamid64    BIGINT         NOT NULL,
+              logid        BIGINT         NULL,
+              msg_time_iso NVARCHAR(40)   NOT NULL,   -- DATETIMEOFFSET-compatible ISO, converted on insert
+              text         NVARCHAR(MAX)  NOT NULL,
+              msg_utc      DATETIME2(7)   NOT NULL,   -- rollup bucket: UTC time, UTC day, DISPLAY_TZ day
+              day_utc      DATE           NOT NULL,
+              local_day    DATE           NOT NULL
+            );
+        """)
+        cur.fast_executemany = True
+        for b in range(n_batches):
+            part = params[b * batch_size:(b + 1) * batch_size]
+            cur.execute("TRUNCATE TABLE #slurs_msg_stage; TRUNCATE TABLE #slurs_msg_new;")
+            cur.executemany(
+                "INSERT INTO #slurs_msg_stage(hash_key, message_id, steamid64, logid, msg_time_iso, text, "
+                "msg_utc, day_utc, local_day) VALUES (?,?,?,?,?,?,?,?,?)", part)
+            cur.execute(move_sql)
+            n = max(0, cur.rowcount)
+            inserted += n
+            if rollup and n:
+                cur.execute(bump_sql)
+            conn.commit()
+            if n_batches > 1:
+                done = min(len(params), (b + 1) * batch_size)
+                logger.info("Upsert: batch %d/%d staged=%d inserted=%d (%.0f rows/s)",
+                            b + 1, n_batches, done, inserted, done / max(1e-6, time.perf_counter() - t0))
+        cur.execute("DROP TABLE #slurs_msg_stage; DROP TABLE #slurs_msg_new;")
+
+    logger.info("Upsert: inserted=%d of %d distinct in %.2fs%s", inserted, len(params), time.perf_counter() - t0,
+                f", skipped_invalid={skipped}" if skipped else "")
     return inserted
 
+# ---- per-player ingest watermarks ----
+def ensure_player_state(conn, table: str = "dbo.slurs_player_state") -> None:
+    """
+    Create the per-steamid64 high-water-mark table if missing:
+      steamid64 bigint PK, last_msg_utc datetime2 (newest message seen),
+      last_poll_utc datetime2 (upper bound of the last successful poll).
+    """
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            IF OBJECT_ID('{table}') IS NULL
+            BEGIN
+              CREATE TABLE {table}(
+                steamid64     BIGINT       NOT NULL PRIMARY KEY,
+                last_msg_utc  DATETIME2(3) NULL,
+                last_poll_utc DATETIME2(3) NULL,
+                updated_at    DATETIME2(3) NOT NULL DEFAULT SYSUTCDATETIME()
+              );
+            END
+        """)
+    conn.commit()
+
+def get_player_watermarks(conn, table: str = "dbo.slurs_player_state") -> Dict[int, Dict[str, Any]]:
+    """
+    Returns {steamid64: {'last_msg_utc': datetime|None, 'last_poll_utc': datetime|None}} (naive UTC).
+    Empty dict if the table does not exist yet.
+    """
+    out: Dict[int, Dict[str, Any]] = {}
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            IF OBJECT_ID('{table}') IS NULL
+                SELECT CAST(NULL AS BIGINT), CAST(NULL AS DATETIME2(3)), CAST(NULL AS DATETIME2(3)) WHERE 1=0
+            ELSE
+                SELECT steamid64, last_msg_utc, last_poll_utc FROM {table}
+        """)
+        for sid, last_msg, last_poll in cur.fetchall():
+            out[int(sid)] = {"last_msg_utc": last_msg, "last_poll_utc": last_poll}
+    return out
+
+def update_player_watermarks(conn, updates: Iterable[Tuple[int, Optional[Any], Any]],
+                             table: str = "dbo.slurs_player_state") -> int:
+    """
+    updates: (steamid64, newest_msg_utc or None, poll_utc) per polled player (naive UTC datetimes).
+    last_msg_utc only ever moves forward; last_poll_utc is set to poll_utc. Commits once.
+    """
+    params = [(int(sid), last_msg, poll) for sid, last_msg, poll in updates]
+    if not params:
+        return 0
+    sql = f"""
+    MERGE {table} AS tgt
+    USING (SELECT CAST(? AS BIGINT) AS steamid64,
+                  CAST(? AS DATETIME2(3)) AS last_msg_utc,
+                  CAST(? AS DATETIME2(3)) AS last_poll_utc) AS src
+    ON (tgt.steamid64 = src.steamid64)
+    WHEN MATCHED THEN
+      UPDATE SET
+        tgt.last_msg_utc  = CASE WHEN src.last_msg_utc IS NOT NULL
+                                  AND (tgt.last_msg_utc IS NULL OR src.last_msg_utc > tgt.last_msg_utc)
+                                 THEN src.last_msg_utc ELSE tgt.last_msg_utc END,
+        tgt.last_poll_utc = src.last_poll_utc,
+        tgt.updated_at    = SYSUTCDATETIME()
+    WHEN NOT MATCHED THEN
+      INSERT (steamid64, last_msg_utc, last_poll_utc, updated_at)
+      VALUES (src.steamid64, src.last_msg_utc, src.last_poll_utc, SYSUTCDATETIME());
+    """
+    with conn.cursor() as cur:
+        cur.executemany(sql, params)
+    conn.commit()
+    return len(params)
+
+def get_recent_hits(conn, days: int, table: str = "kiancat.dbo.slurs_msg") -> Dict[int, Any]:
+    """
+    Returns {steamid64: last_hit_utc} for players with any stored message in the last `days` days.
+    Range scan on msg_time_utc only; players absent from the result had no hits in the window.
+    """
+    sql = f"""
+    SELECT m.steamid64, CAST(MAX(m.msg_time_utc) AS DATETIME2(3)) AS last_hit_utc
+    FROM {table} AS m
+    WHERE m.msg_time_utc >= DATEADD(DAY, -?, SYSUTCDATETIME())
+    GROUP BY m.steamid64
+    """
+    out: Dict[int, Any] = {}
+    with conn.cursor() as cur:
+        cur.execute(sql, int(days))
+        for sid, last_hit in cur.fetchall():
+            out[int(sid)] = last_hit
+    return out
+
+# ---- pull run journal (checkpoint / resume) ----
+def ensure_pull_journal(conn) -> None:
+    """
+    dbo.slurs_pull_runs   : one row per pull (window, poll time for watermarks, status, totals)
+    dbo.slurs_pull_chunks : the planned chunks of a run; done_utc is set once the chunk's rows are committed
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            IF OBJECT_ID('dbo.slurs_pull_runs') IS NULL
+            BEGIN
+              CREATE TABLE dbo.slurs_pull_runs(
+                run_id       INT IDENTITY(1,1) PRIMARY KEY,
+                started_utc  DATETIME2(3) NOT NULL DEFAULT SYSUTCDATETIME(),
+                finished_utc DATETIME2(3) NULL,
+                status       VARCHAR(16)  NOT NULL DEFAULT 'running',
+                since_iso    VARCHAR(40)  NULL,
+                before_iso   VARCHAR(40)  NULL,
+                poll_utc     DATETIME2(3) NULL,
+                chunks_total INT NOT NULL DEFAULT 0,
+                rows_written INT NOT NULL DEFAULT 0
+              );
+            END
+            IF OBJECT_ID('dbo.slurs_pull_chunks') IS NULL
+            BEGIN
+              CREATE TABLE dbo.slurs_pull_chunks(
+                run_id       INT          NOT NULL,
+                chunk_idx    INT          NOT NULL,
+                steamids     VARCHAR(400) NOT NULL,
+                after_iso    VARCHAR(40)  NULL,
+                done_utc     DATETIME2(3) NULL,
+                pages        INT NULL,
+                rows_seen    INT NULL,
+                rows_written INT NULL,
+                CONSTRAINT PK_slurs_pull_chunks PRIMARY KEY (run_id, chunk_idx)
+              );
+            END
+        """)
+    conn.commit()
+
+def journal_start(conn, since_iso: Optional[str], before_iso: Optional[str], poll_utc: Optional[Any],
+                  plan: List[Tuple[int, List[int], Optional[str]]]) -> int:
+    """
+    Record a new run and its full chunk plan [(chunk_idx, steamids, after_iso|None)].
+    Older unfinished runs are marked 'superseded'. Returns run_id.
+    """
+    ensure_pull_journal(conn)
+    with conn.cursor() as cur:
+        cur.execute("UPDATE dbo.slurs_pull_runs SET status='superseded' WHERE status IN ('running','partial')")
+        cur.execute("""
+            INSERT INTO dbo.slurs_pull_runs(since_iso, before_iso, poll_utc, chunks_total)
+            OUTPUT INSERTED.run_id
+            VALUES (?,?,?,?)
+        """, since_iso, before_iso, poll_utc, len(plan))
+        run_id = int(cur.fetchone()[0])
+        if plan:
+            try:
+                cur.fast_executemany = True
+            except Exception:
+                pass
+            cur.executemany(
+                "INSERT INTO dbo.slurs_pull_chunks(run_id, chunk_idx, steamids, after_iso) VALUES (?,?,?,?)",
+                [(run_id, idx, ",".join(map(str, ids)), after) for idx, ids, after in plan],
+            )
+    conn.commit()
+    return run_id
+
+def journal_open_run(conn) -> Optional[Dict[str, Any]]:
+    """
+    Latest unfinished run ('running' or 'partial') with its pending chunks, or None:
+      {'run_id', 'since_iso', 'before_iso', 'poll_utc', 'chunks_total',
+       'pending': [(chunk_idx, [steamids], after_iso|None), ...]}
+    """
+    ensure_pull_journal(conn)
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT TOP 1 run_id, since_iso, before_iso, poll_utc, chunks_total
+            FROM dbo.slurs_pull_runs
+            WHERE status IN ('running','partial')
+            ORDER BY run_id DESC
+        """)
+        row = cur.fetchone()
+        if not row:
+            return None
+        run = {"run_id": int(row[0]), "since_iso": row[1], "before_iso": row[2],
+               "poll_utc": row[3], "chunks_total": int(row[4] or 0), "pending": []}
+        cur.execute("""
+            SELECT chunk_idx, steamids, after_iso
+            FROM dbo.slurs_pull_chunks
+            WHERE run_id = ? AND done_utc IS NULL
+            ORDER BY chunk_idx
+        """, run["run_id"])
+        for idx, ids, after in cur.fetchall():
+            sids = [int(x) for x in str(ids).split(",") if x.strip().isdigit()]
+            run["pending"].append((int(idx), sids, after))
+    return run
+
+def journal_mark_done(conn, run_id: int, done: Iterable[Tuple[int, int, int, int]]) -> int:
+    """done: (chunk_idx, pages, rows_seen, rows_written) for chunks whose rows are committed."""
+    params = [(int(p), int(s), int(w), int(run_id), int(i)) for i, p, s, w in done]
+    if not params:
+        return 0
+    with conn.cursor() as cur:
+        cur.executemany("""
+            UPDATE dbo.slurs_pull_chunks
+               SET done_utc = SYSUTCDATETIME(), pages = ?, rows_seen = ?, rows_written = ?
+             WHERE run_id = ? AND chunk_idx = ?
+        """, params)
+        cur.execute("""
+            UPDATE dbo.slurs_pull_runs
+               SET rows_written = (SELECT ISNULL(SUM(rows_written),0) FROM dbo.slurs_pull_chunks WHERE run_id = ?)
+             WHERE run_id = ?
+        """, int(run_id), int(run_id))
+    conn.commit()
+    return len(params)
+
+def journal_finish(conn, run_id: int) -> str:
+    """Close a run: 'done' if every chunk is committed, else 'partial' (resumable). Returns the status."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT COUNT(*) FROM dbo.slurs_pull_chunks WHERE run_id = ? AND done_utc IS NULL", int(run_id))
+        (left,) = cur.fetchone()
+        status = "done" if int(left or 0) == 0 else "partial"
+        cur.execute("UPDATE dbo.slurs_pull_runs SET status = ?, finished_utc = SYSUTCDATETIME() WHERE run_id = ?",
+                    status, int(run_id))
+    conn.commit()
+    return status
+
+# ---- problem steamids (fail with category=total; fetched alone) ----
+def ensure_problem_ids(conn, table: str = "dbo.slurs_problem_ids") -> None:
+    """steamid64 PK, first/last time a categorized request for it failed on its own, and how often."""
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            IF OBJECT_ID('{table}') IS NULL
+            BEGIN
+              CREATE TABLE {table}(
+                steamid64      BIGINT       NOT NULL PRIMARY KEY,
+                first_seen_utc DATETIME2(3) NOT NULL DEFAULT SYSUTCDATETIME(),
+                last_seen_utc  DATETIME2(3) NOT NULL DEFAULT SYSUTCDATETIME(),
+                failures       INT          NOT NULL DEFAULT 1
+              );
+            END
+        """)
+    conn.commit()
+
+def get_problem_ids(conn, min_failures: int = 2, ttl_days: int = 30,
+                    table: str = "dbo.slurs_problem_ids") -> Set[int]:
+    """
+    Problem steamid64s to fetch alone: failed in at least min_failures runs, the last one
+    within ttl_days (0 = no expiry). Empty set if the table does not exist yet.
+    """
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            IF OBJECT_ID('{table}') IS NULL
+                SELECT CAST(NULL AS BIGINT) WHERE 1=0
+            ELSE
+                SELECT steamid64 FROM {table}
+                WHERE failures >= ?
+                  AND (? <= 0 OR last_seen_utc >= DATEADD(day, -?, SYSUTCDATETIME()))
+        """, int(min_failures), int(ttl_days), int(ttl_days))
+        return {int(r[0]) for r in cur.fetchall()}
+
+def record_problem_ids(conn, steamids: Iterable[int], ttl_days: int = 30,
+                       table: str = "dbo.slurs_problem_ids") -> int:
+    """
+    Insert new problem IDs or bump last_seen_utc/failures on known ones; call once per run.
+    A failure count older than ttl_days (0 = no expiry) starts over at 1. Commits once.
+    """
+    params = [(int(s), int(ttl_days), int(ttl_days)) for s in sorted(set(int(x) for x in steamids))]
+    if not params:
+        return 0
+    ensure_problem_ids(conn, table)
+    sql = f"""
+    MERGE {table} AS tgt
+    USING (SELECT CAST(? AS BIGINT) AS steamid64) AS src
+    ON (tgt.steamid64 = src.steamid64)
+    WHEN MATCHED THEN
+      UPDATE SET tgt.failures = CASE WHEN ? > 0 AND tgt.last_seen_utc < DATEADD(day, -?, SYSUTCDATETIME())
+                                     THEN 1 ELSE tgt.failures + 1 END,
+                 tgt.last_seen_utc = SYSUTCDATETIME()
+    WHEN NOT MATCHED THEN
+      INSERT (steamid64) VALUES (src.steamid64);
+    """
+    with conn.cursor() as cur:
+        cur.executemany(sql, params)
+    conn.commit()
+    return len(params)
+
+def clear_problem_ids(conn, steamids: Iterable[int], table: str = "dbo.slurs_problem_ids") -> int:
+    """Forget problem IDs that fetched fine with category on their own. Commits once."""
+    params = [(int(s),) for s in sorted(set(int(x) for x in steamids))]
+    if not params:
+        return 0
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT OBJECT_ID('{table}')")
+        (exists,) = cur.fetchone()
+        if exists is None:
+            return 0
+        cur.executemany(f"DELETE FROM {table} WHERE steamid64 = ?", params)
+    conn.commit()
+    return len(params)
+
 # ---- ozfortress players upsert ----
 def get_max_oz_id(conn) -> int:
     """
@@ -197,7 +809,9 @@ def get_max_oz_id(conn) -> int:
         except Exception:
             return 0
 
-def upsert_oz_players(conn, rows: List[Dict[str, Any]]) -> int:
+OZ_UPSERT_BATCH = int(os.getenv("OZF_UPSERT_BATCH", "50"))
+
+def upsert_oz_players(conn, rows: List[Dict[str, Any]], batch_size: Optional[int] = None) -> int:
     """
     rows: list of dicts with:
       {'oz_id':str|int, 'steamid64':str(17) or None,
@@ -205,19 +819,35 @@ def upsert_oz_players(conn, rows: List[Dict[str, Any]]) -> int:
 
     Upserts on oz_id. Ensures current_name is NEVER NULL (uses 'ozf_user_<oz_id>' fallback).
     Skips rows without a steamid64.
+
+    Rows are staged in #oz_players_stage (fast_executemany) and applied with one MERGE and one
+    commit per batch of batch_size (OZF_UPSERT_BATCH, default 50). A repeated oz_id keeps its
+    last row. Returns the number of rows with a steamid64, as the per-row version did.
     """
     if not rows:
         return 0
 
+    params: Dict[int, tuple] = {}
+    count = 0
+    for r in rows:
+        oz_id = r.get("oz_id")
+        steamid = r.get("steamid64")
+        if not steamid:
+            # No steam ID, nothing to store (skip)
+            continue
+        name = (r.get("current_name") or "").strip()
+        if not name:
+            name = f"ozf_user_{oz_id}"
+        params.pop(int(oz_id), None)  # last one wins, in input order
+        params[int(oz_id)] = (int(oz_id), str(steamid), name,
+                              (r.get("oz_profile_url") or None), (r.get("steam_profile_url") or None))
+        count += 1
+    if not params:
+        return 0
+
     sql = """
     MERGE kian.oz.players AS tgt
-    USING (SELECT
-             CAST(? AS BIGINT)  AS oz_id,
-             ?                   AS steamid64,
-             ?                   AS current_name,
-             ?                   AS oz_profile_url,
-             ?                   AS steam_profile_url
-           ) AS src
+    USING #oz_players_stage AS src
     ON (tgt.oz_id = src.oz_id)
     WHEN MATCHED THEN
       UPDATE SET
@@ -238,35 +868,27 @@ def upsert_oz_players(conn, rows: List[Dict[str, Any]]) -> int:
               SYSUTCDATETIME(), SYSUTCDATETIME());
     """
 
-    count = 0
+    batch_size = max(1, int(batch_size or OZ_UPSERT_BATCH))
+    todo = list(params.values())
     with conn.cursor() as cur:
-        try:
-            cur.fast_executemany = True
-        except Exception:
-            pass
-
-        for r in rows:
-            oz_id = r.get("oz_id")
-            steamid = r.get("steamid64")
-            if not steamid:
-                # No steam ID, nothing to store (skip)
-                continue
-
-            nm = r.get("current_name") or ""
-            name = nm.strip()
-            if not name:
-                name = f"ozf_user_{oz_id}"
-
-            cur.execute(
-                sql,
-                str(oz_id),
-                str(steamid),
-                name,
-                (r.get("oz_profile_url") or None),
-                (r.get("steam_profile_url") or None),
-            )
-            count += 1
-
-        conn.commit()
+        cur.execute("""
+            IF OBJECT_ID('tempdb..#oz_players_stage') IS NOT NULL DROP TABLE #oz_players_stage;
+            CREATE TABLE #oz_players_stage(
+              oz_id             BIGINT         NOT NULL PRIMARY KEY,
+              steamid64         NVARCHAR(32)   NOT NULL,
+              current_name      NVARCHAR(4000) NOT NULL,
+              oz_profile_url    NVARCHAR(2000) NULL,
+              steam_profile_url NVARCHAR(2000) NULL
+            );
+        """)
+        cur.fast_executemany = True
+        for k in range(0, len(todo), batch_size):
+            cur.execute("TRUNCATE TABLE #oz_players_stage")
+            cur.executemany(
+                "INSERT INTO #oz_players_stage(oz_id, steamid64, current_name, oz_profile_url, steam_profile_url) "
+                "VALUES (?,?,?,?,?)", todo[k:k + batch_size])
+            cur.execute(sql)
+            conn.commit()
+        cur.execute("DROP TABLE #oz_players_stage")
 
     return count
@@ -20,7 +20,6 @@ import logging
 from typing import Optional, List, Dict, Tuple
 from datetime import datetime, timedelta, timezone
 
-import requests
 import discord
 from discord import ui
 
@@ -29,6 +28,7 @@ from env_loader import load as load_env
 load_env()
 
 import db  # your existing db.get_conn()
+import http_client
 
 # ---------- logging ----------
 logger = logging.getLogger("slursbot")
@@ -204,7 +204,7 @@ def fetch_messages_player(conn, steam64: int, contains: Optional[str], since_day
 def fetch_team_members(team_id: int, timeout: int = 20) -> List[Dict]:
     """Scrape https://ozfortress.com/teams/<team_id> to list players on that team."""
     url = f"https://ozfortress.com/teams/{team_id}"
-    r = requests.get(url, headers=HTTP_HEADERS, timeout=timeout)
+    r = http_client.get(url, headers=HTTP_HEADERS, timeout=timeout)
     if r.status_code == 404:
         return []
     r.raise_for_status()
@@ -1,5 +1,8 @@
 # discord_webhook.py — admin/public embeds: daily offenders, no-offenders notice, and roster summary
-import os, time, logging, requests
+import os, time, logging
+import http_client
+import daily_counts
+import artifacts
 
 logger = logging.getLogger("slursbot.discord")
 
@@ -19,17 +22,20 @@ def _public_url():
         if u: return u
     return ""
 
-def _post(url, payload):
+def _post(url, payload) -> bool:
+    """POST payload to a webhook; True if Discord accepted it (failures are logged, not raised)."""
     if not url:
         logger.warning("Discord webhook URL missing; skipping post.")
-        return
+        return False
     try:
-        r = requests.post(url, json=payload, timeout=20)
+        r = http_client.post(url, json=payload, timeout=20)
         if r.status_code >= 300:
             logger.warning("Discord webhook %s -> HTTP %s body=%s", url, r.status_code, r.text[:300])
         time.sleep(0.25)
+        return r.status_code < 300
     except Exception as e:
         logger.warning("Discord webhook post failed: %s", e)
+        return False
 
 # ---------- colors ----------
 def _blue():  return int("0x7DD3FC",16)   # sky-300
@@ -81,8 +87,32 @@ def post_admin_roster_summary(conn, checked: int, changed: int):
     _post(url, payload)
 
 # ---------- Daily offenders helpers ----------
-def _fetch_daily_offenders(conn):
-    sql = """
+def _fetch_daily_offenders(conn, now=None):
+    if daily_counts.exists(conn):
+        counts, params = daily_counts.counts_sql(daily_counts.last_days([1, 180], now), all_col=None, bounds=False)
+        sql = f"""
+        SELECT v.current_name, v.oz_id, a.steamid64, a.c1, a.c180
+        FROM ({counts}) AS a
+        JOIN kian.oz.v_players_clean AS v
+          ON v.steamid64_bigint = a.steamid64
+        WHERE a.c1 > 0
+        ORDER BY a.c1 DESC, v.current_name ASC;
+        """
+    else:
+        sql, params = _DAILY_OFFENDERS_SCAN, None
+    out = []
+    with conn.cursor() as cur:
+        if params:
+            cur.execute(sql, params)
+        else:
+            cur.execute(sql)
+        cols = [d[0] for d in cur.description]
+        for row in cur.fetchall():
+            out.append({cols[i]: row[i] for i in range(len(cols))})
+    return out
+
+# pre-rollup query (until `rollup-rebuild` has created slurs_daily_counts)
+_DAILY_OFFENDERS_SCAN = """
     WITH day_rows AS (
       SELECT m.steamid64,
              CAST(m.msg_time_utc AS datetime2(3)) AS msg_time_utc,
@@ -111,13 +141,6 @@ def _fetch_daily_offenders(conn):
     WHERE a.c1 > 0
     ORDER BY a.c1 DESC, v.current_name ASC;
     """
-    out = []
-    with conn.cursor() as cur:
-        cur.execute(sql)
-        cols = [d[0] for d in cur.description]
-        for row in cur.fetchall():
-            out.append({cols[i]: row[i] for i in range(len(cols))})
-    return out
 
 def _fetch_daily_messages_for(conn, steamid64: int):
     sql = """
@@ -170,20 +193,31 @@ def _chunk(base, lines, limit=3900):
     return embeds
 
 # ---------- Admin daily per-player ----------
-def post_daily_player_embeds(conn):
+def post_daily_player_embeds(conn, ctx=None, state=None):
+    """
+    One embed per offender (split to fit) on the admin webhook, or a no-offenders notice.
+    With an artifacts.ArtifactState, skipped when the offenders are unchanged since the last
+    post ("discord-admin"); it only counts as posted once every embed went through.
+    """
     url=_admin_url()
     if not url:
         logger.warning("ADMIN webhook missing; set ADMIN_WEBHOOK")
         return
-    offenders=_fetch_daily_offenders(conn)
+    offenders=ctx.daily_offenders(conn) if ctx is not None else _fetch_daily_offenders(conn)
+    if not artifacts.needs(state, "discord-admin", lambda: artifacts.digest(offenders)):
+        logger.info("admin embeds: offenders unchanged since the last post; not re-posted")
+        return
     if not offenders:
-        _post(url, {"embeds":[{
+        if _post(url, {"embeds":[{
             "title":"OZF — Daily Report",
             "description":"No OZF players recorded any flagged messages in the last 24 hours.",
             "color": _green()
-        }]})
+        }]}):
+            artifacts.done(state, "discord-admin")
         return
 
+    ok=True
+
     for o in offenders:
         name=o["current_name"] or "(unknown)"
         ozid=o["oz_id"]; sid=o["steamid64"]
@@ -204,16 +238,27 @@ def post_daily_player_embeds(conn):
             "footer":{"text":f"steamid64: {sid}"}
         }
         for em in _chunk(base, lines):
-            _post(url, {"embeds":[em]})
+            ok=_post(url, {"embeds":[em]}) and ok
+    if ok:
+        artifacts.done(state, "discord-admin")
 
 # ---------- Public digest ----------
-def post_public_digest(conn, top_n: int = 10):
+def post_public_digest(conn, top_n: int = 10, ctx=None, state=None):
+    """
+    Top offenders embed on the public webhook. With an artifacts.ArtifactState, skipped when
+    the top_n offenders are unchanged since the last successful post ("discord-public:<top_n>").
+    """
     url = _public_url()
-    offenders = _fetch_daily_offenders(conn)
+    offenders = ctx.daily_offenders(conn) if ctx is not None else _fetch_daily_offenders(conn)
     if not offenders:
         logger.info("public digest: no offenders; skipping post.")
         return
-    offenders = offenders[: max(1, min(int(top_n), 25))]
+    top_n = max(1, min(int(top_n), 25))
+    offenders = offenders[:top_n]
+    post_name = f"discord-public:{top_n}"
+    if not artifacts.needs(state, post_name, lambda: artifacts.digest(offenders)):
+        logger.info("public digest: top %d unchanged since the last post; not re-posted", top_n)
+        return
     lines=[]
     for o in offenders:
         name=o["current_name"] or "(unknown)"
@@ -221,7 +266,8 @@ def post_public_digest(conn, top_n: int = 10):
         oz=f"https://ozfortress.com/users/{ozid}" if ozid else "#"
         st=f"https://slurs.tf/player?steamid={o['steamid64']}"
         lines.append(f"[{name}]({oz}) — **{c1}** today • **{c180}** in 180d · [slurs.tf]({st})")
-    _post(url, {"embeds":[{"title":"OZF — Daily Top Offenders","description":"\n".join(lines),"color":_blue()}]})
+    if _post(url, {"embeds":[{"title":"OZF — Daily Top Offenders","description":"\n".join(lines),"color":_blue()}]}):
+        artifacts.done(state, post_name)
 
 def post_error(text: str):
     url=_admin_url() or _public_url()
@@ -233,7 +279,7 @@ def post_error(text: str):
 
 
 # --- image report posting helpers ---
-import os, requests #alr in but no point not having it again.
+import os #alr in but no point not having it again.
 
 def _choose_webhook(channel: str = "public") -> str:
     """
@@ -263,7 +309,7 @@ def post_report_images_local(png_paths, channel: str = "public", message: str |
     for i, path in enumerate(png_paths):
         files.append(("files[%d]" % i, (os.path.basename(path), open(path, "rb"), "image/png")))
     data = {"content": message or ""}
-    r = requests.post(url, data=data, files=files, timeout=60)
+    r = http_client.post(url, data=data, files=files, timeout=60)
     r.raise_for_status()
 
 def post_report_image_urls(image_urls, channel: str = "public", message: str | None = None) -> None:
@@ -277,5 +323,5 @@ def post_report_image_urls(image_urls, channel: str = "public", message: str | N
             "content": message or "",
             "embeds": [{"image": {"url": img}}]
         }
-        r = requests.post(url, json=data, timeout=30)
+        r = http_client.post(url, json=data, timeout=30)
         r.raise_for_status()
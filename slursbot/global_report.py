@@ -11,6 +11,8 @@ import pandas as pd
 from datetime import datetime, timezone
 from zoneinfo import ZoneInfo
 
+import daily_counts
+
 # Display timezone for human readable timestamps
 LOCAL_TZ = ZoneInfo("Australia/Adelaide")
 
@@ -147,15 +149,45 @@ def make_reports(sql_conn, out_dir: str, tz_name: str, window_days: int):
     ) AS pl;
     """
 
+    # Same data from the daily rollup (one grouped query instead of five scans), once it exists
+    q_map_rollup = f"""
+    SELECT d.steamid64, pl.oz_id, pl.player_id, pl.current_name
+    FROM (SELECT DISTINCT steamid64 FROM {daily_counts.TABLE}) AS d
+    OUTER APPLY (
+        SELECT TOP (1) oz_id, player_id, current_name
+        FROM kian.oz.players p2
+        WHERE TRY_CONVERT(BIGINT, p2.steamid64) = d.steamid64
+        ORDER BY p2.updated_at DESC, p2.last_checked_at DESC, p2.created_at DESC
+    ) AS pl;
+    """
+
+    def counts_from_rollup(conn):
+        counts, params = daily_counts.counts_sql(daily_counts.last_days([180, 30, 7, 1], open_end=True),
+                                                 all_col=None)
+        q = f"""
+        SELECT c.steamid64, c.c180, c.c30, c.c7, c.c1,
+               CONVERT(VARCHAR(33), TODATETIMEOFFSET(c.first_hit_utc, '+00:00'), 127) AS first_hit_utc_iso,
+               CONVERT(VARCHAR(33), TODATETIMEOFFSET(c.last_hit_utc, '+00:00'), 127) AS last_hit_utc_iso
+        FROM ({counts}) AS c;
+        """
+        df = pd.read_sql(q, conn, params=params)
+        bounds = df[["steamid64", "first_hit_utc_iso", "last_hit_utc_iso"]]
+        df = df[df["c180"] > 0]
+        return [df[["steamid64", c]] for c in ("c1", "c7", "c30", "c180")] + [bounds]
+
     # -------------------- EXECUTE --------------------
     with sql_conn as conn:
         df_matches = pd.read_sql(q_matches, conn, params=[window_days])
-        s24  = count_since(1)
-        s7   = count_since(7)
-        s30  = count_since(30)
-        s180 = count_since(180)
-        bounds = pd.read_sql(q_bounds, conn)
-        ozmap  = pd.read_sql(q_map, conn)
+        if daily_counts.exists(conn):
+            s24, s7, s30, s180, bounds = counts_from_rollup(conn)
+            ozmap = pd.read_sql(q_map_rollup, conn)
+        else:
+            s24  = count_since(1)
+            s7   = count_since(7)
+            s30  = count_since(30)
+            s180 = count_since(180)
+            bounds = pd.read_sql(q_bounds, conn)
+            ozmap  = pd.read_sql(q_map, conn)
 
     # -------------------- TRANSFORM: MATCHES --------------------
     if not df_matches.empty:
@@ -0,0 +1,156 @@
+# http_client.py — one keep-alive requests.Session shared by every outbound client
+# - Per-host connection pools (pool size), default timeouts and headers
+# - Thread-safe for the concurrent slurs.tf fetcher
+# - Reports connections opened vs reused so handshake savings are visible in the run log
+from __future__ import annotations
+
+import os
+import logging
+import threading
+import urllib.parse
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger("slursbot")
+
+
+@dataclass
+class HostConfig:
+    pool_maxsize: int = 4
+    timeout_s: float = 30.0
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+def _int_env(key: str, default: int) -> int:
+    try:
+        return int(os.getenv(key, str(default)))
+    except Exception:
+        return default
+
+
+def _slurs_host() -> str:
+    base = os.getenv("SLURS_API_BASE", "https://slurs.tf").rstrip("/")
+    return urllib.parse.urlsplit(base).netloc or "slurs.tf"
+
+
+_OZF_HEADERS = {
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Referer": "https://ozfortress.com/",
+}
+
+
+def _host_configs() -> Dict[str, HostConfig]:
+    return {
+        _slurs_host(): HostConfig(
+            # at least one connection per fetch worker, or workers queue on the pool
+            pool_maxsize=max(_int_env("SLURS_WORKERS", 4), _int_env("HTTP_POOL_SLURS", 8)),
+            timeout_s=float(os.getenv("SLURS_HTTP_TIMEOUT_S", "25")),
+            headers={"User-Agent": f"ozf-slursbot/{os.getenv('SLURSBOT_VERSION', 'dev')}"},
+        ),
+        "ozfortress.com": HostConfig(
+            pool_maxsize=_int_env("HTTP_POOL_OZF", 2),
+            timeout_s=30.0,
+            headers=dict(_OZF_HEADERS, **{"User-Agent": "slursbot/1.1 (+ozfortress roster refresh)"}),
+        ),
+        "discord.com": HostConfig(pool_maxsize=2, timeout_s=20.0),
+        "discordapp.com": HostConfig(pool_maxsize=2, timeout_s=20.0),
+    }
+
+
+_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+_hosts: Dict[str, HostConfig] = {}
+_adapters: Dict[str, HTTPAdapter] = {}
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide session, building it (and its per-host adapters) on first use."""
+    global _session, _hosts
+    if _session is not None:
+        return _session
+    with _lock:
+        if _session is None:
+            s = requests.Session()
+            _hosts = _host_configs()
+            for host, cfg in _hosts.items():
+                ad = HTTPAdapter(pool_connections=1, pool_maxsize=cfg.pool_maxsize, pool_block=False)
+                s.mount(f"https://{host}/", ad)
+                s.mount(f"http://{host}/", ad)
+                _adapters[host] = ad
+            default = HTTPAdapter(pool_connections=4, pool_maxsize=_int_env("HTTP_POOL_DEFAULT", 4))
+            s.mount("https://", default)
+            s.mount("http://", default)
+            _adapters["*"] = default
+            _session = s
+    return _session
+
+
+def _host_config(url: str) -> HostConfig:
+    host = urllib.parse.urlsplit(url).netloc.lower()
+    cfg = _hosts.get(host)
+    if cfg is None and host.startswith("www."):
+        cfg = _hosts.get(host[4:])
+    return cfg or HostConfig()
+
+
+def request(method: str, url: str, *, headers: Optional[Dict[str, str]] = None,
+            timeout: Optional[float] = None, **kwargs: Any) -> requests.Response:
+    """Like requests.request, with the host's default headers/timeout applied."""
+    sess = get_session()
+    cfg = _host_config(url)
+    hdrs = dict(cfg.headers)
+    if headers:
+        hdrs.update(headers)
+    return sess.request(method, url, headers=hdrs,
+                        timeout=timeout if timeout is not None else cfg.timeout_s, **kwargs)
+
+
+def get(url: str, **kwargs: Any) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs: Any) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+# -------------------------
+# Connection stats
+# -------------------------
+def connection_stats() -> Dict[str, Dict[str, int]]:
+    """
+    Per-host {requests, opened, reused} from the urllib3 pools behind each adapter.
+    'opened' is a full TCP+TLS handshake; 'reused' went over a kept-alive socket.
+    """
+    out: Dict[str, Dict[str, int]] = {}
+    if _session is None:
+        return out
+    seen = set()
+    for ad in _adapters.values():
+        if id(ad) in seen:
+            continue
+        seen.add(id(ad))
+        pools = ad.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host = getattr(pool, "host", "?")
+            st = out.setdefault(host, {"requests": 0, "opened": 0, "reused": 0})
+            n_req = int(getattr(pool, "num_requests", 0))
+            n_conn = int(getattr(pool, "num_connections", 0))
+            st["requests"] += n_req
+            st["opened"] += n_conn
+            st["reused"] += max(0, n_req - n_conn)
+    return out
+
+
+def log_connection_stats(label: str = "http") -> None:
+    for host, st in sorted(connection_stats().items()):
+        logger.info("%s pool %s: requests=%d opened=%d reused=%d",
+                    label, host, st["requests"], st["opened"], st["reused"])
+
+
+__all__ = ["HostConfig", "get_session", "request", "get", "post", "connection_stats", "log_connection_stats"]
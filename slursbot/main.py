@@ -3,18 +3,28 @@
 
 import os
 import sys
+import time
+import queue
 import argparse
 import logging
+import threading
 from datetime import datetime, timedelta, timezone, time as dtime
 from typing import Optional, List, Tuple
 from pathlib import Path
 
 import db
+import artifacts
 import slurs_api
 import report
 import discord_webhook
 import ozf_roster
 import report_images
+import http_client
+import matcher
+import scheduler
+import daily_counts
+from rows import MessageRow
+from run_context import RunContext
 
 from env_loader import load as load_env
 
@@ -95,46 +105,27 @@ def iso_local_window_adelaide_22h() -> Tuple[str, str]:
     )
 
 # ---- allowlist / lexicon (post-fetch, pre-write) ----
-import re
-try:
-    import yaml
-except Exception:
-    yaml = None
+def _load_allowlist_config() -> dict:
+    """
+    Read ALLOWLIST_PATH / LEXICON_PATH / ALLOWLIST_DROP and fetch both cached matchers.
+    Matchers are rebuilt only when a word list file changes, so this is cheap to call.
+    """
+    allow_path = os.getenv("ALLOWLIST_PATH", "allowlist.yaml")
+    lex_path   = os.getenv("LEXICON_PATH",   "lexicon.yaml")
+    do_drop    = os.getenv("ALLOWLIST_DROP", "0").strip().lower() in {"1","true","yes","on"}
 
-def _load_word_list_yaml(path: str, keys=("words", "allow", "allowlist")) -> list[str]:
-    if not path:
-        return []
-    try:
-        if yaml is None:
-            logger.warning("PyYAML not installed; cannot load %s", path)
-            return []
-        if not os.path.exists(path):
-            return []
-        with open(path, "r", encoding="utf-8") as f:
-            doc = yaml.safe_load(f)
-        words: list[str] = []
-        if isinstance(doc, list):
-            words = [str(x).strip().lower() for x in doc if str(x).strip()]
-        elif isinstance(doc, dict):
-            for k in keys:
-                if isinstance(doc.get(k), list):
-                    words.extend([str(x).strip().lower() for x in doc[k] if str(x).strip()])
-        return sorted(set(words))
-    except Exception as e:
-        logger.warning("Failed to load %s: %s", path, e)
-        return []
+    allow = matcher.get_matcher(allow_path, keys=matcher.ALLOWLIST_KEYS)
+    lexicon = matcher.get_matcher(lex_path, keys=matcher.LEXICON_KEYS)
 
-def _compile_word_re(words: list[str]) -> re.Pattern | None:
-    if not words:
-        return None
-    pat = r"\b(?:" + "|".join(re.escape(w) for w in words) + r")\b"
-    try:
-        return re.compile(pat, re.IGNORECASE)
-    except Exception as e:
-        logger.warning("Regex compile failed: %s", e)
-        return None
+    return {
+        "do_drop": do_drop,
+        "allow_terms": len(allow),
+        "lex_terms": len(lexicon),
+        "allow": allow if allow else None,
+        "lexicon": lexicon if lexicon else None,
+    }
 
-def _apply_allowlist_filter(rows: list[dict]) -> tuple[list[dict], dict]:
+def _apply_allowlist_filter(rows: List[MessageRow], cfg: Optional[dict] = None) -> tuple[List[MessageRow], dict]:
     """
     Keep rows that:
       - contain any 'slur' from lexicon (always keep), OR
@@ -147,41 +138,41 @@ def _apply_allowlist_filter(rows: list[dict]) -> tuple[list[dict], dict]:
       ALLOWLIST_PATH (default 'allowlist.yaml')
       LEXICON_PATH   (default 'lexicon.yaml')
       ALLOWLIST_DROP (default '0' = off; set '1' to drop)
-    """
-    allow_path = os.getenv("ALLOWLIST_PATH", "allowlist.yaml")
-    lex_path   = os.getenv("LEXICON_PATH",   "lexicon.yaml")
-    do_drop    = os.getenv("ALLOWLIST_DROP", "0").strip().lower() in {"1","true","yes","on"}
-
-    allow_words = _load_word_list_yaml(allow_path, keys=("words","allow","allowlist"))
-    lex_words   = _load_word_list_yaml(lex_path,   keys=("words","terms","slurs","deny","denylist"))
 
-    allow_re = _compile_word_re(allow_words) if allow_words else None
-    slur_re  = _compile_word_re(lex_words)   if lex_words else None
+    Pass cfg from _load_allowlist_config() to reuse the same matchers across batches.
+    """
+    if cfg is None:
+        cfg = _load_allowlist_config()
+    allow = cfg["allow"]
+    lexicon = cfg["lexicon"]
 
-    if not do_drop or (allow_re is None):
-        return rows, {"enabled": False, "allow_terms": len(allow_words), "lex_terms": len(lex_words), "dropped": 0, "kept": len(rows)}
+    if not cfg["do_drop"] or (allow is None):
+        return rows, {"enabled": False, "allow_terms": cfg["allow_terms"], "lex_terms": cfg["lex_terms"], "dropped": 0, "kept": len(rows), "allow_hits": {}}
 
-    kept: list[dict] = []
+    kept: List[MessageRow] = []
     dropped = 0
+    allow_hits: dict[str, int] = {}
 
     for r in rows:
-        msg = (r.get("message") or r.get("text") or "")
-        t = str(msg)
+        t = r.text
 
         # If any lexicon slur appears, keep
-        if slur_re is not None and slur_re.search(t):
+        if lexicon is not None and lexicon.search(t):
             kept.append(r)
             continue
 
         # Else, allowlist word present -> drop
-        if allow_re.search(t):
+        hits = allow.matches(t)
+        if hits:
             dropped += 1
+            for w in hits:
+                allow_hits[w] = allow_hits.get(w, 0) + 1
             continue
 
         # Neither -> keep
         kept.append(r)
 
-    return kept, {"enabled": True, "allow_terms": len(allow_words), "lex_terms": len(lex_words), "dropped": dropped, "kept": len(kept)}
+    return kept, {"enabled": True, "allow_terms": cfg["allow_terms"], "lex_terms": cfg["lex_terms"], "dropped": dropped, "kept": len(kept), "allow_hits": allow_hits}
 
 # ---- roster helpers ----
 STEAM64_MIN = 76561197960265728
@@ -224,34 +215,353 @@ def run_roster_refresh() -> Tuple[int, int]:
     return checked, changed
 
 # ---- pull ----
-def run_pull(since_iso: Optional[str], before_iso: Optional[str]) -> Tuple[int, int]:
+def _iso_z(dt: datetime) -> str:
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def _parse_iso_utc(s: Optional[str]) -> Optional[datetime]:
+    """ISO8601 (with 'Z' or offset) -> naive UTC datetime, or None."""
+    if not s:
+        return None
+    try:
+        dt = datetime.fromisoformat(str(s).strip().replace("Z", "+00:00"))
+    except Exception:
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+def _write_rows(rows: List[MessageRow], raw_table: str, msg_table: str) -> Tuple[int, int, bool]:
+    """
+    Write one batch to the raw audit table and the typed table.
+    Returns (inserted_raw, upserted, ok); ok is False if the typed upsert failed.
+    """
+    inserted_raw = 0
+    upserted = 0
+    if not rows:
+        return (0, 0, True)
+    if hasattr(db, "insert_raw_rows"):
+        try:
+            inserted_raw = db.insert_raw_rows(rows, raw_table)
+        except Exception as e:
+            logger.warning("insert_raw_rows failed: %s", e)
+    else:
+        logger.warning("db.insert_raw_rows not found; skipping raw insert.")
+
+    ok = True
+    if hasattr(db, "upsert_messages"):
+        try:
+            upserted = db.upsert_messages(rows, msg_table)
+        except Exception as e:
+            logger.warning("upsert_messages failed: %s", e)
+            ok = False
+    else:
+        logger.warning("db.upsert_messages not found; typed upsert skipped.")
+    return (inserted_raw, upserted, ok)
+
+def _chunk_watermarks(res, poll_utc: datetime) -> list[tuple]:
+    """(steamid64, newest_msg_utc|None, poll_utc) for every ID in a successfully fetched chunk."""
+    newest: dict[int, datetime] = {}
+    for r in res.rows:
+        ts = newest.get(r.steamid64)
+        if ts is None or r.msg_time_utc > ts:
+            newest[r.steamid64] = r.msg_time_utc
+    return [(sid, newest.get(sid), poll_utc) for sid in res.ids]
+
+class _WriteBatch:
+    """One flush worth of rows plus the checkpoint that may only follow their commit."""
+    __slots__ = ("rows", "marks", "done", "problems", "cleared")
+
+    def __init__(self):
+        self.rows: List[MessageRow] = []
+        self.marks: list[tuple] = []
+        self.done: list[list] = []  # [chunk_idx, pages, rows_seen, rows_kept]
+        self.problems: set[int] = set()
+        self.cleared: set[int] = set()
+
+_STOP = object()
+
+def _stream_into_db(results, af_cfg: dict, poll_utc: Optional[datetime] = None,
+                    run_id: Optional[int] = None, journal_idx: Optional[List[int]] = None) -> Tuple[int, int, int]:
+    """
+    Drain an iterator of slurs_api.ChunkResult through the allowlist filter into the DB writers.
+    Rows are buffered only up to PULL_FLUSH_ROWS, so peak memory is flat whatever the window.
+    With poll_utc set, per-player watermarks for each fully fetched chunk are advanced right
+    after that chunk's rows are committed (never before), so an interrupted run resumes cleanly.
+    With run_id set, the same flush marks those chunks done in the pull journal
+    (journal_idx maps ChunkResult.index -> journal chunk_idx).
+    IDs the fetcher had to bisect out (ChunkResult.problem_ids) are recorded in
+    dbo.slurs_problem_ids at the same checkpoint, so later runs chunk them alone; isolated
+    ones that fetched fine with category (ChunkResult.cleared_ids) are deleted from it.
+
+    Fetching and writing overlap: this thread consumes results and hands each flush to a
+    writer thread over a queue of PULL_QUEUE_BATCHES (default 4). When SQL falls behind the
+    queue fills, this thread blocks, and the fetcher stops dispatching new chunks. Batches
+    are written in order. PULL_PIPELINE=0 writes inline instead.
+    Returns (rows_seen, inserted_raw, upserted).
+    """
+    raw_table = env_str("SLURS_RAW_TABLE", "kiancat.dbo.slurs_raw")
+    msg_table = env_str("SLURS_MSG_TABLE", "kiancat.dbo.slurs_msg")
+    flush_rows = max(1, env_int("PULL_FLUSH_ROWS", 2000))
+    # most chunks return no rows; still checkpoint them regularly
+    flush_chunks = max(1, env_int("PULL_CHECKPOINT_CHUNKS", 20))
+    pipelined = env_int("PULL_PIPELINE", 1) != 0
+    queue_batches = max(1, env_int("PULL_QUEUE_BATCHES", 4))
+    problem_ttl_days = env_int("SLURS_PROBLEM_TTL_DAYS", 30)
+
+    seen = 0
+    dropped = 0
+    allow_hits: dict[str, int] = {}
+    totals = {"inserted_raw": 0, "upserted": 0, "batches": 0, "write_s": 0.0}
+
+    def _write(batch: _WriteBatch) -> None:
+        t0 = time.perf_counter()
+        ins, ups, ok = _write_rows(batch.rows, raw_table, msg_table)
+        totals["inserted_raw"] += ins
+        totals["upserted"] += ups
+        if ok and (batch.marks or batch.problems or batch.cleared or (run_id is not None and batch.done)):
+            try:
+                with db.get_conn() as conn:
+                    if batch.problems:
+                        db.record_problem_ids(conn, batch.problems, ttl_days=problem_ttl_days)
+                    if batch.cleared:
+                        db.clear_problem_ids(conn, batch.cleared)
+                    if batch.marks:
+                        db.update_player_watermarks(conn, batch.marks)
+                    if run_id is not None and batch.done:
+                        db.journal_mark_done(conn, run_id, [tuple(d) for d in batch.done])
+            except Exception as e:
+                logger.warning("checkpoint (watermarks/journal) failed: %s", e)
+        totals["batches"] += 1
+        totals["write_s"] += time.perf_counter() - t0
+
+    q: "queue.Queue" = queue.Queue(maxsize=queue_batches)
+    writer_error: list[BaseException] = []
+
+    def _writer() -> None:
+        while True:
+            batch = q.get()
+            if batch is _STOP:
+                return
+            if writer_error:
+                continue  # keep draining so the producer never blocks on a dead writer
+            try:
+                _write(batch)
+            except BaseException as e:
+                writer_error.append(e)
+
+    writer = None
+    if pipelined:
+        writer = threading.Thread(target=_writer, name="slurs-writer", daemon=True)
+        writer.start()
+    blocked_s = 0.0
+
+    def _hand_off(batch: _WriteBatch) -> None:
+        nonlocal blocked_s
+        if writer is None:
+            _write(batch)
+            return
+        if writer_error:
+            raise writer_error[0]
+        t0 = time.perf_counter()
+        q.put(batch)  # blocks while the writer is queue_batches behind (backpressure)
+        blocked_s += time.perf_counter() - t0
+
+    t_start = time.perf_counter()
+    batch = _WriteBatch()
+    pending_chunks = 0
+    try:
+        for res in results:
+            seen += len(res.rows)
+            kept, af_stats = _apply_allowlist_filter(res.rows, af_cfg)
+            dropped += af_stats["dropped"]
+            for w, n in af_stats["allow_hits"].items():
+                allow_hits[w] = allow_hits.get(w, 0) + n
+            batch.rows.extend(kept)
+            if res.problem_ids:
+                batch.problems.update(res.problem_ids)
+            if res.cleared_ids:
+                batch.cleared.update(res.cleared_ids)
+            if poll_utc is not None and res.ok:
+                batch.marks.extend(_chunk_watermarks(res, poll_utc))
+            if run_id is not None and res.ok:
+                idx = journal_idx[res.index] if journal_idx is not None else res.index
+                batch.done.append([idx, res.pages, len(res.rows), len(kept)])
+            pending_chunks += 1
+            if len(batch.rows) >= flush_rows or pending_chunks >= flush_chunks:
+                _hand_off(batch)
+                batch = _WriteBatch()
+                pending_chunks = 0
+        if pending_chunks or batch.rows:
+            _hand_off(batch)
+    finally:
+        if writer is not None:
+            q.put(_STOP)  # rows fetched before an error are still written
+            writer.join()
+    if writer_error:
+        raise writer_error[0]
+
+    wall = time.perf_counter() - t_start
+    if writer is not None:
+        logger.info("pull pipeline: wall=%.1fs write=%.1fs fetch-blocked=%.1fs batches=%d queue=%d",
+                    wall, totals["write_s"], blocked_s, totals["batches"], queue_batches)
+    if af_cfg["do_drop"] and af_cfg["allow"] is not None:
+        top = sorted(allow_hits.items(), key=lambda kv: -kv[1])[:5]
+        logger.info("allowlist filter: allow_terms=%s lex_terms=%s dropped=%s kept=%s top=%s",
+                    af_cfg["allow_terms"], af_cfg["lex_terms"], dropped, seen - dropped,
+                    ", ".join(f"{w}={n}" for w, n in top) or "-")
+    return (seen, totals["inserted_raw"], totals["upserted"])
+
+def _watermark_plan(steamids: List[int], since_iso: Optional[str]):
+    """
+    Load per-player watermarks and return (ordered_ids, after_for).
+    Each player's lower bound is last_poll_utc - OVERLAP_HOURS; players never polled use since_iso.
+    IDs are sorted oldest-bound first so a chunk groups players with similar windows, and
+    after_for(chunk) returns the oldest bound in the chunk.
+    """
+    overlap = timedelta(hours=max(0, env_int("OVERLAP_HOURS", 2)))
+    with db.get_conn() as conn:
+        db.ensure_player_state(conn)
+        marks = db.get_player_watermarks(conn)
+
+    floor = _parse_iso_utc(since_iso)
+    bounds: dict[int, Optional[datetime]] = {}
+    for sid in steamids:
+        last_poll = (marks.get(sid) or {}).get("last_poll_utc")
+        bounds[sid] = (last_poll - overlap) if last_poll else floor
+
+    known = sum(1 for sid in steamids if sid in marks)
+    logger.info("watermarks: %d/%d players have state; new players use since=%s", known, len(steamids), since_iso)
+
+    def _key(sid: int):
+        b = bounds[sid]
+        return (b is not None, b or datetime.min, sid)
+
+    def after_for(chunk: List[int]) -> Optional[str]:
+        bs = [bounds.get(sid) for sid in chunk]
+        if any(b is None for b in bs):
+            return None  # someone needs an unbounded window -> caller's since_iso
+        return _iso_z(min(bs))
+
+    return sorted(steamids, key=_key), after_for
+
+def _known_problem_ids() -> set[int]:
+    """
+    steamid64s that failed with category on their own in SLURS_PROBLEM_MIN_FAILURES runs,
+    the last within SLURS_PROBLEM_TTL_DAYS (empty on error).
+    """
+    try:
+        with db.get_conn() as conn:
+            ids = db.get_problem_ids(conn, min_failures=env_int("SLURS_PROBLEM_MIN_FAILURES", 2),
+                                     ttl_days=env_int("SLURS_PROBLEM_TTL_DAYS", 30))
+    except Exception as e:
+        logger.warning("problem ids unavailable: %s", e)
+        return set()
+    if ids:
+        logger.info("problem ids: %d known; fetched alone", len(ids))
+    return ids
+
+def _plan_new_run(since_iso: Optional[str], before_iso: Optional[str], use_watermarks: bool, tiered: bool,
+                  batch_size: int, isolate: Optional[set] = None) -> Tuple[Optional[datetime], list]:
+    """
+    Roster -> (poll_utc|None, [(chunk_idx, steamids, after_iso|None)]) for a fresh pull.
+    IDs in isolate (known problem IDs) are planned as single-ID chunks.
+    """
+    with db.get_conn() as conn:
+        steamids = fetch_ozf_steamids(conn)
+        logger.info("ozf steamids: %d", len(steamids))
+        if tiered:
+            steamids = scheduler.plan(conn, steamids).due
+            use_watermarks = True
+
+    after_for = None
+    poll_utc = None
+    if use_watermarks:
+        steamids, after_for = _watermark_plan(steamids, since_iso)
+        poll_dt = _parse_iso_utc(before_iso) or datetime.now(timezone.utc).replace(tzinfo=None)
+        poll_utc = min(poll_dt, datetime.now(timezone.utc).replace(tzinfo=None))
+
+    chunks = slurs_api.plan_chunks(steamids, batch_size, isolate or ())
+    plan = [(i, c, after_for(c) if after_for else None) for i, c in enumerate(chunks)]
+    return poll_utc, plan
+
+def run_pull(since_iso: Optional[str], before_iso: Optional[str], use_watermarks: bool = False,
+             tiered: bool = False, resume: bool = False) -> Tuple[int, int]:
     """
     Return (inserted_raw, upserted).
     AFTER is primary; BEFORE is still passed (slurs_api will honor/ignore as implemented).
     category=total; batch_size<=10 per slurs.tf.
+    Rows are streamed chunk-by-chunk into SQL rather than collected up front.
+    With use_watermarks, each chunk's after= comes from the per-player watermarks
+    (since_iso only applies to players without state) and watermarks advance per chunk.
+    With tiered, only players the activity scheduler marks as due are polled (implies watermarks,
+    so skipped players catch up from their own watermark next time).
+
+    Every pull is journaled (dbo.slurs_pull_runs/_chunks); a chunk is marked done once its rows
+    are committed. resume=True continues the latest unfinished run from its pending chunks,
+    reusing that run's window and watermark poll time (the other arguments are ignored).
+    Re-fetching a chunk whose rows landed but whose checkpoint did not is harmless: upserts dedupe.
+
+    Known problem IDs (dbo.slurs_problem_ids) are chunked alone so one bad player never
+    pushes nine others onto the uncategorized fallback.
     """
-    with db.get_conn() as conn:
-        steamids = fetch_ozf_steamids(conn)
-    logger.info("ozf steamids: %d", len(steamids))
-
     category = "total"
-    data = []
+    batch_size = min(env_int("SLURS_BATCH_SIZE", 10), 10)
+    af_cfg = _load_allowlist_config()
+    problem_ids = _known_problem_ids()
+
+    run = None
+    if resume:
+        with db.get_conn() as conn:
+            run = db.journal_open_run(conn)
+        if run is None:
+            logger.info("resume: no unfinished pull run found; starting a new pull")
+        else:
+            since_iso, before_iso, poll_utc = run["since_iso"], run["before_iso"], run["poll_utc"]
+            run_id, pending = run["run_id"], run["pending"]
+            logger.info("resume: run_id=%s window=%s..%s pending chunks %d/%d",
+                        run_id, since_iso, before_iso, len(pending), run["chunks_total"])
+    if run is None:
+        poll_utc, pending = _plan_new_run(since_iso, before_iso, use_watermarks, tiered, batch_size, problem_ids)
+        with db.get_conn() as conn:
+            run_id = db.journal_start(conn, since_iso, before_iso, poll_utc, pending)
+        logger.info("pull run_id=%s: %d chunks planned", run_id, len(pending))
+
+    after_by_chunk = {tuple(ids): after for _, ids, after in pending}
+
+    # one token bucket shared by all workers: ~300 req/5m budget instead of fixed sleeps
+    limiter = slurs_api.TokenBucket(
+        env_int("SLURS_RATE_REQUESTS", 300),
+        env_int("SLURS_RATE_WINDOW_S", 300),
+        burst=env_int("SLURS_RATE_BURST", 10),
+    )
+    seen = inserted_raw = upserted = 0
+    slurs_api.reset_fetch_stats()
     try:
-        data = slurs_api.fetch_messages_for_steamids(
-            steamids=steamids,
+        results = slurs_api.iter_chunk_results(
+            chunks=[ids for _, ids, _ in pending],
             after_iso=since_iso,
             before_iso=before_iso,
             category=category,
-            batch_size=min(env_int("SLURS_BATCH_SIZE", 10), 10),
+            batch_size=batch_size,
             limit=env_int("SLURS_LIMIT", 100),
-            sleep_ms=env_int("SLURS_SLEEP_MS", 1100),  # <~300 req/5m
+            sleep_ms=env_int("SLURS_SLEEP_MS", 1100),  # only used when no limiter
             retries_s=env_list_int("SLURS_RETRIES_S", [10, 30, 300, 900]),
+            workers=slurs_api.DEFAULT_WORKERS,
+            limiter=limiter,
+            after_for=lambda ids: after_by_chunk.get(tuple(ids)),
+            isolate=problem_ids,
         )
+        seen, inserted_raw, upserted = _stream_into_db(
+            results, af_cfg, poll_utc, run_id=run_id, journal_idx=[idx for idx, _, _ in pending])
     except Exception as e:
         logger.warning("pull exception (fallback single ID, no dates): %s", e)
         if not env_str("OZF_MAX_IDS", "").strip():
             os.environ["OZF_MAX_IDS"] = "1"
-        data = slurs_api.fetch_messages_for_steamids(
+        with db.get_conn() as conn:
+            steamids = fetch_ozf_steamids(conn)
+        results = slurs_api.iter_chunk_results(
             steamids=steamids,
             after_iso=None,
             before_iso=None,
@@ -260,68 +570,60 @@ def run_pull(since_iso: Optional[str], before_iso: Optional[str]) -> Tuple[int,
             limit=env_int("SLURS_LIMIT", 100),
             sleep_ms=env_int("SLURS_SLEEP_MS", 1100),
             retries_s=env_list_int("SLURS_RETRIES_S", [10, 30, 300, 900]),
+            workers=1,
         )
+        n, ins, ups = _stream_into_db(results, af_cfg)
+        seen += n; inserted_raw += ins; upserted += ups
 
-    # Optional allowlist drop (keeps messages with any slur even if allow-words are present)
-    data, af_stats = _apply_allowlist_filter(data)
-    if af_stats.get("enabled"):
-        logger.info("allowlist filter: allow_terms=%s lex_terms=%s dropped=%s kept=%s",
-                    af_stats["allow_terms"], af_stats["lex_terms"], af_stats["dropped"], af_stats["kept"])
+    try:
+        with db.get_conn() as conn:
+            status = db.journal_finish(conn, run_id)
+        logger.info("pull run_id=%s finished: %s", run_id, status)
+    except Exception as e:
+        logger.warning("journal_finish failed: %s", e)
+    slurs_api.log_fetch_stats("pull")
+    http_client.log_connection_stats("pull")
+    db.log_pool_stats("pull")
 
-    if not data:
+    if not seen:
         logger.info("pull: no rows returned from API for given window.")
         return (0, 0)
 
-    raw_table = env_str("SLURS_RAW_TABLE", "kiancat.dbo.slurs_raw")
-    msg_table = env_str("SLURS_MSG_TABLE", "kiancat.dbo.slurs_msg")
-
-    inserted_raw = 0
-    upserted = 0
-    with db.get_conn() as conn:
-        if hasattr(db, "insert_raw_rows"):
-            try:
-                inserted_raw = db.insert_raw_rows(data, raw_table)
-            except Exception as e:
-                logger.warning("insert_raw_rows failed: %s", e)
-        else:
-            logger.warning("db.insert_raw_rows not found; skipping raw insert.")
-
-        if hasattr(db, "upsert_messages"):
-            try:
-                upserted = db.upsert_messages(data, msg_table)
-            except Exception as e:
-                logger.warning("upsert_messages failed: %s", e)
-        else:
-            logger.warning("db.upsert_messages not found; typed upsert skipped.")
     logger.info("raw inserted: %s; upsert inserted: %s", inserted_raw, upserted)
     return (inserted_raw, upserted)
 
 # ---- reports ----
-def run_report(mode: str = "180"):
+def run_report(mode: str = "180", force: bool = False):
     out_dir = reports_dir()
+    state = artifacts.ArtifactState(out_dir, force=force, label="report")
     with db.get_conn() as conn:
-        # Support both your current and older signatures
-        try:
-            report.make_reports(conn, out_dir, mode=mode)
-        except TypeError:
-            try:
-                report.make_reports(conn, out_dir, mode)
-            except TypeError:
-                report.make_reports(conn, out_dir)
+        report.make_reports(conn, out_dir, mode=mode, state=state)
+    state.summary()
     logger.info("HTML reports written to %s (mode=%s)", out_dir, mode)
 
+def run_export_messages(since_iso: Optional[str] = None, before_iso: Optional[str] = None,
+                        days: int = 0) -> List[str]:
+    """Stream roster messages to HTML + CSV (all time by default; --days N or --since/--before to narrow)."""
+    before = _parse_iso_utc(before_iso) if before_iso else None
+    since = _parse_iso_utc(since_iso) if since_iso else None
+    if since is None and days > 0:
+        since = (before or datetime.now(timezone.utc).replace(tzinfo=None)) - timedelta(days=days)
+    with db.get_conn() as conn:
+        return report.export_messages(conn, reports_dir(), since, before)
+
 # ---- Discord helpers ----
-def run_discord_admin():
+def run_discord_admin(ctx: Optional[RunContext] = None, state: Optional[artifacts.ArtifactState] = None):
     try:
         with db.get_conn() as conn:
-            discord_webhook.post_daily_player_embeds(conn)
+            discord_webhook.post_daily_player_embeds(conn, ctx=ctx, state=state)
         logger.info("admin discord post: per-player daily embeds")
     except Exception as e:
         logger.warning("admin per-player embeds failed: %s", e)
 
-def run_discord_public(top_n: int):
+def run_discord_public(top_n: int, ctx: Optional[RunContext] = None,
+                       state: Optional[artifacts.ArtifactState] = None):
     with db.get_conn() as conn:
-        discord_webhook.post_public_digest(conn, top_n=max(1, min(int(top_n), 25)))
+        discord_webhook.post_public_digest(conn, top_n=max(1, min(int(top_n), 25)), ctx=ctx, state=state)
 
 # ---- watermark (simple) ----
 def get_watermark(conn) -> Optional[str]:
@@ -353,10 +655,13 @@ def set_watermark(conn, when_utc: datetime):
         cur.execute("UPDATE dbo.slurs_state SET last_success_utc=?, updated_at=SYSUTCDATETIME()", when_utc)
         conn.commit()
 
-def render_and_post_daily_reports(channel: str = "public") -> None:
+def render_and_post_daily_reports(channel: str = "public",
+                                  state: Optional[artifacts.ArtifactState] = None) -> None:
     """
     Render two specific HTML reports to PNG and post them to Discord in a single message.
     Files: slurs_summary_1.html, slurs_messages_1d.html (in REPORTS_DIR).
+    With a state, rendering and the post are skipped when the HTML content (minus its
+    'Generated' time) is what was rendered / posted last time.
     """
     out_dir = reports_dir()
     wanted_html = ["slurs_summary_1.html", "slurs_messages_1d.html"]
@@ -373,44 +678,55 @@ def render_and_post_daily_reports(channel: str = "public") -> None:
         logger.warning("No target reports found in %s; skipping Discord image post.", out_dir)
         return
 
-    rendered_pngs = []
-    for html_path in html_paths:
-        rendered = report_images.render_html_to_pngs(
-            report_dir=out_dir,
-            pattern=Path(html_path).name,
-            out_dir=out_dir,
-            width=1280,
-            full_page=True,
-            timeout_ms=45000
-        )
-        rendered_pngs.extend(rendered)
-
     # Keep only the two we care about, in a stable order
-    rendered_pngs = [str(Path(out_dir) / "slurs_summary_1.png"),
-                     str(Path(out_dir) / "slurs_messages_1d.png")]
-    rendered_pngs = [p for p in rendered_pngs if Path(p).exists()]
+    want_pngs = [str(Path(out_dir) / "slurs_summary_1.png"),
+                 str(Path(out_dir) / "slurs_messages_1d.png")]
+    source = (lambda: artifacts.html_digest(html_paths)) if state is not None else None
+    if artifacts.needs(state, "report-pngs", source, [p for p in want_pngs
+                                                      if Path(p).with_suffix(".html").exists()]):
+        for html_path in html_paths:
+            report_images.render_html_to_pngs(
+                report_dir=out_dir,
+                pattern=Path(html_path).name,
+                out_dir=out_dir,
+                width=1280,
+                full_page=True,
+                timeout_ms=45000
+            )
+        rendered_pngs = [p for p in want_pngs if Path(p).exists()]
+        if rendered_pngs:
+            artifacts.done(state, "report-pngs", rendered_pngs)
+    else:
+        logger.info("Report PNGs unchanged; not re-rendered")
+    rendered_pngs = [p for p in want_pngs if Path(p).exists()]
     if not rendered_pngs:
         logger.warning("No PNGs produced for target reports; skipping Discord image post.")
         return
 
+    post_name = f"discord-report-images:{channel}"
+    if not artifacts.needs(state, post_name, lambda: state.digest_of("report-pngs")):
+        logger.info("Report images unchanged since the last post to %s; not re-posted", channel)
+        return
     try:
         from discord_webhook import post_report_images_local
         post_report_images_local(rendered_pngs[:2], channel=channel, message="Daily reports")
         logger.info("Posted report images to Discord (%s): %s", channel, ", ".join(Path(p).name for p in rendered_pngs[:2]))
+        artifacts.done(state, post_name)
     except Exception as e:
         logger.warning("Discord post (report images) failed: %s", e)
 
 # ---- daily orchestration ----
-def run_daily():
+def run_daily(force: bool = False):
     """
     Daily orchestration (runs on your 11:30am schedule):
       1) Refresh roster (stops after N 404s; no +20 drift)
-      2) Pull the **last LOOKBACK_HOURS** (default 25h) from *now* (UTC)
+      2) Pull from each player's watermark (new players: last LOOKBACK_HOURS, default 25h)
       3) Build HTML reports (1,7,31,180,all)
       4) Build Excel daily workbook
       5) Post Discord (admin per-player + public digest)
       6) Render two reports to PNG and post them to Discord (channel controls via REPORTS_DISCORD_CHANNEL)
       7) Advance watermark
+    Outputs (3-6) whose input data is unchanged since the last run are skipped unless force.
     """
     Path(reports_dir()).mkdir(parents=True, exist_ok=True)
     logger.info("REPORTS_DIR resolved to %s", reports_dir())
@@ -421,8 +737,10 @@ def run_daily():
     except Exception as e:
         logger.warning("roster refresh failed (continuing): %s", e)
 
-    # 2) 25h sliding window (configurable)
+    # 2) 25h sliding window (configurable); with per-player watermarks it only applies to new players
     LOOKBACK_HOURS = env_int("LOOKBACK_HOURS", 25)
+    use_marks = env_str("SLURS_WATERMARKS", "1").lower() in {"1", "true", "yes", "on"}
+    tiered = use_marks and env_str("SLURS_SCHEDULER", "tiered").lower() == "tiered"
     now_dt = datetime.now(timezone.utc)
     since_dt = now_dt - timedelta(hours=max(1, LOOKBACK_HOURS))
     since_iso = since_dt.strftime("%Y-%m-%dT%H:%M:%SZ")
@@ -430,32 +748,34 @@ def run_daily():
     logger.info("pull window (last %sh): since=%s before=%s", LOOKBACK_HOURS, since_iso, before_iso)
 
     # 3) pull + write
-    inserted_raw, upserted = run_pull(since_iso, before_iso)
+    inserted_raw, upserted = run_pull(since_iso, before_iso, use_watermarks=use_marks, tiered=tiered)
     logger.info("pull complete: raw=%s upserted=%s", inserted_raw, upserted)
 
+    # counts / 1-day messages / offenders are fetched once (post-pull) and shared by 4-6
+    ctx = RunContext("run-daily")
+    state = artifacts.ArtifactState(reports_dir(), force=force, label="run-daily")
+
     # 4) reports (HTML + CSV)
     try:
-        with db.get_conn() as conn:
-            for mode in ("1", "7", "31", "180", "all"):
-                try:
-                    report.make_reports(conn, reports_dir(), mode=mode)
-                except TypeError:
-                    report.make_reports(conn, reports_dir(), mode)
+        with ctx.stage("reports"), db.get_conn() as conn:
+            report.make_reports_all(conn, reports_dir(), modes=("1", "7", "31", "180", "all"), ctx=ctx,
+                                    state=state)
         logger.info("reports written to %s", reports_dir())
     except Exception as e:
         logger.warning("report generation failed: %s", e)
 
     # 5) excel
     try:
-        with db.get_conn() as conn:
-            xlsx_path = report.make_excel_daily(conn, out_dir=reports_dir())
+        with ctx.stage("excel"), db.get_conn() as conn:
+            xlsx_path = report.make_excel_daily(conn, out_dir=reports_dir(), ctx=ctx, state=state)
         logger.info("excel daily: %s", xlsx_path)
     except Exception as e:
         logger.warning("make_excel_daily failed: %s", e)
 
     # 6) discord embeds (non-fatal)
     try:
-        run_discord_admin()
+        with ctx.stage("discord-admin"):
+            run_discord_admin(ctx, state)
     except Exception as e:
         logger.warning("admin per-player embeds failed: %s", e)
     try:
@@ -463,15 +783,18 @@ def run_daily():
     except Exception:
         top = 10
     try:
-        run_discord_public(top)
+        with ctx.stage("discord-public"):
+            run_discord_public(top, ctx, state)
     except Exception as e:
         logger.warning("public digest failed: %s", e)
+    ctx.summary()
 
     # 6b) post two PNG report images (channel=public|admin)
     try:
-        render_and_post_daily_reports(channel=os.getenv("REPORTS_DISCORD_CHANNEL", "public"))
+        render_and_post_daily_reports(channel=os.getenv("REPORTS_DISCORD_CHANNEL", "public"), state=state)
     except Exception as e:
         logger.warning("auto-post of report images failed: %s", e)
+    state.summary()
 
     # 7) watermark
     try:
@@ -481,9 +804,19 @@ def run_daily():
     except Exception as e:
         logger.warning("failed to advance watermark: %s", e)
 
+    http_client.log_connection_stats("run-daily")
+    db.log_pool_stats("run-daily")
     logger.info("run-daily complete: upserted=%d", upserted)
     return int(upserted)
 
+# ---- rollup maintenance ----
+def run_rollup_rebuild() -> Tuple[int, int]:
+    """(Re)build slurs_daily_counts from slurs_msg; creates it on first use. Returns (messages, buckets)."""
+    with db.get_conn() as conn:
+        scanned, buckets = daily_counts.rebuild(conn)
+    logger.info("rollup-rebuild: %d messages -> %d daily buckets in %s", scanned, buckets, daily_counts.TABLE)
+    return scanned, buckets
+
 # ---- diagnostics ----
 def run_probe() -> None:
     try:
@@ -538,23 +871,36 @@ def parse_args(argv: List[str]) -> argparse.Namespace:
     sp = subs.add_parser("pull", help="Pull messages from API and load into SQL")
     sp.add_argument("--since", type=str, default=None, help="ISO8601 UTC start (e.g., 2025-09-15T00:00:00Z)")
     sp.add_argument("--before", type=str, default=None, help="ISO8601 UTC end   (e.g., 2025-09-16T00:00:00Z)")
+    sp.add_argument("--watermarks", action="store_true", help="Start each player from its own watermark (--since only for new players)")
+    sp.add_argument("--tiered", action="store_true", help="Only poll players the hot/warm/cold scheduler marks as due (implies --watermarks)")
+    sp.add_argument("--resume", action="store_true", help="Continue the last unfinished pull from its last committed chunk")
 
     sp = subs.add_parser("report", help="Build HTML reports from SQL")
     sp.add_argument("--mode", choices=["1","7","31","180","all"], default="180")
+    sp.add_argument("--force", action="store_true", help="Rebuild even if the data is unchanged since the last build")
 
     subs.add_parser("discord-post", help="Post the admin/private per-player daily embeds")
     sp = subs.add_parser("discord-public", help="Post the public daily digest embed")
     sp.add_argument("--top", type=int, default=10)
 
     subs.add_parser("roster-refresh", help="Refresh ozfortress roster before pulling")
-    subs.add_parser("run-daily", help="Refresh roster, pull, HTML+Excel, Discord, watermark")
-    subs.add_parser("daily", help="Alias for run-daily")
+    for name, help_txt in (("run-daily", "Refresh roster, pull, HTML+Excel, Discord, watermark"),
+                           ("daily", "Alias for run-daily")):
+        sp = subs.add_parser(name, help=help_txt)
+        sp.add_argument("--force", action="store_true",
+                        help="Rebuild/re-post reports, Excel, embeds and PNGs even if their data is unchanged")
 
     subs.add_parser("run-probe", help="Light probe of roster + API")
     subs.add_parser("health", help="Heavier health check (no writes)")
+    subs.add_parser("rollup-rebuild", help="Create/recompute the per-player daily counts rollup from slurs_msg")
+    sp = subs.add_parser("export-messages", help="Stream roster messages to HTML + CSV (constant memory)")
+    sp.add_argument("--days", type=int, default=0, help="Last N days (0 = all time)")
+    sp.add_argument("--since", type=str, default=None, help="ISO8601 UTC start (overrides --days)")
+    sp.add_argument("--before", type=str, default=None, help="ISO8601 UTC end (default: now)")
 
     # single-shot: render two specific HTMLs to PNGs and post to Discord
-    subs.add_parser("discord-report", help="Render slurs_summary_1 + slurs_messages_1d to PNG and post to Discord")
+    sp = subs.add_parser("discord-report", help="Render slurs_summary_1 + slurs_messages_1d to PNG and post to Discord")
+    sp.add_argument("--force", action="store_true", help="Render and post even if the HTML is unchanged since the last post")
 
     return p.parse_args(argv)
 
@@ -562,25 +908,32 @@ def main(argv: List[str]) -> int:
     args = parse_args(argv)
     try:
         if args.cmd == "pull":
-            ins, ups = run_pull(args.since, args.before)
+            ins, ups = run_pull(args.since, args.before, use_watermarks=args.watermarks, tiered=args.tiered,
+                                resume=args.resume)
             logger.info("pull completed: inserted_raw=%s upserted=%s", ins, ups)
             return 0
         elif args.cmd == "report":
-            run_report(mode=args.mode); return 0
+            run_report(mode=args.mode, force=args.force); return 0
         elif args.cmd == "discord-post":
             run_discord_admin(); return 0
         elif args.cmd == "discord-public":
             run_discord_public(args.top); return 0
         elif args.cmd == "discord-report":
-            render_and_post_daily_reports(channel=os.getenv("REPORTS_DISCORD_CHANNEL", "public")); return 0
+            state = artifacts.ArtifactState(reports_dir(), force=args.force, label="discord-report")
+            render_and_post_daily_reports(channel=os.getenv("REPORTS_DISCORD_CHANNEL", "public"), state=state)
+            state.summary(); return 0
         elif args.cmd == "roster-refresh":
             run_roster_refresh(); return 0
         elif args.cmd in ("run-daily","daily"):
-            return run_daily()
+            return run_daily(force=args.force)
         elif args.cmd == "run-probe":
             run_probe(); return 0
         elif args.cmd == "health":
             run_health(); return 0
+        elif args.cmd == "rollup-rebuild":
+            run_rollup_rebuild(); return 0
+        elif args.cmd == "export-messages":
+            run_export_messages(args.since, args.before, days=args.days); return 0
         else:
             logger.error("Unknown command: %s", args.cmd)
             return 2
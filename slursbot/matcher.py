@@ -0,0 +1,197 @@
+# matcher.py — shared multi-term matcher for the lexicon / allowlist
+# - Word lists are loaded from YAML once and cached until the file's mtime/size changes
+# - All terms compile into one automaton; a message is scanned in a single left-to-right pass
+# - Backend: pyahocorasick (Aho-Corasick, C) when installed, else a trie-shaped regex
+#   (prefix-factored alternation, so each position walks the trie once instead of trying every term)
+# - whole_word=True has the same semantics as r"\b(?:t1|t2|...)\b" with re.IGNORECASE
+from __future__ import annotations
+
+import os
+import re
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import yaml
+except Exception:
+    yaml = None
+
+try:
+    import ahocorasick  # pyahocorasick
+except Exception:
+    ahocorasick = None
+
+logger = logging.getLogger("slursbot")
+
+LEXICON_KEYS = ("words", "terms", "slurs", "deny", "denylist")
+ALLOWLIST_KEYS = ("words", "allow", "allowlist")
+
+
+def _is_word(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _trie_pattern(node: Dict[str, dict]) -> str:
+    """Regex for the terms below a trie node; longest alternatives first, shorter via '?'."""
+    end = "" in node
+    alts = [re.escape(ch) + _trie_pattern(node[ch]) for ch in sorted(k for k in node if k)]
+    if not alts:
+        return ""
+    body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+    if end:
+        return ("(?:" + body + ")?") if len(alts) == 1 else body + "?"
+    return body
+
+
+class Matcher:
+    """
+    Compiled set of lowercase terms. search(text) -> bool; matches(text) -> the distinct terms
+    found, in order of first appearance. An empty Matcher is falsy and never matches.
+    """
+
+    def __init__(self, terms: Iterable[str], whole_word: bool = True):
+        self.terms: List[str] = sorted({str(t).strip().lower() for t in terms if str(t).strip()})
+        self.whole_word = whole_word
+        self._auto = None
+        self._re: Optional[re.Pattern] = None
+        if not self.terms:
+            self.backend = "empty"
+        elif ahocorasick is not None:
+            auto = ahocorasick.Automaton()
+            for t in self.terms:
+                auto.add_word(t, t)
+            auto.make_automaton()
+            self._auto = auto
+            self.backend = "aho-corasick"
+        else:
+            trie: Dict[str, dict] = {}
+            for t in self.terms:
+                node = trie
+                for ch in t:
+                    node = node.setdefault(ch, {})
+                node[""] = {}
+            pat = "(?:" + _trie_pattern(trie) + ")"
+            if whole_word:
+                pat = r"\b" + pat + r"\b"
+            self._re = re.compile(pat)
+            self.backend = "trie-regex"
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def _hits(self, t: str):
+        """Yield (start, term) for each accepted occurrence in lowercased text t."""
+        if self._auto is not None:
+            n = len(t)
+            for end, term in self._auto.iter(t):
+                start = end - len(term) + 1
+                if self.whole_word:
+                    # \b on both sides: word-ness must change across each edge
+                    before = _is_word(t[start - 1]) if start > 0 else False
+                    after = _is_word(t[end + 1]) if end + 1 < n else False
+                    if before == _is_word(term[0]) or after == _is_word(term[-1]):
+                        continue
+                yield start, term
+        elif self._re is not None:
+            for m in self._re.finditer(t):
+                yield m.start(), m.group()
+
+    def search(self, text: Optional[str]) -> bool:
+        if not text or not self.terms:
+            return False
+        for _ in self._hits(text.lower()):
+            return True
+        return False
+
+    def matches(self, text: Optional[str]) -> List[str]:
+        if not text or not self.terms:
+            return []
+        seen: Dict[str, int] = {}
+        for start, term in self._hits(text.lower()):
+            if term not in seen:
+                seen[term] = start
+        return sorted(seen, key=seen.__getitem__)
+
+
+# -------------------------
+# YAML word lists (cached by mtime)
+# -------------------------
+def _parse_terms(doc, keys: Optional[Sequence[str]]) -> List[str]:
+    """
+    Accepts a YAML list, or a mapping. With keys, the lists under those keys are unioned;
+    without, 'words' then 'terms' are used, else every list value is flattened.
+    """
+    lists: List[list] = []
+    if isinstance(doc, list):
+        lists = [doc]
+    elif isinstance(doc, dict):
+        if keys:
+            lists = [doc[k] for k in keys if isinstance(doc.get(k), list)]
+        elif isinstance(doc.get("words"), list):
+            lists = [doc["words"]]
+        elif isinstance(doc.get("terms"), list):
+            lists = [doc["terms"]]
+        else:
+            lists = [v for v in doc.values() if isinstance(v, list)]
+    return sorted({str(x).strip().lower() for xs in lists for x in xs if str(x).strip()})
+
+
+_lock = threading.Lock()
+_cache: Dict[Tuple, Tuple[Optional[Tuple[int, int]], object]] = {}
+
+
+def _stamp(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def load_terms(path: str, keys: Optional[Sequence[str]] = None) -> List[str]:
+    """Lowercased, de-duplicated terms from a YAML word list; [] if missing/unparseable. Cached."""
+    if not path:
+        return []
+    key = ("terms", os.path.abspath(path), tuple(keys or ()))
+    stamp = _stamp(path)
+    with _lock:
+        hit = _cache.get(key)
+        if hit is not None and hit[0] == stamp:
+            return list(hit[1])
+    terms: List[str] = []
+    if stamp is None:
+        logger.warning("word list not found at %s", path)
+    elif yaml is None:
+        logger.warning("PyYAML not installed; cannot load %s", path)
+    else:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                terms = _parse_terms(yaml.safe_load(f), keys)
+        except Exception as e:
+            logger.warning("Failed to load %s: %s", path, e)
+    with _lock:
+        _cache[key] = (stamp, terms)
+    return list(terms)
+
+
+def get_matcher(path: str, keys: Optional[Sequence[str]] = None, whole_word: bool = True) -> Matcher:
+    """
+    Matcher for the word list at path, rebuilt only when the file changes (mtime/size).
+    Safe to call per chunk / per batch from any thread.
+    """
+    key = ("matcher", os.path.abspath(path or ""), tuple(keys or ()), whole_word)
+    stamp = _stamp(path) if path else None
+    with _lock:
+        hit = _cache.get(key)
+        if hit is not None and hit[0] == stamp:
+            return hit[1]  # type: ignore[return-value]
+    m = Matcher(load_terms(path, keys), whole_word=whole_word)
+    if m:
+        logger.info("matcher: %d terms from %s (%s)", len(m), path, m.backend)
+    with _lock:
+        _cache[key] = (stamp, m)
+    return m
+
+
+__all__ = ["Matcher", "load_terms", "get_matcher", "LEXICON_KEYS", "ALLOWLIST_KEYS"]
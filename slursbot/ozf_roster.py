@@ -4,6 +4,7 @@
 # - Extracts SteamID64 from the profile HTML (steamcommunity profiles link)
 # - Upserts into kian.oz.players (minimal fields + timestamps/URLs)
 
+import os
 import re
 import time
 import logging
@@ -11,6 +12,8 @@ from typing import Optional, List, Dict
 
 import requests
 
+import http_client
+
 logger = logging.getLogger("slursbot")
 
 RE_STEAM = re.compile(r'https?://steamcommunity\.com/profiles/(\d{17})', re.I)
@@ -22,7 +25,8 @@ def _get(url: str, timeout: int = 30) -> requests.Response:
         "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
         "Referer": "https://ozfortress.com/",
     }
-    r = requests.get(url, headers=hdrs, timeout=timeout)
+    # pooled keep-alive session: hundreds of sequential probes share one TLS connection
+    r = http_client.get(url, headers=hdrs, timeout=timeout)
     return r
 
 def probe_user(user_id: int) -> Dict[str, Optional[str]]:
@@ -62,7 +66,8 @@ def refresh(conn,
     """
     Probes forward from MAX(oz_id) in DB up to max_probe pages,
     stopping early after 'stop_after_404' consecutive 404s.
-    Upserts any pages that expose a SteamID64.
+    Upserts any pages that expose a SteamID64, buffered and written in batches of
+    OZF_UPSERT_BATCH (one MERGE + commit each).
 
     Returns: (checked_count, inserted_or_updated_count)
     """
@@ -72,26 +77,41 @@ def refresh(conn,
     checked = 0
     changed = 0
     streak_404 = 0
+    batch_size = max(1, int(os.getenv("OZF_UPSERT_BATCH", "50")))
+    found: List[Dict[str, Optional[str]]] = []
+
+    def _flush():
+        nonlocal changed
+        if found:
+            changed += upsert_oz_players(conn, found, batch_size)
+            logger.info("Roster refresh: upserted %d profile(s)", len(found))
+            found.clear()
 
     logger.info("Roster refresh: starting from oz_id=%s", base)
-    for i in range(1, int(max_probe) + 1):
-        oz_id = base + i
-        rec = probe_user(oz_id)
-        checked += 1
-
-        if rec.get("steamid64"):
-            streak_404 = 0
-            changed += upsert_oz_players(conn, [rec])
-            logger.info("oz_id=%s steamid64=%s name=%s", oz_id, rec.get("steamid64"), (rec.get("current_name") or "")[:48])
-        else:
-            streak_404 += 1
-            logger.info("oz_id=%s → 404 (streak=%s)", oz_id, streak_404)
-
-        if streak_404 >= int(stop_after_404):
-            logger.info("Stopping after %s consecutive 404s.", streak_404)
-            break
-
-        time.sleep(max(0, int(sleep_ms)) / 1000.0)
+    try:
+        for i in range(1, int(max_probe) + 1):
+            oz_id = base + i
+            rec = probe_user(oz_id)
+            checked += 1
+
+            if rec.get("steamid64"):
+                streak_404 = 0
+                found.append(rec)
+                logger.info("oz_id=%s steamid64=%s name=%s", oz_id, rec.get("steamid64"), (rec.get("current_name") or "")[:48])
+                if len(found) >= batch_size:
+                    _flush()
+            else:
+                streak_404 += 1
+                logger.info("oz_id=%s → 404 (streak=%s)", oz_id, streak_404)
+
+            if streak_404 >= int(stop_after_404):
+                logger.info("Stopping after %s consecutive 404s.", streak_404)
+                break
+
+            time.sleep(max(0, int(sleep_ms)) / 1000.0)
+    finally:
+        # profiles already probed are kept even if a later probe raises
+        _flush()
 
     logger.info("Roster refresh: checked=%s changed=%s", checked, changed)
     return checked, changed
@@ -4,11 +4,16 @@ from __future__ import annotations
 import os
 import time
 import math
+import shutil
 import logging
+import numpy as np
 import pandas as pd
-from typing import Optional, Tuple, List
+from typing import Iterable, Iterator, Optional, Sequence, Tuple, List
 from datetime import datetime, timedelta, timezone, time as dtime
 
+import artifacts
+import daily_counts
+
 logger = logging.getLogger("slursbot")
 
 # -----------------------
@@ -65,108 +70,104 @@ def _safe_write_text(text: str, out_path: str) -> str:
         f.write(text)
     return _atomic_replace(tmp, out_path)
 
+def _link_latest(src: str, latest_path: str) -> str:
+    """Refresh latest_path with src's bytes: a hard link (no second write), else a file copy.
+    Returns latest_path, or src if latest is locked."""
+    tmp = latest_path + ".tmp"
+    try:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        try:
+            os.link(src, tmp)
+        except OSError:  # FAT/exFAT, network shares, cross-device
+            shutil.copyfile(src, tmp)
+    except OSError as e:
+        logger.warning("latest refresh failed for %s: %s", latest_path, e)
+        return src
+    if _atomic_replace(tmp, latest_path) == latest_path:
+        return latest_path
+    try:
+        os.remove(tmp)
+    except OSError:
+        pass
+    return src
+
+def _csv_paths(out_dir: str, base_name: str) -> Tuple[str, str]:
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return os.path.join(out_dir, f"{base_name}_{ts}.csv"), os.path.join(out_dir, f"{base_name}.csv")
+
 def _safe_write_csv(df: pd.DataFrame, out_dir: str, base_name: str) -> Tuple[str, str]:
     """Write timestamped and 'latest' CSV; return (timestamped_path, final_latest_path_used)."""
     _ensure_dir(out_dir)
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    ts_path = os.path.join(out_dir, f"{base_name}_{ts}.csv")
-    latest_path = os.path.join(out_dir, f"{base_name}.csv")
+    ts_path, latest_path = _csv_paths(out_dir, base_name)
     tmp_path = ts_path + ".tmp"
     df.to_csv(tmp_path, index=False, encoding="utf-8", lineterminator="\n")
     os.replace(tmp_path, ts_path)
-    # refresh latest (best-effort)
-    try:
-        tmp_latest = latest_path + ".tmp"
-        df.to_csv(tmp_latest, index=False, encoding="utf-8", lineterminator="\n")
-        _atomic_replace(tmp_latest, latest_path)
-        used = latest_path
-    except PermissionError:
-        used = ts_path
-    return ts_path, used
+    # refresh latest (best-effort; linked, not serialized again)
+    return ts_path, _link_latest(ts_path, latest_path)
 
 # -----------------------
 # SQL helpers (OZF-only)
 # -----------------------
-def _fetch_counts_master(conn, since_utc: datetime, before_utc: datetime) -> pd.DataFrame:
+def _count_windows(since_utc: datetime, before_utc: datetime, extra_days: Sequence[int] = (),
+                   now: Optional[datetime] = None) -> List[daily_counts.Window]:
+    """c1 = the given (Adelaide-day) window, then c7/c31/c180 (+ any extra_days) ending now."""
+    days = [7, 31, 180] + [int(d) for d in extra_days if int(d) not in (7, 31, 180)]
+    return [("c1", since_utc, before_utc)] + daily_counts.last_days(days, now or datetime.now(timezone.utc))
+
+def _counts_master_sql(windows: Sequence[daily_counts.Window], rollup: bool,
+                       msg_table: str = daily_counts.MSG_TABLE,
+                       roster: str = "kian.oz.v_players_clean") -> Tuple[str, list]:
+    """
+    Roster LEFT JOIN one derived table of per-player counts: a column per window, c_all and
+    first/last hit. From the daily rollup when rollup is set, else one grouped pass over msg_table.
+    """
+    if rollup:
+        counts, params = daily_counts.counts_sql(windows, msg_table=msg_table)
+    else:
+        counts, params = daily_counts.scan_counts_sql(windows, msg_table=msg_table)
+    cols = ",\n           ".join(f"ISNULL(c.{w[0]},0) AS {w[0]}" for w in windows)
+    sql = f"""
+    SELECT v.steamid64_bigint AS steamid64, v.player_id, v.oz_id, v.current_name,
+           {cols},
+           ISNULL(c.c_all,0) AS c_all,
+           c.first_hit_utc,
+           c.last_hit_utc
+    FROM {roster} AS v
+    LEFT JOIN ({counts}
+    ) AS c ON c.steamid64 = v.steamid64_bigint
+    WHERE v.steamid64_bigint IS NOT NULL
+    """
+    return sql, params
+
+def _fetch_counts_master(conn, since_utc: datetime, before_utc: datetime,
+                         windows: Optional[Sequence[daily_counts.Window]] = None) -> pd.DataFrame:
     """
     Counts per OZF player across multiple windows:
       c1 (given window), c7, c31, c180, c_all, plus first/last seen.
     Restricts strictly to roster by joining kian.oz.v_players_clean (steamid64_bigint).
+    windows overrides the count columns (e.g. _count_windows(..., extra_days=[14, 90, 365])).
+    Read from the daily rollup when it exists (daily_counts), else in a single pass over slurs_msg.
     """
-    sql = """
-    DECLARE @since  DATETIME2(3) = ?;
-    DECLARE @before DATETIME2(3) = ?;
-    DECLARE @now    DATETIME2(3) = SYSUTCDATETIME();
-
-    WITH base AS (
-      SELECT v.steamid64_bigint AS steamid64, v.player_id, v.oz_id, v.current_name
-      FROM kian.oz.v_players_clean AS v
-      WHERE v.steamid64_bigint IS NOT NULL
-    ),
-    c1 AS (
-      SELECT m.steamid64, COUNT(*) AS c1
-      FROM kiancat.dbo.slurs_msg AS m
-      JOIN kian.oz.v_players_clean AS v ON v.steamid64_bigint = m.steamid64
-      WHERE m.msg_time_utc >= @since AND m.msg_time_utc < @before
-      GROUP BY m.steamid64
-    ),
-    c7 AS (
-      SELECT m.steamid64, COUNT(*) AS c7
-      FROM kiancat.dbo.slurs_msg AS m
-      JOIN kian.oz.v_players_clean AS v ON v.steamid64_bigint = m.steamid64
-      WHERE m.msg_time_utc >= DATEADD(DAY,-7,@now) AND m.msg_time_utc < @now
-      GROUP BY m.steamid64
-    ),
-    c31 AS (
-      SELECT m.steamid64, COUNT(*) AS c31
-      FROM kiancat.dbo.slurs_msg AS m
-      JOIN kian.oz.v_players_clean AS v ON v.steamid64_bigint = m.steamid64
-      WHERE m.msg_time_utc >= DATEADD(DAY,-31,@now) AND m.msg_time_utc < @now
-      GROUP BY m.steamid64
-    ),
-    c180 AS (
-      SELECT m.steamid64, COUNT(*) AS c180
-      FROM kiancat.dbo.slurs_msg AS m
-      JOIN kian.oz.v_players_clean AS v ON v.steamid64_bigint = m.steamid64
-      WHERE m.msg_time_utc >= DATEADD(DAY,-180,@now) AND m.msg_time_utc < @now
-      GROUP BY m.steamid64
-    ),
-    call AS (
-      SELECT m.steamid64, COUNT(*) AS c_all,
-             CAST(MIN(m.msg_time_utc) AS DATETIME2(3)) AS first_hit_utc,
-             CAST(MAX(m.msg_time_utc) AS DATETIME2(3)) AS last_hit_utc
-      FROM kiancat.dbo.slurs_msg AS m
-      JOIN kian.oz.v_players_clean AS v ON v.steamid64_bigint = m.steamid64
-      GROUP BY m.steamid64
-    )
-    SELECT b.steamid64, b.player_id, b.oz_id, b.current_name,
-           ISNULL(c1.c1,0)   AS c1,
-           ISNULL(c7.c7,0)   AS c7,
-           ISNULL(c31.c31,0) AS c31,
-           ISNULL(c180.c180,0) AS c180,
-           ISNULL(call.c_all,0) AS c_all,
-           call.first_hit_utc,
-           call.last_hit_utc
-    FROM base AS b
-    LEFT JOIN c1   ON c1.steamid64 = b.steamid64
-    LEFT JOIN c7   ON c7.steamid64 = b.steamid64
-    LEFT JOIN c31  ON c31.steamid64 = b.steamid64
-    LEFT JOIN c180 ON c180.steamid64 = b.steamid64
-    LEFT JOIN call ON call.steamid64 = b.steamid64
-    """
-    df = pd.read_sql(sql, conn, params=[since_utc, before_utc])
+    windows = list(windows) if windows is not None else _count_windows(since_utc, before_utc)
+    sql, params = _counts_master_sql(windows, rollup=daily_counts.exists(conn))
+    df = pd.read_sql(sql, conn, params=params)
     # Ensure proper dtypes
-    for c in ("c1","c7","c31","c180","c_all"):
+    for c in [w[0] for w in windows] + ["c_all"]:
         if c in df.columns:
             df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0).astype(int)
     return df
 
-def _fetch_messages_1d(conn, since_utc: datetime, before_utc: datetime) -> pd.DataFrame:
-    """
-    Messages in the 1-day Adelaide window (UTC bounds passed in).
-    Includes links: logs.tf. Restricted to OZF roster.
-    """
-    sql = """
+MESSAGE_COLS = ["date_local", "player_name", "player_id", "oz_id", "steamid64", "message_text", "logs.tf"]
+
+def _messages_sql(since_utc: Optional[datetime], before_utc: Optional[datetime]) -> Tuple[str, list]:
+    """Roster messages in [since_utc, before_utc) (either bound may be None), oldest first."""
+    where, params = [], []
+    if since_utc is not None:
+        where.append("m.msg_time_utc >= ?"); params.append(since_utc)
+    if before_utc is not None:
+        where.append("m.msg_time_utc < ?"); params.append(before_utc)
+    sql = f"""
     SELECT
       CAST(m.msg_time_utc AS DATETIME2(0)) AS msg_time_utc,
       v.current_name,
@@ -177,20 +178,46 @@ def _fetch_messages_1d(conn, since_utc: datetime, before_utc: datetime) -> pd.Da
       m.logid
     FROM kiancat.dbo.slurs_msg AS m
     JOIN kian.oz.v_players_clean AS v ON v.steamid64_bigint = m.steamid64
-    WHERE m.msg_time_utc >= ? AND m.msg_time_utc < ?
+    {"WHERE " + " AND ".join(where) if where else ""}
     ORDER BY m.msg_time_utc ASC
     """
-    df = pd.read_sql(sql, conn, params=[since_utc, before_utc])
-    # Derive convenience columns
+    return sql, params
+
+def _frame_messages(df: pd.DataFrame) -> pd.DataFrame:
+    """Raw _messages_sql rows -> MESSAGE_COLS (local time, logs.tf link). Ids are nullable Int64 so
+    every chunk of a streamed export formats them the same way."""
     ADL = _adelaide()
     try:
         dt = pd.to_datetime(df["msg_time_utc"], utc=True)
         df["date_local"] = dt.dt.tz_convert(ADL).dt.strftime("%Y-%m-%d %H:%M")
     except Exception:
         df["date_local"] = df["msg_time_utc"].astype(str)
-    df["logs.tf"] = df["logid"].apply(lambda x: f"https://logs.tf/{int(x)}" if pd.notna(x) else "")
+    for c in ("player_id", "oz_id", "steamid64", "logid"):
+        df[c] = pd.to_numeric(df[c]).astype("Int64")
+    df["logs.tf"] = ("https://logs.tf/" + _id_col(df["logid"])).where(df["logid"].notna(), "")
     df.rename(columns={"current_name":"player_name", "text":"message_text"}, inplace=True)
-    return df[["date_local","player_name","player_id","oz_id","steamid64","message_text","logs.tf"]]
+    return df[MESSAGE_COLS]
+
+def _fetch_messages_1d(conn, since_utc: datetime, before_utc: datetime) -> pd.DataFrame:
+    """
+    Messages in the 1-day Adelaide window (UTC bounds passed in).
+    Includes links: logs.tf. Restricted to OZF roster.
+    """
+    sql, params = _messages_sql(since_utc, before_utc)
+    return _frame_messages(pd.read_sql(sql, conn, params=params))
+
+def _iter_message_frames(conn, since_utc: Optional[datetime], before_utc: Optional[datetime],
+                         batch_rows: int) -> Iterator[pd.DataFrame]:
+    """_fetch_messages_1d for any range, as MESSAGE_COLS frames of <= batch_rows (cursor.fetchmany)."""
+    sql, params = _messages_sql(since_utc, before_utc)
+    with conn.cursor() as cur:
+        cur.execute(sql, params)
+        cols = [d[0] for d in cur.description]
+        while True:
+            rows = cur.fetchmany(batch_rows)
+            if not rows:
+                break
+            yield _frame_messages(pd.DataFrame.from_records([tuple(r) for r in rows], columns=cols))
 
 # -----------------------
 # HTML rendering
@@ -210,73 +237,205 @@ _CSS = """
 </style>
 """
 
-def _player_links(row) -> str:
-    name = str(row.get("current_name") or row.get("player_name") or "")
-    ozid = row.get("oz_id")
-    sid  = row.get("steamid64")
-    oz   = f"https://ozfortress.com/users/{int(ozid)}" if pd.notna(ozid) else None
-    sl   = f"https://slurs.tf/player?steamid={int(sid)}" if pd.notna(sid) else None
-    st   = f"https://steamcommunity.com/profiles/{int(sid)}" if pd.notna(sid) else None
-    links = []
-    if oz: links.append(f'<a href="{oz}" target="_blank">ozf</a>')
-    if sl: links.append(f'<a href="{sl}" target="_blank">slurs</a>')
-    if st: links.append(f'<a href="{st}" target="_blank">steam</a>')
-    suffix = " <span class='muted'>(" + " · ".join(links) + ")</span>" if links else ""
-    return f"{name}{suffix}"
-
-def _render_html_summary(counts: pd.DataFrame, title: str, rank_col: str) -> str:
-    df = counts.copy()
-    if rank_col not in df.columns:
-        rank_col = "c_all"
-    # Only show rows with >0 in the chosen window
-    df = df[df[rank_col] > 0].copy()
-    df.sort_values([rank_col, "current_name"], ascending=[False, True], inplace=True)
-
-    rows = []
-    for _, r in df.iterrows():
-        rows.append(
-            "<tr>"
-            f"<td>{_player_links(r)}</td>"
-            f"<td class='num'>{int(r.get('c1',0))}</td>"
-            f"<td class='num'>{int(r.get('c7',0))}</td>"
-            f"<td class='num'>{int(r.get('c31',0))}</td>"
-            f"<td class='num'>{int(r.get('c180',0))}</td>"
-            f"<td class='num'>{int(r.get('c_all',0))}</td>"
-            "</tr>"
-        )
-    table = (
-        "<table>"
-        "<thead><tr>"
-        "<th>Player</th><th>1d</th><th>7d</th><th>31d</th><th>180d</th><th>All</th>"
-        "</tr></thead>"
-        "<tbody>" + "".join(rows) + "</tbody>"
-        "</table>"
-    )
+# Column-wise rendering: every cell is built with whole-column string ops and the rows joined once.
+# Output matches the old per-row (iterrows) renderer byte for byte; bench.py html keeps that copy.
+def _truthy(s: pd.Series) -> pd.Series:
+    """bool(x) per value (None / "" / 0 are False, NaN is True), like `x or ...` in the row loop."""
+    return s.astype(object).astype(bool)
+
+def _str_col(s: pd.Series) -> pd.Series:
+    """str(x) per value as an object column (None -> "None", NaN -> "nan", like an f-string)."""
+    return pd.Series(s.to_numpy(dtype=object).astype(str).astype(object), index=s.index, dtype=object)
+
+def _id_col(s: pd.Series) -> pd.Series:
+    """str(int(x)) where x is not null, else ""."""
+    out = pd.Series("", index=s.index, dtype=object)
+    m = s.notna()
+    if m.any():
+        out[m] = _str_col(s[m].astype("int64"))
+    return out
+
+def _int_col(df: pd.DataFrame, col: str) -> pd.Series:
+    if col not in df.columns:
+        return pd.Series("0", index=df.index, dtype=object)
+    return _str_col(df[col].astype("int64"))
+
+def _player_links_col(name: pd.Series, oz_id: pd.Series, steamid64: pd.Series) -> pd.Series:
+    """Player cell: name + " (ozf · slurs · steam)" links for whichever ids are present."""
+    oz, sid = _id_col(oz_id), _id_col(steamid64)
+    has_oz, has_sid = oz != "", sid != ""
+    oz_a = ('<a href="https://ozfortress.com/users/' + oz + '" target="_blank">ozf</a>').where(has_oz, "")
+    sid_a = ('<a href="https://slurs.tf/player?steamid=' + sid + '" target="_blank">slurs</a> · '
+             '<a href="https://steamcommunity.com/profiles/' + sid + '" target="_blank">steam</a>').where(has_sid, "")
+    sep = pd.Series(" · ", index=name.index, dtype=object).where(has_oz & has_sid, "")
+    suffix = (" <span class='muted'>(" + oz_a + sep + sid_a + ")</span>").where(has_oz | has_sid, "")
+    return name + suffix
+
+def _name_col(df: pd.DataFrame, *cols: str) -> pd.Series:
+    """First truthy value of cols, as str ("" if none)."""
+    out = pd.Series("", index=df.index, dtype=object)
+    todo = pd.Series(True, index=df.index)
+    for c in cols:
+        if c not in df.columns:
+            continue
+        v = df[c].astype(object)
+        m = todo & _truthy(v)
+        out[m] = _str_col(v[m])
+        todo &= ~m
+    return out
+
+_SUMMARY_THEAD = ("<thead><tr>"
+                  "<th>Player</th><th>1d</th><th>7d</th><th>31d</th><th>180d</th><th>All</th>"
+                  "</tr></thead>")
+_MESSAGES_THEAD = "<thead><tr><th>Local Time</th><th>Player</th><th>Message</th><th>Log</th></tr></thead>"
+_HTML_TAIL = "</tbody></table></body></html>"
+
+def _html_head(title: str, thead: str) -> str:
+    """Everything up to the first <tr> of the table; rows then _HTML_TAIL follow."""
     now_txt = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     return f"<!doctype html><html><head><meta charset='utf-8'>{_CSS}</head><body>" \
-           f"<h1>{title}</h1><div class='meta'>Generated {now_txt}</div>{table}</body></html>"
+           f"<h1>{title}</h1><div class='meta'>Generated {now_txt}</div><table>{thead}<tbody>"
+
+def _summary_frame(counts: pd.DataFrame, rank_col: str) -> pd.DataFrame:
+    """Rows with >0 in rank_col (c_all if missing), highest first."""
+    if rank_col not in counts.columns:
+        rank_col = "c_all"
+    return counts[counts[rank_col] > 0].sort_values([rank_col, "current_name"], ascending=[False, True])
+
+def _summary_rows(df: pd.DataFrame) -> np.ndarray:
+    """One <tr> string per counts row, in df order."""
+    rows = "<tr><td>" + _player_links_col(_name_col(df, "current_name", "player_name"), df["oz_id"], df["steamid64"])
+    for c in ("c1", "c7", "c31", "c180", "c_all"):
+        rows = rows + "</td><td class='num'>" + _int_col(df, c)
+    rows = rows + "</td></tr>"
+    return rows.to_numpy(dtype=object)
+
+def _summary_rows_html(df: pd.DataFrame) -> str:
+    return "".join(_summary_rows(df))
+
+def _summary_order(counts: pd.DataFrame, rank_col: str, name_rank: np.ndarray,
+                   nonzero: bool = True) -> np.ndarray:
+    """
+    Row positions _summary_frame would give (rank_col > 0, rank_col desc then current_name asc,
+    ties in frame order) from a single stable argsort; name_rank is _name_rank(counts).
+    nonzero=False keeps the zero rows (at the end).
+    """
+    if rank_col not in counts.columns:
+        rank_col = "c_all"
+    vals = counts[rank_col].to_numpy()
+    order = np.lexsort((name_rank, -vals))
+    return order[:int((vals > 0).sum())] if nonzero else order  # counts are >= 0: the >0 rows are a prefix
+
+def _name_rank(counts: pd.DataFrame) -> np.ndarray:
+    """current_name as sortable numbers (ties equal, missing last), shared by every mode's order."""
+    return counts["current_name"].rank(method="min", na_option="bottom").to_numpy()
+
+def _messages_rows_html(df: pd.DataFrame) -> str:
+    logs = df["logs.tf"].astype(object)
+    logs_html = ('<a href="' + _str_col(logs) + '" target="_blank">logs.tf</a>').where(_truthy(logs), "")
+    text = _str_col(df["message_text"].astype(object).fillna(""))  # the row loop raised on NaN; render blank
+    text = text.str.replace("<", "&lt;", regex=False).str.replace(">", "&gt;", regex=False)
+    rows = ("<tr><td>" + _str_col(df["date_local"])
+            + "</td><td>" + _player_links_col(_name_col(df, "player_name"), df["oz_id"], df["steamid64"])
+            + "</td><td>" + text
+            + "</td><td>" + logs_html
+            + "</td></tr>")
+    return "".join(rows.tolist())
+
+def _render_html_summary(counts: pd.DataFrame, title: str, rank_col: str) -> str:
+    return _html_head(title, _SUMMARY_THEAD) + _summary_rows_html(_summary_frame(counts, rank_col)) + _HTML_TAIL
 
 def _render_html_messages(msgs_1d: pd.DataFrame, title: str) -> str:
-    rows = []
-    for _, r in msgs_1d.iterrows():
-        logs = r["logs.tf"]
-        logs_html = f'<a href="{logs}" target="_blank">logs.tf</a>' if logs else ""
-        rows.append(
-            "<tr>"
-            f"<td>{r['date_local']}</td>"
-            f"<td>{_player_links({'current_name': r['player_name'], 'oz_id': r['oz_id'], 'steamid64': r['steamid64']})}</td>"
-            f"<td>{(r['message_text'] or '').replace('<','&lt;').replace('>','&gt;')}</td>"
-            f"<td>{logs_html}</td>"
-            "</tr>"
-        )
-    table = (
-        "<table>"
-        "<thead><tr><th>Local Time</th><th>Player</th><th>Message</th><th>Log</th></tr></thead>"
-        "<tbody>" + "".join(rows) + "</tbody></table>"
-    )
-    now_txt = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    return f"<!doctype html><html><head><meta charset='utf-8'>{_CSS}</head><body>" \
-           f"<h1>{title}</h1><div class='meta'>Generated {now_txt}</div>{table}</body></html>"
+    return _html_head(title, _MESSAGES_THEAD) + _messages_rows_html(msgs_1d) + _HTML_TAIL
+
+# -----------------------
+# Streaming report writer
+# -----------------------
+REPORT_CHUNK_ROWS = int(os.getenv("REPORT_CHUNK_ROWS", "20000"))
+
+def _chunks(rows, n: int = REPORT_CHUNK_ROWS) -> Iterator:
+    """Consecutive slices of <= n rows of a DataFrame (or array of row positions)."""
+    n = max(1, n)
+    take = rows.iloc if isinstance(rows, pd.DataFrame) else rows
+    for lo in range(0, len(rows), n):
+        yield take[lo:lo + n]
+
+class _ReportWriter:
+    """
+    One HTML table and/or CSV written chunk by chunk, so memory stays at one chunk however
+    many rows go through. Both land in .tmp files and are renamed into place on close();
+    the CSV's 'latest' copy is then linked (or copied), not serialized a second time.
+    On error the .tmp files are removed and the previous outputs stay untouched.
+    """
+    def __init__(self, out_dir: str, *, html_name: Optional[str] = None, title: str = "", thead: str = "",
+                 render=None, csv_base: Optional[str] = None, csv_cols: Optional[Sequence[str]] = None):
+        _ensure_dir(out_dir)
+        self.rows = 0
+        self.render = render
+        self.csv_cols = list(csv_cols) if csv_cols is not None else None
+        self.html_path = os.path.join(out_dir, html_name) if html_name else None
+        self.csv_path, self.latest_path = _csv_paths(out_dir, csv_base) if csv_base else (None, None)
+        self._html = self._csv = None
+        try:
+            if self.html_path:
+                self._html = open(self.html_path + ".tmp", "w", encoding="utf-8")
+                self._html.write(_html_head(title, thead))
+            if self.csv_path:
+                self._csv = open(self.csv_path + ".tmp", "w", encoding="utf-8", newline="")
+                if self.csv_cols is not None:
+                    pd.DataFrame(columns=self.csv_cols).to_csv(self._csv, index=False, lineterminator="\n")
+        except Exception:
+            self.abort()
+            raise
+
+    def write(self, df: pd.DataFrame) -> None:
+        if self._html is not None:
+            self._html.write(self.render(df))
+        if self._csv is not None:
+            if self.csv_cols is None:
+                self.csv_cols = list(df.columns)
+                df.to_csv(self._csv, index=False, lineterminator="\n")
+            else:
+                df[self.csv_cols].to_csv(self._csv, index=False, header=False, lineterminator="\n")
+        self.rows += len(df)
+
+    def write_all(self, chunks: Iterable[pd.DataFrame]) -> "_ReportWriter":
+        for df in chunks:
+            self.write(df)
+        return self
+
+    def close(self) -> List[str]:
+        """Rename into place; returns the html path, then the timestamped and latest CSV paths."""
+        out = []
+        if self._html is not None:
+            self._html.write(_HTML_TAIL)
+            self._html.close()
+            out.append(_atomic_replace(self.html_path + ".tmp", self.html_path))
+        if self._csv is not None:
+            self._csv.close()
+            os.replace(self.csv_path + ".tmp", self.csv_path)
+            out += [self.csv_path, _link_latest(self.csv_path, self.latest_path)]
+        self._html = self._csv = None
+        return out
+
+    def abort(self) -> None:
+        for f, path in ((self._html, self.html_path), (self._csv, self.csv_path)):
+            if f is not None:
+                f.close()
+                try:
+                    os.remove(path + ".tmp")
+                except OSError:
+                    pass
+        self._html = self._csv = None
+
+    def __enter__(self) -> "_ReportWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
 
 # -----------------------
 # PUBLIC: HTML reports
@@ -294,170 +453,234 @@ def _mode_title(mode: str) -> str:
     lookup = {"1":"1 Day", "7":"7 Days", "31":"31 Days", "180":"180 Days", "all":"All Time"}
     return lookup.get(m, m)
 
-def make_reports(conn, out_dir: str, mode: str) -> List[str]:
+def make_reports(conn, out_dir: str, mode: str, ctx=None,
+                 state: Optional[artifacts.ArtifactState] = None) -> List[str]:
     """
     Build CSV + HTML in out_dir for the requested mode.
     HTML files:
       - slurs_summary_<mode>.html
       - slurs_messages_1d.html (only for mode 1)
+    ctx (run_context.RunContext) shares the counts / messages with the rest of the run.
+    state (artifacts.ArtifactState) skips outputs whose input data is unchanged since the last build.
     Returns list of written file paths.
     """
+    return make_reports_all(conn, out_dir, modes=[mode], ctx=ctx, state=state)
+
+def make_reports_all(conn, out_dir: str, modes: Sequence[str] = ("1", "7", "31", "180", "all"),
+                     ctx=None, state: Optional[artifacts.ArtifactState] = None) -> List[str]:
+    """
+    make_reports for several modes from one dataset: the counts are fetched once, written to
+    one summary_counts_ozf CSV, every player's row is rendered once, and each mode's
+    slurs_summary_<mode>.html is that row set filtered/ordered by one argsort on its column.
+    With a state, each output is only rewritten when the rows it shows changed (digest of those rows).
+    Returns list of written HTML paths.
+    """
     _ensure_dir(out_dir)
+    t0 = time.perf_counter()
+    modes = list(dict.fromkeys(str(m).strip().lower() for m in modes))
 
-    # For the counts we need a 1-day window argument; c1 uses it, others use NOW windows.
-    if str(mode).lower() == "1":
-        since_utc, before_utc = _adelaide_window_22h()
+    # c1 uses the Adelaide-day window; c7/c31/c180/c_all end now
+    since_utc, before_utc = _adelaide_window_22h()
+    if ctx is not None:
+        counts = ctx.counts(conn, since_utc, before_utc)
     else:
-        # Still compute a plausible day window so c1 has a reference point.
-        since_utc, before_utc = _adelaide_window_22h()
-
-    counts = _fetch_counts_master(conn, since_utc, before_utc)
+        counts = _fetch_counts_master(conn, since_utc, before_utc)
     written = []
 
-    # CSV (timestamped + latest) for summary counts
-    _safe_write_csv(counts, out_dir, base_name="summary_counts_ozf")
-
-    # HTML summary (sorted by chosen mode)
-    rank_col = _mode_to_rank_col(mode)
-    title = f"OZF Slurs — Summary ({_mode_title(mode)})"
-    html = _render_html_summary(counts, title=title, rank_col=rank_col)
-    path_sum = os.path.join(out_dir, f"slurs_summary_{str(mode).lower()}.html")
-    written.append(_safe_write_text(html, path_sum))
-
-    # If mode is "1", also write per-message 1-day table
-    if str(mode).lower() == "1":
-        msgs = _fetch_messages_1d(conn, since_utc, before_utc)
-        # CSV set for messages_1d
-        _safe_write_csv(msgs, out_dir, base_name="messages_1d_ozf")
-        htmlm = _render_html_messages(msgs, title="OZF Slurs — Messages (Last Adelaide Day)")
-        path_msg = os.path.join(out_dir, "slurs_messages_1d.html")
-        written.append(_safe_write_text(htmlm, path_msg))
-
-    logger.info("HTML reports (mode=%s) built in %s", mode, out_dir)
-    logger.info("HTML reports written to %s (mode=%s)", out_dir, mode)
+    # CSV (timestamped + latest) for summary counts, once per call
+    csv_latest = os.path.join(out_dir, "summary_counts_ozf.csv")
+    if artifacts.needs(state, "summary_counts_ozf.csv", lambda: artifacts.frame_digest(counts), [csv_latest]):
+        _, used = _safe_write_csv(counts, out_dir, base_name="summary_counts_ozf")
+        artifacts.done(state, "summary_counts_ozf.csv", [used])
+
+    # HTML summaries: shared rows, one order per mode, streamed a chunk of rows at a time
+    rows, name_rank = None, _name_rank(counts)
+    hashes = artifacts.row_hashes(counts, _COUNT_COLS) if state is not None else None
+    for mode in modes:
+        order = _summary_order(counts, _mode_to_rank_col(mode), name_rank)
+        name, title = f"slurs_summary_{mode}.html", f"OZF Slurs — Summary ({_mode_title(mode)})"
+        if not artifacts.needs(state, name, lambda: artifacts.digest(title, hashes[order]),
+                               [os.path.join(out_dir, name)]):
+            continue
+        if rows is None:
+            rows = _summary_rows(counts)
+        with _ReportWriter(out_dir, html_name=name, title=title,
+                           thead=_SUMMARY_THEAD, render=lambda idx: "".join(rows[idx])) as w:
+            paths = w.write_all(_chunks(order)).close()
+        written += paths
+        artifacts.done(state, name, paths)
+
+    # If mode 1 is built, also write the per-message 1-day table
+    if "1" in modes:
+        msgs = ctx.messages_1d(conn, since_utc, before_utc) if ctx is not None else _fetch_messages_1d(conn, since_utc, before_utc)
+        # HTML + CSV set for messages_1d in one pass
+        name = "slurs_messages_1d.html"
+        if artifacts.needs(state, name, lambda: artifacts.frame_digest(msgs),
+                           [os.path.join(out_dir, name), os.path.join(out_dir, "messages_1d_ozf.csv")]):
+            with _ReportWriter(out_dir, html_name=name,
+                               title="OZF Slurs — Messages (Last Adelaide Day)", thead=_MESSAGES_THEAD,
+                               render=_messages_rows_html, csv_base="messages_1d_ozf", csv_cols=MESSAGE_COLS) as w:
+                paths = w.write_all(_chunks(msgs)).close()
+            written += paths[:1]
+            artifacts.done(state, name, [paths[0], paths[2]])
+
+    logger.info("HTML reports (modes=%s, %d players) built in %.2fs", ",".join(modes), len(counts),
+                time.perf_counter() - t0)
+    logger.info("HTML reports written to %s (modes=%s)", out_dir, ",".join(modes))
     return written
 
+def export_messages(conn, out_dir: str, since_utc: Optional[datetime] = None,
+                    before_utc: Optional[datetime] = None, base_name: str = "messages_all_ozf",
+                    batch_rows: int = REPORT_CHUNK_ROWS) -> List[str]:
+    """
+    Every roster message in [since_utc, before_utc) (open-ended when None) to
+    slurs_<base_name>.html + <base_name>_<ts>.csv / <base_name>.csv, streamed from the cursor
+    in fetchmany(batch_rows) chunks: memory is one chunk even for a multi-year export.
+    Returns [html, csv, latest csv].
+    """
+    t0 = time.perf_counter()
+    span = f"{since_utc:%Y-%m-%d}" if since_utc else "start"
+    span += f" → {before_utc:%Y-%m-%d}" if before_utc else " → now"
+    with _ReportWriter(out_dir, html_name=f"slurs_{base_name}.html",
+                       title=f"OZF Slurs — Messages ({span})", thead=_MESSAGES_THEAD,
+                       render=_messages_rows_html, csv_base=base_name, csv_cols=MESSAGE_COLS) as w:
+        w.write_all(_iter_message_frames(conn, since_utc, before_utc, batch_rows))
+        paths = w.close()
+    logger.info("export-messages: %d rows in %.1fs -> %s", w.rows, time.perf_counter() - t0, ", ".join(paths))
+    return paths
+
 # -----------------------
 # Excel writer helpers
 # -----------------------
-def _xlsx_formats(writer):
-    book = writer.book
-    fmt_header = book.add_format({"bold": True, "bg_color": "#f3f4f6", "border": 1})
-    fmt_num    = book.add_format({"num_format": "0", "border": 1})
-    fmt_text   = book.add_format({"border": 1})
-    return fmt_header, fmt_num, fmt_text
-
-def _write_counts_sheet(writer, name: str, counts: pd.DataFrame, by_col: str):
-    df = counts.copy()
-    if by_col not in df.columns:
-        by_col = "c_all"
-    df.sort_values([by_col, "current_name"], ascending=[False, True], inplace=True)
-    cols = ["current_name","player_id","oz_id","steamid64","c1","c7","c31","c180","c_all"]
-    for c in cols:
-        if c not in df.columns:
-            df[c] = 0
-    df = df[cols]
-
-    df.to_excel(writer, sheet_name=name, index=False, startrow=1, header=False)
-    ws = writer.book.get_worksheet_by_name(name)
-    fmt_header, _, _ = _xlsx_formats(writer)
-    for i, h in enumerate(cols):
-        ws.write(0, i, h, fmt_header)
-    # widths
-    ws.set_column(0, 0, 26)  # current_name
-    ws.set_column(1, 1, 10)  # player_id
-    ws.set_column(2, 2, 10)  # oz_id
-    ws.set_column(3, 3, 18)  # steamid64
-    ws.set_column(4, 8, 8)   # counts
+# xlsxwriter constant_memory: each sheet is streamed row by row straight from column arrays (no
+# DataFrame copies; only the current row is held), so rows are written in order and every
+# cell is placed once. Worksheet tables aren't available in that mode, so sheets get an
+# autofilter + frozen header instead; Excel sorts/filters them, rather than one re-sorted copy per window.
+EXCEL_PAGE_ROWS = 50000  # messages per sheet (Excel allows 65,530 hyperlinks per sheet)
+EXCEL_NONZERO_ONLY = os.getenv("EXCEL_NONZERO_ONLY", "0").strip().lower() in ("1", "true", "yes")
+
+_COUNT_COLS = ["current_name", "player_id", "oz_id", "steamid64", "c1", "c7", "c31", "c180", "c_all"]
+_COUNT_WIDTHS = [26, 10, 10, 18, 8, 8, 8, 8, 8]
+_MESSAGE_WIDTHS = [12, 26, 10, 10, 18, 80, 16]
+
+def _xlsx_column(df: pd.DataFrame, col: str, idx: Optional[np.ndarray] = None) -> list:
+    """df[col] (rows idx, in that order) as Python values with NaN/NA as None (blank cell)."""
+    if col not in df.columns:
+        return [0] * (len(df) if idx is None else len(idx))
+    v = df[col].to_numpy(dtype=object)
+    if idx is not None:
+        v = v[idx]
+    v[pd.isna(v)] = None
+    return v.tolist()
+
+def _xlsx_sheet(book, name: str, header: Sequence[str], widths: Sequence[int], columns: Sequence[list],
+                fmt_header, url_col: Optional[int] = None, url_text: str = "") -> None:
+    """
+    One sheet: bold header, column widths, frozen header row, autofilter over the data, then
+    columns written row by row. url_col cells become hyperlinks labelled url_text (blank if empty).
+    """
+    ws = book.add_worksheet(name)
+    for i, w in enumerate(widths):
+        ws.set_column(i, i, w)
     ws.freeze_panes(1, 0)
-
-def _write_messages_1d_pages(writer, base_name: str, msgs: pd.DataFrame, page_size: int = 50000):
-    n = len(msgs)
-    if n == 0:
-        df = pd.DataFrame(columns=["date_local","player_name","player_id","oz_id","steamid64","message_text","logs.tf"])
-        df.to_excel(writer, sheet_name=base_name, index=False)
+    n = len(columns[0]) if columns else 0
+    ws.autofilter(0, 0, n, len(header) - 1)
+    ws.write_row(0, 0, header, fmt_header)
+    if url_col is None:
+        for r, row in enumerate(zip(*columns), start=1):
+            ws.write_row(r, 0, row)
         return
-
-    pages = math.ceil(n / page_size)
-    for p in range(pages):
-        lo = p * page_size
-        hi = min((p + 1) * page_size, n)
-        sl = msgs.iloc[lo:hi]
+    urls = columns[url_col]
+    data = [c for i, c in enumerate(columns) if i != url_col]  # url_col is the last column
+    for r, row in enumerate(zip(*data), start=1):
+        ws.write_row(r, 0, row)
+        if urls[r - 1]:
+            ws.write_url(r, url_col, urls[r - 1], string=url_text)
+
+def _write_counts_sheet(book, name: str, counts: pd.DataFrame, order: np.ndarray, fmt_header) -> None:
+    _xlsx_sheet(book, name, _COUNT_COLS, _COUNT_WIDTHS,
+                [_xlsx_column(counts, c, order) for c in _COUNT_COLS], fmt_header)
+
+def _write_messages_1d_pages(book, base_name: str, msgs: pd.DataFrame, fmt_header,
+                             page_size: int = EXCEL_PAGE_ROWS) -> None:
+    cols = [_xlsx_column(msgs, c) for c in MESSAGE_COLS]
+    n, url_col = len(msgs), MESSAGE_COLS.index("logs.tf")
+    for p in range(max(1, math.ceil(n / page_size))):
+        lo, hi = p * page_size, min((p + 1) * page_size, n)
         name = base_name if p == 0 else f"{base_name}_{p+1}"
+        _xlsx_sheet(book, name, MESSAGE_COLS, _MESSAGE_WIDTHS, [c[lo:hi] for c in cols], fmt_header,
+                    url_col=url_col, url_text="logs.tf")
 
-        cols = ["date_local","player_name","player_id","oz_id","steamid64","message_text","logs.tf"]
-        sl = sl[cols]
-        sl.to_excel(writer, sheet_name=name, index=False, startrow=1, header=False)
-
-        ws = writer.book.get_worksheet_by_name(name)
-        fmt_header, _, _ = _xlsx_formats(writer)
-        for i, h in enumerate(cols):
-            ws.write(0, i, h, fmt_header)
-
-        widths = {"date_local":12, "player_name":26, "player_id":10, "oz_id":10,
-                  "steamid64":18, "message_text":80, "logs.tf":16}
-        for i, c in enumerate(cols):
-            ws.set_column(i, i, widths.get(c, 12))
-
-        ws.freeze_panes(1, 0)
-        ws.autofilter(0, 0, 0 + len(sl), len(cols) - 1)
-
-        # Make logs.tf clickable
-        log_col = cols.index("logs.tf")
-        for ridx in range(len(sl)):
-            url = sl.iloc[ridx]["logs.tf"]
-            if url:
-                ws.write_url(1 + ridx, log_col, url, string="logs.tf")
+def _write_excel_workbook(path: str, counts: pd.DataFrame, msgs_1d: pd.DataFrame,
+                          nonzero_only: bool = EXCEL_NONZERO_ONLY, page_size: int = EXCEL_PAGE_ROWS) -> None:
+    """
+    Summary (c1 > 0, by c1), Players (every roster player, by c_all; only c_all > 0 when
+    nonzero_only) and Messages_1d pages, streamed into path with xlsxwriter constant_memory.
+    """
+    import xlsxwriter
+    # chat text is data: never turn a leading "=" / "http..." into a formula or link
+    book = xlsxwriter.Workbook(path, {"constant_memory": True, "strings_to_formulas": False,
+                                      "strings_to_urls": False, "strings_to_numbers": False})
+    try:
+        fmt_header = book.add_format({"bold": True, "bg_color": "#f3f4f6", "border": 1})
+        name_rank = _name_rank(counts)
+        _write_counts_sheet(book, "Summary", counts, _summary_order(counts, "c1", name_rank), fmt_header)
+        _write_counts_sheet(book, "Players", counts,
+                            _summary_order(counts, "c_all", name_rank, nonzero=nonzero_only), fmt_header)
+        _write_messages_1d_pages(book, "Messages_1d", msgs_1d, fmt_header, page_size=page_size)
+    finally:
+        book.close()
 
 # -----------------------
 # PUBLIC: Excel workbook
 # -----------------------
 def make_excel_daily(conn, out_dir: str,
                      tz_name: Optional[str] = None,
-                     retention_days: int = 30) -> str:
+                     retention_days: int = 30,
+                     ctx=None, state: Optional[artifacts.ArtifactState] = None) -> str:
     """
     Create a single Excel workbook for today's Adelaide local day:
-      Tabs: Summary, 1d, 7d, 31d, 180d, All, Messages_1d (split into 50k chunks)
+      Tabs: Summary (c1 > 0), Players (all windows, filterable; EXCEL_NONZERO_ONLY=1 drops
+            players with no hits), Messages_1d (split into 50k chunks)
       Links: player_name page has ozf/slurs/steam in HTML; Excel has logs.tf links
       Returns: path to the dated workbook (also refreshes ozf_daily_latest.xlsx if not locked).
+    ctx (run_context.RunContext) reuses the counts / messages the HTML reports already fetched.
+    state (artifacts.ArtifactState) leaves today's workbook alone when its data is unchanged.
     """
     _ensure_dir(out_dir)
     since_utc, before_utc = _adelaide_window_22h()
     day_str = _adelaide_date_str(before_utc - timedelta(seconds=1))
 
-    counts = _fetch_counts_master(conn, since_utc, before_utc)
-    msgs_1d = _fetch_messages_1d(conn, since_utc, before_utc)
+    if ctx is not None:
+        counts = ctx.counts(conn, since_utc, before_utc)
+        msgs_1d = ctx.messages_1d(conn, since_utc, before_utc)
+    else:
+        counts = _fetch_counts_master(conn, since_utc, before_utc)
+        msgs_1d = _fetch_messages_1d(conn, since_utc, before_utc)
 
     dated_path  = os.path.join(out_dir, f"ozf_daily_{day_str}.xlsx")
     latest_path = os.path.join(out_dir, "ozf_daily_latest.xlsx")
     tmp_path    = dated_path + ".tmp"
 
-    with pd.ExcelWriter(tmp_path, engine="xlsxwriter") as writer:
-        # Summary tab (top offenders today by c1)
-        try:
-            _write_counts_sheet(writer, "Summary", counts[counts["c1"] > 0], by_col="c1")
-        except Exception:
-            _write_counts_sheet(writer, "Summary", counts.head(0), by_col="c1")
-        # Other windows
-        _write_counts_sheet(writer, "1d",   counts, by_col="c1")
-        _write_counts_sheet(writer, "7d",   counts, by_col="c7")
-        _write_counts_sheet(writer, "31d",  counts, by_col="c31")
-        _write_counts_sheet(writer, "180d", counts, by_col="c180")
-        _write_counts_sheet(writer, "All",  counts, by_col="c_all")
-
-        # Messages (1 day) with logs.tf hyperlinks
-        _write_messages_1d_pages(writer, "Messages_1d", msgs_1d, page_size=50000)
+    name = "ozf_daily.xlsx"
+    if not artifacts.needs(state, name, lambda: artifacts.digest(
+            os.path.basename(dated_path), EXCEL_NONZERO_ONLY,
+            artifacts.frame_digest(counts, _COUNT_COLS), artifacts.frame_digest(msgs_1d)), [dated_path]):
+        logger.info("Excel daily unchanged: %s", dated_path)
+        return dated_path
 
-    os.replace(tmp_path, dated_path)
-    # Best-effort latest
+    t0 = time.perf_counter()
     try:
-        tmp2 = latest_path + ".tmp"
-        with pd.ExcelWriter(tmp2, engine="xlsxwriter") as w:
-            # small pointer sheet
-            pd.DataFrame({"see": [os.path.basename(dated_path)]}).to_excel(w, index=False)
-        _atomic_replace(tmp2, latest_path)
-    except PermissionError:
-        pass
+        _write_excel_workbook(tmp_path, counts, msgs_1d)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, dated_path)
+    # Best-effort latest: same bytes, linked (or copied), not a second workbook
+    _link_latest(dated_path, latest_path)
+    artifacts.done(state, name, [dated_path])
 
-    logger.info("Excel daily written: %s", dated_path)
+    logger.info("Excel daily written: %s (%d players, %d messages, %.2fs)", dated_path, len(counts),
+                len(msgs_1d), time.perf_counter() - t0)
     return dated_path
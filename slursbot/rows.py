@@ -0,0 +1,95 @@
+# rows.py — compact typed record for one ingested slurs.tf message
+# - One pass per API row: no dict copies, no duplicate keys, regex compiled once
+# - msg_time_iso keeps the exact API string: it is part of slurs_msg.hash_key
+from __future__ import annotations
+
+import re
+import logging
+from datetime import datetime, timezone
+from hashlib import sha256
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger("slursbot")
+
+STEAM64_BASE = 76561197960265728
+_LAST_DIGITS = re.compile(r"(\d+)\D*$")
+
+
+class MessageRow(NamedTuple):
+    steamid64: int
+    logid: Optional[int]
+    msg_time_utc: datetime   # naive UTC
+    msg_time_iso: str        # as sent by the API (logdate, else messagedate)
+    text: str
+    message_id: Optional[str] = None
+    source: str = "slurs.tf"
+
+    def hash_key(self) -> str:
+        """SHA256(steamid64|iso|text), the slurs_msg dedupe key."""
+        return sha256(f"{self.steamid64}|{self.msg_time_iso}|{self.text}".encode("utf-8")).hexdigest()
+
+
+def steam3_to_steam64(s: Any) -> Optional[int]:
+    """'[U:1:33844719]' / 'U:1:33844719' / '76561198...' -> Steam64 int, or None."""
+    if s is None:
+        return None
+    s = str(s).strip()
+    if s.startswith("[U:1:") and s.endswith("]") and s[5:-1].isdigit():
+        return STEAM64_BASE + int(s[5:-1])  # the usual API shape
+    if s.isdigit():
+        return int(s) if len(s) == 17 else None
+    m = _LAST_DIGITS.search(s)
+    return STEAM64_BASE + int(m.group(1)) if m else None
+
+
+def parse_utc(iso: str) -> Optional[datetime]:
+    """ISO8601 (with 'Z' or offset) -> naive UTC datetime, or None."""
+    try:
+        # 'Z' is already UTC: parse naive and skip the tz round trip
+        dt = datetime.fromisoformat(iso[:-1] if iso.endswith("Z") else iso)
+    except ValueError:
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def from_api(r: Dict[str, Any]) -> Optional[MessageRow]:
+    """
+    slurs.tf "data" row, e.g.
+      {"steamid":"[U:1:33844719]", "message":"...", "messagedate":"2025-09-17T12:35:34.000Z",
+       "logid":"3934184", "logdate":"2025-09-17T12:35:34.000Z"}
+    -> MessageRow, or None without a usable steamid or timestamp.
+    """
+    sid = steam3_to_steam64(r.get("steamid64") or r.get("steamid"))
+    if sid is None:
+        return None
+    iso = r.get("msg_time_iso") or r.get("logdate") or r.get("messagedate") or r.get("time") or ""
+    iso = str(iso).strip()
+    ts = parse_utc(iso) if iso else None
+    if ts is None:
+        return None
+    logid = r.get("logid")
+    logid = str(logid).strip() if logid is not None else ""
+    text = r.get("message")
+    if text is None:
+        text = r.get("text")
+    mid = r.get("message_id")
+    return MessageRow(sid, int(logid) if logid.isdigit() else None, ts, iso,
+                      "" if text is None else str(text), None if mid is None else str(mid))
+
+
+def from_api_rows(raw: Iterable[Dict[str, Any]]) -> Tuple[List[MessageRow], int]:
+    """Normalize a page/chunk of API rows. Returns (rows, dropped)."""
+    out: List[MessageRow] = []
+    dropped = 0
+    for r in raw:
+        row = from_api(r)
+        if row is None:
+            dropped += 1
+        else:
+            out.append(row)
+    return out, dropped
+
+
+__all__ = ["MessageRow", "STEAM64_BASE", "steam3_to_steam64", "parse_utc", "from_api", "from_api_rows"]
@@ -0,0 +1,75 @@
+# run_context.py — run-scoped cache of the datasets one run_daily shares across stages
+# - counts master, the Adelaide-day messages and the daily offenders are fetched once per run,
+#   keyed by their window, and handed to the HTML reports, the Excel workbook and the webhooks
+# - "now" is pinned when the context is created, so every stage sees the same snapshot
+# - Each stage logs its cache hits/misses; cached frames are shared, so consumers must copy before mutating
+from __future__ import annotations
+
+import time
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+import report
+import discord_webhook
+
+logger = logging.getLogger("slursbot")
+
+
+class RunContext:
+    def __init__(self, label: str = "run", now: Optional[datetime] = None):
+        self.label = label
+        self.now = now or datetime.now(timezone.utc)
+        self._cache: Dict[Hashable, Any] = {}
+        self.hits = 0
+        self.misses = 0
+        self.fetch_s = 0.0
+
+    def get(self, key: Hashable, fetch: Callable[[], Any]) -> Any:
+        """Cached value for key, calling fetch() the first time."""
+        if key in self._cache:
+            self.hits += 1
+            return self._cache[key]
+        self.misses += 1
+        t0 = time.perf_counter()
+        val = fetch()
+        self.fetch_s += time.perf_counter() - t0
+        self._cache[key] = val
+        return val
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator["RunContext"]:
+        hits, misses, fetch_s = self.hits, self.misses, self.fetch_s
+        t0 = time.perf_counter()
+        try:
+            yield self
+        finally:
+            logger.info("%s cache [%s]: hits=%d misses=%d fetch=%.2fs stage=%.2fs",
+                        self.label, name, self.hits - hits, self.misses - misses,
+                        self.fetch_s - fetch_s, time.perf_counter() - t0)
+
+    # ---- datasets ----
+    def counts(self, conn, since_utc: datetime, before_utc: datetime):
+        """report._fetch_counts_master for the c1 window [since_utc, before_utc), other windows ending at self.now."""
+        return self.get(("counts", since_utc, before_utc),
+                        lambda: report._fetch_counts_master(
+                            conn, since_utc, before_utc,
+                            windows=report._count_windows(since_utc, before_utc, now=self.now)))
+
+    def messages_1d(self, conn, since_utc: datetime, before_utc: datetime):
+        return self.get(("messages_1d", since_utc, before_utc),
+                        lambda: report._fetch_messages_1d(conn, since_utc, before_utc))
+
+    def daily_offenders(self, conn) -> List[Dict[str, Any]]:
+        """discord_webhook._fetch_daily_offenders (last 24h / 180d as of self.now)."""
+        return self.get(("offenders", self.now),
+                        lambda: discord_webhook._fetch_daily_offenders(conn, now=self.now))
+
+    def summary(self) -> Tuple[int, int]:
+        logger.info("%s cache: %d datasets, hits=%d misses=%d fetch=%.2fs",
+                    self.label, len(self._cache), self.hits, self.misses, self.fetch_s)
+        return self.hits, self.misses
+
+
+__all__ = ["RunContext"]
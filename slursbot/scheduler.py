@@ -0,0 +1,118 @@
+# scheduler.py — activity-tiered polling plan for the OZF roster
+# - hot  : hit within SCHED_HOT_DAYS (default 31)   -> polled every run
+# - warm : hit within SCHED_WARM_DAYS (default 180) -> polled every SCHED_WARM_EVERY_DAYS (default 3)
+# - cold : no hit in SCHED_WARM_DAYS                -> polled every SCHED_COLD_EVERY_DAYS (default 7)
+# Never-polled players are always due. A hit moves a player to hot on the very next plan,
+# since tiers are recomputed from slurs_msg (and the per-player watermark) every run.
+# Warm/cold players are spread across their interval by steamid64 so each day polls a slice.
+# Skipped players lose nothing: their watermark window simply covers more days next time.
+from __future__ import annotations
+
+import os
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+logger = logging.getLogger("slursbot")
+
+HOT, WARM, COLD = "hot", "warm", "cold"
+
+
+def _int_env(key: str, default: int) -> int:
+    try:
+        return int(os.getenv(key, str(default)))
+    except Exception:
+        return default
+
+
+@dataclass
+class TierConfig:
+    hot_days: int = 31
+    warm_days: int = 180
+    warm_every_days: int = 3
+    cold_every_days: int = 7
+
+    @classmethod
+    def from_env(cls) -> "TierConfig":
+        return cls(
+            hot_days=max(1, _int_env("SCHED_HOT_DAYS", 31)),
+            warm_days=max(1, _int_env("SCHED_WARM_DAYS", 180)),
+            warm_every_days=max(1, _int_env("SCHED_WARM_EVERY_DAYS", 3)),
+            cold_every_days=max(1, _int_env("SCHED_COLD_EVERY_DAYS", 7)),
+        )
+
+
+@dataclass
+class Schedule:
+    due: List[int]
+    tiers: Dict[str, int] = field(default_factory=dict)      # players per tier
+    due_by_tier: Dict[str, int] = field(default_factory=dict)
+
+
+def _latest(*vals: Optional[datetime]) -> Optional[datetime]:
+    xs = [v for v in vals if v is not None]
+    return max(xs) if xs else None
+
+
+def tier_for(last_hit: Optional[datetime], now: datetime, cfg: TierConfig) -> str:
+    if last_hit is None:
+        return COLD
+    age = now - last_hit
+    if age <= timedelta(days=cfg.hot_days):
+        return HOT
+    if age <= timedelta(days=cfg.warm_days):
+        return WARM
+    return COLD
+
+
+def is_due(sid: int, tier: str, last_poll: Optional[datetime], now: datetime, cfg: TierConfig) -> bool:
+    if tier == HOT or last_poll is None:
+        return True
+    every = cfg.warm_every_days if tier == WARM else cfg.cold_every_days
+    if now - last_poll >= timedelta(days=every):
+        return True  # overdue (missed its slot)
+    # this player's slot day, and not yet polled today
+    epoch_day = (now.date() - datetime(1970, 1, 1).date()).days
+    return (epoch_day + sid) % every == 0 and last_poll.date() < now.date()
+
+
+def build_schedule(steamids: Sequence[int],
+                   last_hits: Dict[int, Any],
+                   marks: Dict[int, Dict[str, Any]],
+                   now: Optional[datetime] = None,
+                   cfg: Optional[TierConfig] = None) -> Schedule:
+    """
+    Pure planning step. last_hits: {sid: last_hit_utc} from slurs_msg; marks: db.get_player_watermarks().
+    All datetimes naive UTC.
+    """
+    cfg = cfg or TierConfig.from_env()
+    now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+    sched = Schedule(due=[], tiers={HOT: 0, WARM: 0, COLD: 0}, due_by_tier={HOT: 0, WARM: 0, COLD: 0})
+    for sid in steamids:
+        st = marks.get(sid) or {}
+        tier = tier_for(_latest(last_hits.get(sid), st.get("last_msg_utc")), now, cfg)
+        sched.tiers[tier] += 1
+        if is_due(sid, tier, st.get("last_poll_utc"), now, cfg):
+            sched.due.append(sid)
+            sched.due_by_tier[tier] += 1
+    return sched
+
+
+def plan(conn, steamids: Sequence[int], cfg: Optional[TierConfig] = None) -> Schedule:
+    """Load activity + watermarks for the roster and return the players due this run."""
+    import db  # local import to avoid cycles
+
+    cfg = cfg or TierConfig.from_env()
+    db.ensure_player_state(conn)
+    marks = db.get_player_watermarks(conn)
+    last_hits = db.get_recent_hits(conn, cfg.warm_days)
+    sched = build_schedule(steamids, last_hits, marks, cfg=cfg)
+    logger.info(
+        "scheduler: roster=%d due=%d (hot %d/%d, warm %d/%d, cold %d/%d)",
+        len(steamids), len(sched.due),
+        sched.due_by_tier[HOT], sched.tiers[HOT],
+        sched.due_by_tier[WARM], sched.tiers[WARM],
+        sched.due_by_tier[COLD], sched.tiers[COLD],
+    )
+    return sched
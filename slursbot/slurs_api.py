@@ -2,18 +2,23 @@
 # Robust slurs.tf client with paging, retries, category fallback, and safe filtering.
 from __future__ import annotations
 
+import heapq
 import logging
 import os
+import threading
 import time
 import urllib.parse
-from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple
 
 import requests
 
-try:
-    import yaml  # for lexicon.yaml
-except Exception:  # pragma: no cover
-    yaml = None
+import http_client
+import matcher
+import rows as rows_mod
+from rows import MessageRow
 
 try:
     from dotenv import load_dotenv  # optional, but handy
@@ -43,33 +48,67 @@ DEFAULT_RETRIES_S = [
     int(x.strip()) for x in os.getenv("SLURS_RETRIES_S", "10,30,300,900").split(",") if x.strip()
 ]
 
+# concurrent mode: worker count + shared request budget (~300 req / 5 min)
+DEFAULT_WORKERS = max(1, int(os.getenv("SLURS_WORKERS", "4")))
+DEFAULT_RATE_REQUESTS = int(os.getenv("SLURS_RATE_REQUESTS", "300"))
+DEFAULT_RATE_WINDOW_S = float(os.getenv("SLURS_RATE_WINDOW_S", "300"))
+DEFAULT_RATE_BURST = int(os.getenv("SLURS_RATE_BURST", "10"))
 
-# -------------------------
-# Helpers
-# -------------------------
-STEAM64_BASE = 76561197960265728
+# a lone ID's bisect probe is tried this many times before the ID counts as a problem ID
+BISECT_SOLO_TRIES = max(1, int(os.getenv("SLURS_BISECT_SOLO_TRIES", "2")))
+
+# "cursor": next page's before= is the oldest messagedate seen (keyset); "offset": offset += limit
+DEFAULT_PAGING = os.getenv("SLURS_PAGING", "cursor").strip().lower()
 
 
-def _steam3_to_steam64(s: str) -> Optional[int]:
+# -------------------------
+# Rate limiting
+# -------------------------
+class TokenBucket:
     """
-    Convert Steam3 like '[U:1:33844719]' or 'U:1:33844719' to Steam64 (76561197960265728 + 33844719).
-    Returns None if conversion fails.
+    Thread-safe token bucket shared by every fetch worker.
+
+    Budget is expressed as `requests` per `window_s`. The bucket holds at most `burst`
+    tokens and refills at (requests - burst) / window_s, so a full burst plus the steady
+    refill never exceeds the budget over any window.
     """
-    if not s:
-        return None
-    # grab the last group of digits
-    import re
 
-    m = re.findall(r"(\d+)", str(s))
-    if not m:
-        return None
-    try:
-        account_id = int(m[-1])
-    except Exception:
-        return None
-    return STEAM64_BASE + account_id
+    def __init__(self, requests: int, window_s: float, burst: int = DEFAULT_RATE_BURST):
+        requests = max(1, int(requests))
+        window_s = max(0.001, float(window_s))
+        self.capacity = float(max(1, min(int(burst), requests)))
+        spare = max(1.0, requests - self.capacity)
+        self.rate = spare / window_s  # tokens per second
+        self._tokens = self.capacity
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def acquire(self) -> float:
+        """Block until one token is available. Returns the seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return waited
+                need = (1.0 - self._tokens) / self.rate
+            time.sleep(need)
+            waited += need
+
+
+def default_limiter() -> TokenBucket:
+    return TokenBucket(DEFAULT_RATE_REQUESTS, DEFAULT_RATE_WINDOW_S, burst=DEFAULT_RATE_BURST)
 
 
+# -------------------------
+# Helpers
+# -------------------------
 def _chunk(seq: Sequence[int], size: int) -> Iterable[List[int]]:
     size = max(1, int(size))
     for i in range(0, len(seq), size):
@@ -90,90 +129,6 @@ def _get_timeout() -> float:
         return DEFAULT_TIMEOUT_S
 
 
-def _load_lexicon_words(path: str) -> List[str]:
-    """
-    Load a simple list of lowercase 'words' from lexicon.yaml.
-    We accept several shapes:
-      - a YAML list: ["word1","word2",...]
-      - {words: [...]} or {terms: [...]}
-    Empty/missing file => returns [] (and fallback will fail-closed).
-    """
-    words: List[str] = []
-    p = os.getenv("LEXICON_PATH", path)
-    try:
-        if yaml is None:
-            logger.warning("PyYAML not available; lexicon disabled.")
-            return []
-        if not os.path.exists(p):
-            logger.warning("lexicon file not found at %s", p)
-            return []
-        with open(p, "r", encoding="utf-8") as f:
-            doc = yaml.safe_load(f)
-        if isinstance(doc, list):
-            words = [str(x).strip().lower() for x in doc if str(x).strip()]
-        elif isinstance(doc, dict):
-            if "words" in doc and isinstance(doc["words"], list):
-                words = [str(x).strip().lower() for x in doc["words"] if str(x).strip()]
-            elif "terms" in doc and isinstance(doc["terms"], list):
-                words = [str(x).strip().lower() for x in doc["terms"] if str(x).strip()]
-            else:
-                # flatten any list-like values
-                for v in doc.values():
-                    if isinstance(v, list):
-                        words.extend([str(x).strip().lower() for x in v if str(x).strip()])
-        words = sorted(set(words))
-    except Exception as e:  # pragma: no cover
-        logger.warning("Failed parsing lexicon: %s", e)
-        return []
-    return words
-
-
-def _text_contains_any(text: str, words: List[str]) -> bool:
-    if not text or not words:
-        return False
-    t = text.lower()
-    return any(w in t for w in words)
-
-
-def _normalize_row(r: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Normalize slurs.tf payload row to a stable dict for DB layer.
-    We keep original keys too (so db.py can pick what it wants).
-    """
-    out: Dict[str, Any] = dict(r)  # keep original
-    # time
-    iso = (r.get("msg_time_iso") or r.get("logdate") or r.get("messagedate") or "").strip()
-    if not iso and isinstance(r.get("time"), str):
-        iso = r["time"].strip()
-    if iso:
-        out["msg_time_iso"] = iso
-
-    # message/text
-    msg = r.get("message")
-    if msg is not None and "text" not in out:
-        out["text"] = msg
-
-    # logid (string)
-    if "logid" in r and r.get("logid") is not None:
-        out["logid"] = str(r["logid"])
-
-    # steam id forms
-    sid_any = r.get("steamid64") or r.get("steamid")
-    if sid_any is not None:
-        out["steamid"] = str(sid_any)  # keep original name for compatibility
-    # add steamid64 if we can
-    if "steamid64" not in out:
-        s3 = str(out.get("steamid", ""))
-        if s3.isdigit() and len(s3) == 17:
-            out["steamid64"] = s3
-        else:
-            sid64 = _steam3_to_steam64(s3)
-            if sid64 is not None:
-                out["steamid64"] = str(sid64)
-
-    return out
-
-
 # -------------------------
 # HTTP
 # -------------------------
@@ -192,7 +147,7 @@ def _get_json(url: str, headers: Optional[Dict[str, str]] = None, timeout_s: Opt
     t = timeout_s if timeout_s is not None else _get_timeout()
 
     try:
-        r = requests.get(url, headers=hdrs, timeout=t)
+        r = http_client.get(url, headers=hdrs, timeout=t)
         if 200 <= r.status_code < 300:
             try:
                 return r.json()
@@ -230,16 +185,162 @@ def _build_url(ids_chunk: List[int], include_category: bool, limit: int, offset:
     return f"{API_MESSAGES}?{'&'.join(q)}"
 
 
-def _page_request(ids_chunk: List[int], offset: int, include_category: bool, limit: int, after_iso: Optional[str], before_iso: Optional[str]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+# -------------------------
+# Circuit breaker
+# -------------------------
+# statuses that indicate the server (not our request) is unhealthy
+SERVERISH = {"500", "502", "503", "504", "timeout", "conn_err", "non_json", "empty"}
+
+
+class CircuitBreaker:
+    """
+    Per-endpoint breaker shared by all workers.
+
+    After `threshold` consecutive server-side failures (5xx, timeouts, ...) it opens and
+    requests are refused locally for `cooldown_s`. Then a single probe is let through
+    (half-open): success closes it, failure reopens it with the cooldown doubled
+    (capped at max_cooldown_s).
+    """
+
+    def __init__(self, threshold: int = 5, cooldown_s: float = 30.0, max_cooldown_s: float = 600.0):
+        self.threshold = max(1, int(threshold))
+        self.base_cooldown_s = float(cooldown_s)
+        self.max_cooldown_s = float(max_cooldown_s)
+        self._cooldown_s = self.base_cooldown_s
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "half_open" if self._probing else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probing or time.monotonic() - self._opened_at < self._cooldown_s:
+                return False
+            self._probing = True  # this caller is the probe
+            logger.info("circuit half-open: probing %s", API_MESSAGES)
+            return True
+
+    def retry_after(self) -> float:
+        """Seconds until a refused caller should try again."""
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            left = self._cooldown_s - (time.monotonic() - self._opened_at)
+            return max(1.0, left)
+
+    def record(self, status: Optional[str]) -> None:
+        """status None = success; otherwise the soft-fail status from _page_request."""
+        with self._lock:
+            if status is None or status not in SERVERISH:
+                if self._opened_at is not None:
+                    logger.info("circuit closed after successful probe")
+                self._failures = 0
+                self._opened_at = None
+                self._probing = False
+                self._cooldown_s = self.base_cooldown_s
+                return
+            self._failures += 1
+            if self._probing:
+                self._probing = False
+                self._cooldown_s = min(self.max_cooldown_s, self._cooldown_s * 2)
+                self._opened_at = time.monotonic()
+                logger.warning("circuit re-opened (probe failed: %s); cooldown %.0fs", status, self._cooldown_s)
+            elif self._opened_at is None and self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+                logger.warning("circuit opened after %d consecutive failures (last=%s); cooldown %.0fs",
+                               self._failures, status, self._cooldown_s)
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(endpoint: str = API_MESSAGES) -> CircuitBreaker:
+    """Process-wide breaker for an endpoint (configured from SLURS_BREAKER_*)."""
+    with _breakers_lock:
+        br = _breakers.get(endpoint)
+        if br is None:
+            br = CircuitBreaker(
+                threshold=int(os.getenv("SLURS_BREAKER_THRESHOLD", "5")),
+                cooldown_s=float(os.getenv("SLURS_BREAKER_COOLDOWN_S", "30")),
+                max_cooldown_s=float(os.getenv("SLURS_BREAKER_MAX_COOLDOWN_S", "600")),
+            )
+            _breakers[endpoint] = br
+        return br
+
+
+# -------------------------
+# Fetch stats
+# -------------------------
+_stats_lock = threading.Lock()
+_stats: Dict[str, int] = {}
+
+
+def _count(key: str, n: int = 1) -> None:
+    with _stats_lock:
+        _stats[key] = _stats.get(key, 0) + n
+
+
+def fetch_stats() -> Dict[str, int]:
+    """
+    Process-wide counters since the last reset_fetch_stats():
+    requests, pages, rows, soft_fail:<status>, refused (circuit open), retries (deferred),
+    bisects, fallbacks, cursor_to_offset, chunks_ok, chunks_failed.
+    """
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_fetch_stats() -> None:
+    with _stats_lock:
+        _stats.clear()
+
+
+def log_fetch_stats(label: str = "fetch") -> None:
+    st = fetch_stats()
+    fails = ", ".join(f"{k[10:]}={v}" for k, v in sorted(st.items()) if k.startswith("soft_fail:"))
+    logger.info("%s stats: requests=%d pages=%d rows=%d retries=%d refused=%d bisects=%d fallbacks=%d "
+                "cursor_to_offset=%d chunks ok/failed=%d/%d soft_fails[%s]",
+                label, st.get("requests", 0), st.get("pages", 0), st.get("rows", 0), st.get("retries", 0),
+                st.get("refused", 0), st.get("bisects", 0), st.get("fallbacks", 0), st.get("cursor_to_offset", 0),
+                st.get("chunks_ok", 0), st.get("chunks_failed", 0), fails or "-")
+
+
+def _page_request(ids_chunk: List[int], offset: int, include_category: bool, limit: int, after_iso: Optional[str], before_iso: Optional[str], limiter: Optional[TokenBucket] = None, breaker: Optional[CircuitBreaker] = None) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    if breaker is not None and not breaker.allow():
+        _count("refused")
+        return None, "circuit_open"
     url = _build_url(ids_chunk, include_category, limit, offset, after_iso, before_iso)
+    if limiter is not None:
+        waited = limiter.acquire()
+        if waited > 0.05:
+            logger.debug("rate limiter waited %.2fs", waited)
     logger.info("REQUEST %s", url)
+    _count("requests")
     resp = _get_json(url)
     if isinstance(resp, dict) and resp.get("success") is False:
-        logger.info("RESPONSE soft-fail: %s (offset=%s)", resp.get("__status__"), offset)
-        return None, str(resp.get("__status__"))
+        status = str(resp.get("__status__"))
+        _count(f"soft_fail:{status}")
+        logger.info("RESPONSE soft-fail: %s (offset=%s)", status, offset)
+        if breaker is not None:
+            breaker.record(status)
+        return None, status
     if not resp:
+        _count("soft_fail:empty")
         logger.info("RESPONSE empty/None (offset=%s)", offset)
+        if breaker is not None:
+            breaker.record("empty")
         return None, "empty"
+    if breaker is not None:
+        breaker.record(None)
     data = resp.get("data")
     if data is None:
         logger.info("RESPONSE missing 'data' key (offset=%s)", offset)
@@ -248,93 +349,543 @@ def _page_request(ids_chunk: List[int], offset: int, include_category: bool, lim
     return {"data": data}, None
 
 
-def _paginate(ids_chunk: List[int], include_category: bool, *, limit: int, after_iso: Optional[str], before_iso: Optional[str], sleep_ms: int, retries_s: List[int]) -> Tuple[bool, List[Dict[str, Any]], Optional[str]]:
+# -------------------------
+# Chunk jobs (resumable paging state)
+# -------------------------
+class _ChunkJob:
+    """Paging progress for one chunk; survives being deferred and picked up again later."""
+
+    __slots__ = ("index", "ids", "req_ids", "after_iso", "include_category", "mode",
+                 "paging", "cursor", "desc", "edge", "edge_keys",
+                 "offset", "rows", "partial", "kept", "problem_ids", "solo_fallback",
+                 "pages", "attempt", "ok", "root", "probes", "spawn")
+
+    def __init__(self, index: int, ids: List[int], after_iso: Optional[str], include_category: bool,
+                 paging: Optional[str] = None):
+        self.index = index
+        self.ids = ids
+        self.req_ids = ids           # IDs the next request asks for (a subset once bisected)
+        self.after_iso = after_iso
+        self.include_category = include_category
+        self.mode = "paging"         # paging -> [bisect ->] fallback
+        self.paging = (paging or DEFAULT_PAGING)
+        self.reset_paging()
+        self.rows: List[Dict[str, Any]] = []
+        self.partial: List[Dict[str, Any]] = []
+        self.kept: List[Dict[str, Any]] = []    # categorized rows for the IDs that bisected clean
+        self.problem_ids: List[int] = []
+        self.solo_fallback = False   # known problem ID: skip category retries
+        self.pages = 0
+        self.attempt = 0
+        self.ok = False
+        self.root: Optional[_ChunkJob] = None    # bisect probe: the chunk it reports to
+        self.probes: Optional[int] = None        # bisecting chunk: probes still outstanding
+        self.spawn: List[_ChunkJob] = []         # probes for the scheduler to queue
+
+    def reset_paging(self) -> None:
+        self.cursor = self.paging == "cursor"
+        self.desc: Optional[bool] = None     # row order, learned from the first page
+        self.edge: Optional[datetime] = None  # messagedate of the last row seen
+        self.edge_keys: Set[Tuple[str, str, str]] = set()
+        self.offset = 0
+
+    def start_fallback(self, ids: Optional[List[int]] = None) -> None:
+        _count("fallbacks")
+        self.partial = self.kept + self.rows
+        self.req_ids = list(ids) if ids is not None else self.ids
+        self.include_category = False
+        self.mode = "fallback"
+        self.reset_paging()
+        self.rows = []
+        self.attempt = 0
+
+
+# Statuses meaning the API would not take a moved before=/after= bound
+CURSOR_REFUSED = {"400", "404", "422"}
+_MS = timedelta(milliseconds=1)
+
+
+def _row_time(r: Dict[str, Any]) -> Optional[datetime]:
+    v = r.get("messagedate") or r.get("logdate") or r.get("msg_time_iso")
+    if not v:
+        return None
+    try:
+        dt = datetime.fromisoformat(str(v).strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def _row_key(r: Dict[str, Any]) -> Tuple[str, str, str]:
+    return (str(r.get("logid") or ""), str(r.get("steamid") or r.get("steamid64") or ""), str(r.get("message") or ""))
+
+
+def _iso_ms(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.") + f"{dt.microsecond // 1000:03d}Z"
+
+
+def _page_window(job: _ChunkJob, before_iso: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """(after, before) for the next request. In cursor mode one edge sits 1 ms past the last row seen."""
+    if not job.cursor or job.edge is None:
+        return job.after_iso, before_iso
+    if job.desc:
+        b = job.edge + _MS
+        hi = _row_time({"messagedate": before_iso}) if before_iso else None
+        return job.after_iso, _iso_ms(min(b, hi) if hi else b)
+    a = job.edge - _MS
+    lo = _row_time({"messagedate": job.after_iso}) if job.after_iso else None
+    return _iso_ms(max(a, lo) if lo else a), before_iso
+
+
+def _cursor_take(job: _ChunkJob, rows: List[Dict[str, Any]], limit: int) -> Optional[List[Dict[str, Any]]]:
     """
-    Pull pages until fewer than 'limit' returned.
-    On soft failures (timeout/conn), retry with backoff; if still failing, return (False, partial_rows, last_status).
+    Accept one cursor page: returns the rows not seen yet and moves job.edge to the last row.
+    Rows on the edge timestamp are told apart by (logid, steamid, message), so ties that
+    straddle a page boundary are neither skipped nor duplicated.
+    Returns None when the page cannot be trusted for keyset paging (unsorted, outside the
+    moved window, or a full page stuck on one timestamp) -> caller falls back to offsets.
     """
-    out: List[Dict[str, Any]] = []
-    offset = 0
-    last_status: Optional[str] = None
+    if not rows:
+        return []
+    stamps = [_row_time(r) for r in rows]
+    if any(t is None for t in stamps):
+        return None
+    desc = stamps[0] >= stamps[-1]
+    pairs = list(zip(stamps, stamps[1:]))
+    if not all((a >= b) if desc else (a <= b) for a, b in pairs):
+        return None
+    if job.desc is None:
+        job.desc = desc
+    elif stamps[0] != stamps[-1] and desc != job.desc:
+        return None
+    if job.edge is not None and ((stamps[0] > job.edge) if job.desc else (stamps[0] < job.edge)):
+        return None  # the moved bound was ignored
+
+    new = [r for r, t in zip(rows, stamps) if not (t == job.edge and _row_key(r) in job.edge_keys)]
+    last = stamps[-1]
+    if last != job.edge:
+        job.edge, job.edge_keys = last, set()
+    job.edge_keys.update(_row_key(r) for r, t in zip(rows, stamps) if t == last)
+    if len(rows) >= limit and not new:
+        return None
+    return new
 
+
+def _cursor_to_offset(job: _ChunkJob, why: str) -> None:
+    logger.info("cursor paging off for ids=%s (%s); continuing with offset=%d",
+                ",".join(map(str, job.req_ids)), why, len(job.rows))
+    _count("cursor_to_offset")
+    job.cursor = False
+    job.offset = len(job.rows)
+
+
+def _advance(job: _ChunkJob, *, limit: int, before_iso: Optional[str], sleep_ms: int,
+             limiter: Optional[TokenBucket], breaker: Optional[CircuitBreaker]) -> Optional[str]:
+    """
+    Pull pages until fewer than 'limit' are returned.
+    Offset mode pages from job.offset. Cursor mode keeps offset=0 and moves before= (or
+    after=, if the API returns oldest-first) to the last messagedate seen, so deep pages cost
+    the server nothing extra and rows landing mid-scan cannot shift the pages. The API
+    refusing the moved bound, or answering outside it, switches the job to offsets.
+    Returns None when the chunk is complete, else the soft-fail status (progress kept in job).
+    """
     while True:
-        resp, status = _page_request(ids_chunk, offset, include_category, limit, after_iso, before_iso)
+        after, before = _page_window(job, before_iso)
+        offset = 0 if job.cursor else job.offset
+        resp, status = _page_request(job.req_ids, offset, job.include_category, limit, after, before, limiter, breaker)
         if resp is None:
-            # soft failure; backoff/retry this same offset
-            last_status = status
-            for s in retries_s:
-                logger.info("paginate retry in %ss (offset=%s)", s, offset)
-                time.sleep(s)
-                resp, status = _page_request(ids_chunk, offset, include_category, limit, after_iso, before_iso)
-                if resp is not None:
-                    break
-            if resp is None:
-                logger.warning("paginate giving up at offset=%s (soft errors)", offset)
-                return False, out, last_status
+            if job.cursor and job.edge is not None and status in CURSOR_REFUSED:
+                _cursor_to_offset(job, f"refused: {status}")
+                continue
+            return status
 
         rows = resp.get("data", [])
         if not isinstance(rows, list):
             rows = []
-        out.extend(rows)
+        job.pages += 1
+        job.attempt = 0  # the retry schedule is per page, as before: a good page restores it
+        _count("pages")
+        _count("rows", len(rows))
+        if job.cursor:
+            new = _cursor_take(job, rows, limit)
+            if new is None:
+                _cursor_to_offset(job, "page unsorted, outside the moved bound, or stuck on one timestamp")
+                continue
+            job.rows.extend(new)
+        else:
+            job.rows.extend(rows)
 
         # throttle between pages
-        if sleep_ms > 0:
+        if limiter is None and sleep_ms > 0:
             time.sleep(float(sleep_ms) / 1000.0)
 
         if len(rows) < limit:
-            return True, out, None
-        offset += limit
+            return None
+        if not job.cursor:
+            job.offset += limit
+
+
+def _probe(root: _ChunkJob, ids: List[int]) -> _ChunkJob:
+    """A categorized fetch of ids (part of root's chunk) that reports back to root."""
+    probe = _ChunkJob(root.index, list(ids), root.after_iso, True, root.paging)
+    probe.root = root
+    return probe
+
 
+def _spawn_halves(job: _ChunkJob, root: _ChunkJob) -> None:
+    mid = len(job.ids) // 2
+    job.spawn = [_probe(root, job.ids[:mid]), _probe(root, job.ids[mid:])]
+    root.probes = (root.probes or 0) + 2
 
-def _fetch_chunk(ids_chunk: List[int], *, category: Optional[str], limit: int, after_iso: Optional[str], before_iso: Optional[str], sleep_ms: int, retries_s: List[int]) -> List[Dict[str, Any]]:
+
+def _probe_finished(probe: _ChunkJob) -> List[_ChunkJob]:
+    """
+    Fold a finished probe into its root chunk. A failed group is split in half (the halves
+    are returned to be queued); a lone ID that failed every try becomes a problem ID.
+    Returns the root itself once its last probe is in, so it can settle the chunk.
+    Only called from the scheduler thread.
+    """
+    root = probe.root
+    root.pages += probe.pages
+    queued: List[_ChunkJob] = []
+    if probe.ok:
+        root.kept.extend(probe.rows)
+    elif len(probe.ids) == 1:
+        logger.info("BISECT: id=%s fails with category", probe.ids[0])
+        root.problem_ids.append(probe.ids[0])
+    else:
+        _spawn_halves(probe, root)
+        queued, probe.spawn = probe.spawn, []
+    root.probes -= 1
+    if root.probes == 0:
+        queued.append(root)
+    return queued
+
+
+def _bisect_enabled() -> bool:
+    return _env_bool("SLURS_BISECT", True)
+
+
+def _step_probe(job: _ChunkJob, *, limit: int, before_iso: Optional[str], sleep_ms: int, retries_s: List[int],
+                limiter: Optional[TokenBucket], breaker: Optional[CircuitBreaker]) -> Optional[float]:
+    """
+    One bisect probe: a group gets a single attempt, a lone ID BISECT_SOLO_TRIES (deferred
+    like any retry), so one transient error does not mark it bad. Probes wait while the
+    circuit is not closed but do not count towards it: their failures are expected and
+    ID-specific, and counting them would open the circuit for every other chunk.
+    """
+    if breaker is not None and breaker.state != "closed":
+        return breaker.retry_after()
+    status = _advance(job, limit=limit, before_iso=before_iso, sleep_ms=sleep_ms, limiter=limiter, breaker=None)
+    if status is None:
+        job.ok = True
+        return None
+    if len(job.ids) == 1 and job.attempt + 1 < BISECT_SOLO_TRIES:
+        job.attempt += 1
+        delay = float(retries_s[0]) if retries_s else 1.0
+        logger.info("BISECT: id=%s failed with category (status=%s); probing again in %ss",
+                    job.ids[0], status, delay)
+        return delay
+    job.ok = False
+    return None
+
+
+def _step(job: _ChunkJob, *, limit: int, before_iso: Optional[str], sleep_ms: int, retries_s: List[int],
+          limiter: Optional[TokenBucket], breaker: Optional[CircuitBreaker]) -> Optional[float]:
     """
-    Fetch one chunk of steamids, using category if provided.
-    On server errors with category (e.g., 500), retry without category and then **filter locally** using lexicon.yaml.
+    Run a job as far as it can go right now, never sleeping on the retry schedule.
+    Returns None when the job is finished (job.ok / job.rows final), otherwise the delay in
+    seconds before it should be picked up again. A job that leaves probes in job.spawn is
+    parked instead: the scheduler queues them and steps it again once they are all in.
+
+    On server errors with category (e.g., 500) after the retry schedule is used up, a
+    multi-ID chunk is bisected (SLURS_BISECT=1) to find the IDs that fail on their own;
+    those are listed in job.problem_ids and only they take the uncategorized path, which
+    **filters locally** using lexicon.yaml. The other IDs keep their categorized rows.
+    If every ID fails alone it is an outage, not a bad ID: the whole chunk falls back.
     If lexicon is empty/missing, we **fail-closed** and skip that fallback payload.
     """
-    use_cat = bool(category)
-    ok, rows, last_status = _paginate(
-        ids_chunk=ids_chunk,
-        include_category=use_cat,
-        limit=limit,
-        after_iso=after_iso,
-        before_iso=before_iso,
-        sleep_ms=sleep_ms,
-        retries_s=retries_s,
-    )
-    if ok:
-        return rows
+    if job.root is not None:
+        return _step_probe(job, limit=limit, before_iso=before_iso, sleep_ms=sleep_ms, retries_s=retries_s,
+                           limiter=limiter, breaker=breaker)
+
+    if job.mode == "bisect":
+        if job.probes is None:
+            # not during an outage: every ID would look bad
+            if breaker is not None and breaker.state != "closed":
+                return breaker.retry_after()
+            # the whole chunk is known to fail, so start from its halves
+            _spawn_halves(job, job)
+            return None
+        failed = set(job.problem_ids)
+        bad = [i for i in job.ids if i in failed]
+        if not bad:
+            logger.info("BISECT: ids=%s all fetched with category on retry", ",".join(map(str, job.ids)))
+            job.rows, job.ok = job.kept, True
+            return None
+        if len(bad) == len(job.ids):
+            logger.info("FALLBACK: every id fails alone; retrying WITHOUT category for ids=%s",
+                        ",".join(map(str, job.ids)))
+            job.kept, job.problem_ids = [], []
+            job.start_fallback()
+            return 0.0
+        logger.info("FALLBACK: retrying WITHOUT category for problem ids=%s (kept %d categorized rows)",
+                    ",".join(map(str, bad)), len(job.kept))
+        job.problem_ids = bad
+        job.start_fallback(bad)
+        return 0.0
+
+    status = _advance(job, limit=limit, before_iso=before_iso, sleep_ms=sleep_ms, limiter=limiter, breaker=breaker)
+    if status is None:
+        if job.mode == "fallback":
+            # Require lexicon words to filter, else fail-closed.
+            lex = matcher.get_matcher(os.getenv("LEXICON_PATH", "lexicon.yaml"), whole_word=False)
+            if not lex:
+                logger.warning("lexicon empty/missing; skipping fallback ingestion for ids=%s", ",".join(map(str, job.req_ids)))
+                job.rows, job.ok = job.kept, False
+                return None
+            filtered = [r for r in job.rows if lex.search(str(r.get("message", "")))]
+            logger.info("FALLBACK filtered %s/%s rows by lexicon", len(filtered), len(job.rows))
+            job.rows = job.kept + filtered
+        job.ok = True
+        return None
+
+    if status == "circuit_open":
+        # refused locally; not a real attempt
+        return breaker.retry_after() if breaker is not None else 1.0
+
+    serverish = job.include_category and status in SERVERISH
+    if job.attempt < len(retries_s) and not (serverish and job.solo_fallback):
+        delay = float(retries_s[job.attempt])
+        job.attempt += 1
+        _count("retries")
+        logger.info("paginate retry deferred %ss (ids=%s offset=%s status=%s attempt %d/%d)",
+                    delay, ",".join(map(str, job.req_ids)), job.offset, status, job.attempt, len(retries_s))
+        return delay
 
     # Category fallback for server-side issues (timeout/500/etc.)
-    serverish = last_status in {"500", "502", "503", "504", "timeout", "conn_err", "non_json", "empty"}
-    if use_cat and serverish:
-        logger.info("FALLBACK: retrying WITHOUT category for ids=%s", ",".join(str(x) for x in ids_chunk))
-        ok2, rows2, _ = _paginate(
-            ids_chunk=ids_chunk,
-            include_category=False,
-            limit=limit,
-            after_iso=after_iso,
-            before_iso=before_iso,
-            sleep_ms=sleep_ms,
-            retries_s=retries_s,
-        )
-        if ok2:
-            # Require lexicon words to filter, else fail-closed.
-            lex_words = _load_lexicon_words(os.getenv("LEXICON_PATH", "lexicon.yaml"))
-            if not lex_words:
-                logger.warning("lexicon empty/missing; skipping fallback ingestion for ids=%s", ",".join(map(str, ids_chunk)))
-                return []
-            filtered = [r for r in rows2 if _text_contains_any(str(r.get("message", "")), lex_words)]
-            logger.info("FALLBACK filtered %s/%s rows by lexicon", len(filtered), len(rows2))
-            return filtered
+    if serverish:
+        if len(job.ids) > 1 and _bisect_enabled():
+            logger.info("BISECT: splitting ids=%s to find the failing id(s)", ",".join(map(str, job.ids)))
+            job.mode = "bisect"
+            _count("bisects")
+            job.rows = []
+            return 0.0
+        logger.info("FALLBACK: retrying WITHOUT category for ids=%s", ",".join(str(x) for x in job.ids))
+        if len(job.ids) == 1:
+            job.problem_ids = list(job.ids)
+        job.start_fallback()
+        return 0.0
 
     # Otherwise return what we have (partial rows may be >0)
-    return rows
+    logger.warning("paginate giving up at offset=%s (soft errors)", job.offset)
+    if job.mode == "fallback":
+        job.rows = job.partial
+    job.ok = False
+    return None
+
+
+def _normalize_rows(raw_rows: List[Dict[str, Any]]) -> List[MessageRow]:
+    out, dropped = rows_mod.from_api_rows(raw_rows)
+    if dropped:
+        logger.warning("normalize: dropped %d row(s) without a usable steamid/timestamp", dropped)
+    return out
+
+
+class ChunkResult(NamedTuple):
+    """
+    One finished chunk: its position in the plan, the IDs asked for, its MessageRows,
+    whether the whole window was covered, the after= bound actually used, the IDs
+    that failed with category on their own (fetched uncategorized instead), and the
+    isolated problem IDs that fetched fine with category this time (cleared_ids).
+    """
+    index: int
+    ids: List[int]
+    rows: List[MessageRow]
+    ok: bool = True
+    after_iso: Optional[str] = None
+    pages: int = 0
+    problem_ids: Tuple[int, ...] = ()
+    cleared_ids: Tuple[int, ...] = ()
 
 
 # -------------------------
 # Public API
 # -------------------------
+def plan_chunks(steamids: Sequence[int], batch_size: int = DEFAULT_BATCH_SIZE,
+                isolate: Iterable[int] = ()) -> List[List[int]]:
+    """
+    Split IDs into request chunks exactly as the fetcher would (order preserved).
+    IDs in isolate (known problem IDs) get a chunk of their own, after the batched ones.
+    """
+    ids: List[int] = [int(x) for x in steamids if str(x).isdigit()]
+    solo = set(int(x) for x in isolate)
+    if not solo:
+        return list(_chunk(ids, batch_size))
+    chunks = list(_chunk([x for x in ids if x not in solo], batch_size))
+    chunks.extend([x] for x in ids if x in solo)
+    return chunks
+
+
+def iter_chunk_results(
+    *,
+    steamids: Sequence[int] = (),
+    after_iso: Optional[str],
+    before_iso: Optional[str],
+    category: Optional[str] = "total",
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    limit: int = DEFAULT_LIMIT,
+    sleep_ms: int = DEFAULT_SLEEP_MS,
+    retries_s: Optional[List[int]] = None,
+    workers: int = DEFAULT_WORKERS,
+    limiter: Optional[TokenBucket] = None,
+    after_for: Optional[Callable[[List[int]], Optional[str]]] = None,
+    chunks: Optional[List[List[int]]] = None,
+    breaker: Optional[CircuitBreaker] = None,
+    isolate: Iterable[int] = (),
+    paging: Optional[str] = None,
+) -> Iterator[ChunkResult]:
+    """
+    Yield a ChunkResult per chunk as soon as it finishes.
+
+    after_for(chunk_ids) may supply a per-chunk after= bound (e.g. the oldest per-player
+    watermark in the chunk); returning None falls back to after_iso. IDs are chunked in
+    the order given, so callers can sort by watermark to keep similar windows together.
+
+    Pass chunks= (e.g. from plan_chunks or a resumed journal) to fetch an exact plan instead;
+    ChunkResult.index is then the position within that list.
+
+    isolate lists known problem IDs (see ChunkResult.problem_ids): they are chunked alone and,
+    when their categorized request fails again, go straight to the uncategorized fallback
+    instead of waiting out the retry schedule. One that fetches fine is in cleared_ids.
+
+    paging: "cursor" (keyset on messagedate, default via SLURS_PAGING) or "offset".
+
+    Failed pages never block a worker: the chunk (with the pages it already has) goes onto a
+    deferred retry queue due after the next retries_s step, and healthy chunks keep flowing.
+    Bisect probes (see _step) go through the same queue, so isolating a bad ID never holds a
+    worker either. Due retries take at most half the in-flight slots. A shared CircuitBreaker
+    (default: breaker_for(API_MESSAGES)) stops requests during a burst of server errors and
+    probes before reopening; refusals are deferred without using up a retry.
+
+    At most 2*workers chunks are in flight; results arrive in completion order (use
+    ChunkResult.index to restore order), so memory is bounded by in-flight chunks.
+    """
+    if chunks is None:
+        if not steamids:
+            return
+        chunks = plan_chunks(steamids, batch_size, isolate)
+    if not chunks:
+        return
+
+    if retries_s is None:
+        retries_s = DEFAULT_RETRIES_S
+    workers = max(1, int(workers or 1))
+    if workers > 1 and limiter is None:
+        limiter = default_limiter()
+    if breaker is None:
+        breaker = breaker_for(API_MESSAGES)
+
+    def _after(chunk: List[int]) -> Optional[str]:
+        if after_for is None:
+            return after_iso
+        a = after_for(chunk)
+        return a if a is not None else after_iso
+
+    def _run(job: _ChunkJob) -> Optional[float]:
+        try:
+            delay = _step(job, limit=limit, before_iso=before_iso, sleep_ms=sleep_ms,
+                          retries_s=retries_s, limiter=limiter, breaker=breaker)
+        except Exception as e:
+            logger.warning("Chunk fetch failed for ids=%s: %s", ",".join(map(str, job.ids)), e)
+            job.ok = False
+            delay = None
+        if delay is None and job.root is None and not job.spawn:
+            job.rows = _normalize_rows(job.rows)
+            # Be gentle between chunks too (the limiter already paces every request)
+            if limiter is None and sleep_ms > 0:
+                time.sleep(float(sleep_ms) / 1000.0)
+        return delay
+
+    if workers > 1:
+        logger.info("concurrent fetch: %d chunks, workers=%d, budget=%.2f req/s (burst %d)",
+                    len(chunks), workers, limiter.rate, int(limiter.capacity))
+
+    solo = set(int(x) for x in isolate)
+    fresh = deque(_ChunkJob(i, list(c), None, bool(category), paging) for i, c in enumerate(chunks))
+    for job in fresh:
+        job.solo_fallback = len(job.ids) == 1 and job.ids[0] in solo
+    retry_heap: List[Tuple[float, int, _ChunkJob]] = []
+    max_in_flight = workers * 2
+    max_retry_slots = max(1, max_in_flight // 2)
+    deferred_total = 0
+    seq = 0
+
+    def _queue(job: _ChunkJob, delay: float) -> None:
+        nonlocal seq
+        seq += 1
+        heapq.heappush(retry_heap, (time.monotonic() + delay, seq, job))
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="slurs-fetch") as pool:
+        pending: Dict[Any, Tuple[_ChunkJob, bool]] = {}
+        while fresh or retry_heap or pending:
+            now = time.monotonic()
+            retry_slots = sum(1 for _, is_retry in pending.values() if is_retry)
+            # due retries first (they have waited already), but never more than half the slots
+            while (retry_heap and retry_heap[0][0] <= now and len(pending) < max_in_flight
+                   and retry_slots < max_retry_slots):
+                job = heapq.heappop(retry_heap)[2]
+                pending[pool.submit(_run, job)] = (job, True)
+                retry_slots += 1
+            while fresh and len(pending) < max_in_flight:
+                job = fresh.popleft()
+                job.after_iso = _after(job.ids)
+                pending[pool.submit(_run, job)] = (job, False)
+
+            if not pending:
+                # only deferred work left: sleep until the next one is due
+                time.sleep(max(0.0, retry_heap[0][0] - time.monotonic()))
+                continue
+
+            # a retry that was already due is only waiting for a slot: wake when a chunk finishes
+            timeout = None
+            if retry_heap and retry_heap[0][0] > now:
+                timeout = max(0.05, retry_heap[0][0] - time.monotonic())
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            for fut in done:
+                job, _ = pending.pop(fut)
+                delay = fut.result()
+                if job.spawn:
+                    # bisecting: the probes run like retries; the job waits for the last one
+                    for probe in job.spawn:
+                        _queue(probe, 0.0)
+                    job.spawn = []
+                elif delay is not None:
+                    deferred_total += 1
+                    _queue(job, delay)
+                elif job.root is not None:
+                    for nxt in _probe_finished(job):
+                        _queue(nxt, 0.0)
+                else:
+                    _count("chunks_ok" if job.ok else "chunks_failed")
+                    cleared = job.ids if job.solo_fallback and job.ok and job.mode == "paging" else ()
+                    yield ChunkResult(job.index, job.ids, job.rows, job.ok, job.after_iso, job.pages,
+                                      tuple(job.problem_ids), tuple(cleared))
+
+    if deferred_total:
+        logger.info("retry queue: %d deferrals; breaker=%s", deferred_total, breaker.state)
+
+
+def iter_messages_for_steamids(**kwargs: Any) -> Iterator[List[MessageRow]]:
+    """
+    Streaming variant of fetch_messages_for_steamids: yields one batch of MessageRows
+    per chunk as it arrives (empty chunks are skipped). Same arguments.
+    """
+    for res in iter_chunk_results(**kwargs):
+        if res.rows:
+            yield res.rows
+
+
 def fetch_messages_for_steamids(
     *,
     steamids: Sequence[int],
@@ -345,7 +896,9 @@ def fetch_messages_for_steamids(
     limit: int = DEFAULT_LIMIT,
     sleep_ms: int = DEFAULT_SLEEP_MS,
     retries_s: Optional[List[int]] = None,
-) -> List[Dict[str, Any]]:
+    workers: int = DEFAULT_WORKERS,
+    limiter: Optional[TokenBucket] = None,
+) -> List[MessageRow]:
     """
     Fetch slur-flagged messages for the given Steam64 IDs.
 
@@ -356,67 +909,34 @@ def fetch_messages_for_steamids(
       category: "total" to use server-side slur classification; or None to omit
       batch_size: max IDs per request (API tolerated up to ~10)
       limit: page size (default 100)
-      sleep_ms: delay between pages to be gentle
+      sleep_ms: delay between pages to be gentle (ignored when a limiter paces requests)
       retries_s: backoff schedule for soft failures
+      workers: chunks fetched concurrently (1 = sequential, legacy behaviour)
+      limiter: shared TokenBucket; defaults to the SLURS_RATE_* budget when workers > 1
 
     Returns:
-      List of normalized rows. Each row contains at least:
-        - message/message text in 'message' and 'text'
-        - 'logid' (stringified)
-        - 'msg_time_iso' (ISO8601)
-        - 'steamid' (original from API) and 'steamid64' when derivable
-    """
-    if not steamids:
-        return []
-
-    if retries_s is None:
-        retries_s = DEFAULT_RETRIES_S
-
-    # Ensure ints
-    ids: List[int] = [int(x) for x in steamids if str(x).isdigit()]
-
-    all_rows: List[Dict[str, Any]] = []
-
-    for chunk in _chunk(ids, batch_size):
-        try:
-            raw_rows = _fetch_chunk(
-                chunk,
-                category=category,
-                limit=limit,
-                after_iso=after_iso,
-                before_iso=before_iso,
-                sleep_ms=sleep_ms,
-                retries_s=retries_s,
-            )
-        except Exception as e:
-            logger.warning("Chunk fetch failed for ids=%s: %s", ",".join(map(str, chunk)), e)
-            raw_rows = []
-
-        # Normalize each row and add convenience fields
-        for r in raw_rows:
-            # slurs.tf "data" rows typically look like:
-            # { "steamid":"[U:1:33844719]", "message":"...", "messagedate":"2025-09-17T12:35:34.000Z", "logid":"3934184", "logdate":"2025-09-17T12:35:34.000Z" }
-            # We keep compatibility for db.upsert_messages (text/message; msg_time_iso/logdate/messagedate; steamid/steamid64).
-            # Standardize an ISO field so the DB layer doesn't guess.
-            if "msg_time_iso" not in r:
-                if r.get("logdate"):
-                    r["msg_time_iso"] = str(r["logdate"])
-                elif r.get("messagedate"):
-                    r["msg_time_iso"] = str(r["messagedate"])
-            if r.get("message") is not None and r.get("text") is None:
-                r["text"] = r["message"]
-
-            # add steamid64 when possible (helps DB layer and joins)
-            sid_any = r.get("steamid64") or r.get("steamid")
-            if sid_any is not None and not str(sid_any).isdigit():
-                sid64 = _steam3_to_steam64(str(sid_any))
-                if sid64 is not None:
-                    r["steamid64"] = str(sid64)
-
-            all_rows.append(_normalize_row(r))
-
-        # Be gentle between chunks too
-        if sleep_ms > 0:
-            time.sleep(float(sleep_ms) / 1000.0)
+      List of rows.MessageRow, in chunk order regardless of worker count:
+        steamid64 (int), logid (int|None), msg_time_utc (naive UTC), msg_time_iso (API string), text.
+      Rows without a usable steamid or timestamp are dropped (and logged).
 
+    Holds every row in memory; prefer iter_messages_for_steamids for large windows.
+    """
+    by_idx: Dict[int, List[MessageRow]] = {}
+    for res in iter_chunk_results(
+        steamids=steamids,
+        after_iso=after_iso,
+        before_iso=before_iso,
+        category=category,
+        batch_size=batch_size,
+        limit=limit,
+        sleep_ms=sleep_ms,
+        retries_s=retries_s,
+        workers=workers,
+        limiter=limiter,
+    ):
+        by_idx[res.index] = res.rows
+
+    all_rows: List[MessageRow] = []
+    for idx in sorted(by_idx):
+        all_rows.extend(by_idx[idx])
     return all_rows
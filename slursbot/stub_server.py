@@ -0,0 +1,303 @@
+# stub_server.py — local stand-in for slurs.tf /api/messages (benchmarks and offline runs)
+#   python stub_server.py --port 8765 --players 20 --messages 500 --latency-ms 80 --error-rate 0.02
+#   SLURS_API_BASE=http://127.0.0.1:8765 python main.py pull ...
+# Serves deterministic synthetic chat, newest first (messagedate desc, then logid desc), honouring
+# steamid (repeated), category, after (inclusive), before (exclusive), limit and offset.
+# Knobs:
+# - volume      : --players, --messages (per player), --flagged (share returned with category)
+# - latency     : --latency-ms + uniform --jitter-ms per response; --offset-cost-us per skipped row
+# - errors      : --error-rate (HTTP 500), --timeout-rate (hang --hang-s), --non-json-rate (HTML 200),
+#                 --bad-ids N (first N players always 500 when category is set)
+# - rate limit  : --rate-limit N per --rate-window-s, excess gets 429 + Retry-After
+# - churn       : --insert-every N adds one new message per player every N requests
+from __future__ import annotations
+
+import sys
+import json
+import time
+import random
+import bisect
+import argparse
+import threading
+import urllib.parse
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+STEAM64_BASE = 76561197960265728
+FIRST_SID = 76561198000000000
+
+
+@dataclass
+class StubConfig:
+    players: int = 10
+    messages: int = 200            # per player
+    flagged: float = 0.25          # share of messages category=total returns
+    seed: int = 1
+    offset_cost_us: float = 0.0    # server time per skipped row (deep offsets get slower)
+    insert_every: int = 0          # add a new message per player every N requests (0 = never)
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0        # HTTP 500
+    timeout_rate: float = 0.0      # hang for hang_s, then answer (client should have given up)
+    non_json_rate: float = 0.0     # 200 with an HTML body
+    hang_s: float = 5.0
+    bad_ids: int = 0               # first N players: category=total always 500s
+    rate_limit: int = 0            # requests per rate_window_s (0 = unlimited)
+    rate_window_s: float = 1.0
+
+
+def _iso(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.") + f"{dt.microsecond // 1000:03d}Z"
+
+
+def _parse(s: str) -> Optional[datetime]:
+    try:
+        dt = datetime.fromisoformat(s.strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+class MessageStore:
+    """Per-player rows kept sorted oldest-first by (messagedate, logid) for bisecting windows."""
+
+    _WORDS = ("gg", "wp", "medic", "uber", "push", "mid", "last", "heal", "lol", "ez", "hold", "drop")
+
+    def __init__(self, cfg: StubConfig):
+        self.cfg = cfg
+        self.rnd = random.Random(cfg.seed)
+        self.lock = threading.Lock()
+        self.next_logid = 1_000_000
+        self.keys: Dict[int, List[Tuple[datetime, int]]] = {}
+        self.rows: Dict[int, List[Dict]] = {}
+        self.flags: Dict[int, List[bool]] = {}
+        self.now = datetime(2025, 9, 1, tzinfo=timezone.utc)
+        for i in range(cfg.players):
+            sid = FIRST_SID + i
+            t = self.now
+            stamps = []
+            for _ in range(cfg.messages):
+                t -= timedelta(seconds=self.rnd.choice((0, 0, 1, 2, 3, 30, 600)))  # whole seconds: ties happen
+                stamps.append(t)
+            for ts in reversed(stamps):
+                self._append(sid, ts)
+
+    def steamids(self) -> List[int]:
+        return sorted(self.rows)
+
+    def _append(self, sid: int, ts: datetime) -> None:
+        self.next_logid += 1
+        row = {
+            "steamid": f"[U:1:{sid - STEAM64_BASE}]",
+            "message": " ".join(self.rnd.choice(self._WORDS) for _ in range(self.rnd.randint(2, 8))),
+            "messagedate": _iso(ts),
+            "logdate": _iso(ts),
+            "logid": str(self.next_logid),
+        }
+        self.keys.setdefault(sid, []).append((ts, self.next_logid))
+        self.rows.setdefault(sid, []).append(row)
+        self.flags.setdefault(sid, []).append(self.rnd.random() < self.cfg.flagged)
+
+    def add_new_messages(self) -> None:
+        with self.lock:
+            self.now += timedelta(seconds=1)
+            for sid in list(self.rows):
+                self._append(sid, self.now)
+
+    def query(self, sids: Sequence[int], category: bool, after: Optional[datetime],
+              before: Optional[datetime], limit: int, offset: int) -> List[Dict]:
+        picked: List[Tuple[datetime, int, Dict]] = []
+        with self.lock:
+            for sid in sids:
+                keys = self.keys.get(sid)
+                if not keys:
+                    continue
+                lo = bisect.bisect_left(keys, (after, -1)) if after else 0
+                hi = bisect.bisect_left(keys, (before, -1)) if before else len(keys)
+                rows, flags = self.rows[sid], self.flags[sid]
+                for j in range(lo, hi):
+                    if category and not flags[j]:
+                        continue
+                    picked.append((keys[j][0], keys[j][1], rows[j]))
+        picked.sort(key=lambda x: (x[0], x[1]), reverse=True)
+        return [r for _, _, r in picked[offset:offset + limit]]
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr, cfg: StubConfig):
+        super().__init__(addr, _Handler)
+        self.cfg = cfg
+        self.store = MessageStore(cfg)
+        self.stats_lock = threading.Lock()
+        self.requests = 0
+        self.responses: Dict[str, int] = {}
+        self.rnd = random.Random(cfg.seed + 1)
+        self.window_start = time.monotonic()
+        self.window_count = 0
+        self.bad = set(self.store.steamids()[: cfg.bad_ids])
+
+    def count(self, key: str) -> None:
+        with self.stats_lock:
+            self.responses[key] = self.responses.get(key, 0) + 1
+
+    def _admit(self) -> Optional[float]:
+        """Fixed-window rate limit: None if admitted, else seconds until the window resets."""
+        if not self.cfg.rate_limit:
+            return None
+        with self.stats_lock:
+            now = time.monotonic()
+            if now - self.window_start >= self.cfg.rate_window_s:
+                self.window_start, self.window_count = now, 0
+            if self.window_count >= self.cfg.rate_limit:
+                return self.cfg.rate_window_s - (now - self.window_start)
+            self.window_count += 1
+            return None
+
+    def _fault(self) -> Optional[str]:
+        with self.stats_lock:
+            x = self.rnd.random()
+        c = self.cfg
+        for kind, rate in (("500", c.error_rate), ("timeout", c.timeout_rate), ("non_json", c.non_json_rate)):
+            if x < rate:
+                return kind
+            x -= rate
+        return None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: StubServer
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real site
+
+    def log_message(self, fmt, *args):  # quiet
+        pass
+
+    def _send(self, code: int, body: bytes, ctype: str = "application/json",
+              headers: Optional[Dict[str, str]] = None) -> None:
+        self.server.count(str(code) if code != 200 or ctype == "application/json" else "non_json")
+        try:
+            self.send_response(code)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client gave up (timeout)
+
+    def do_GET(self):
+        u = urllib.parse.urlsplit(self.path)
+        if u.path != "/api/messages":
+            self._send(404, b'{"success":false}')
+            return
+        srv = self.server
+        with srv.stats_lock:
+            srv.requests += 1
+            n = srv.requests
+        if srv.cfg.insert_every and n % srv.cfg.insert_every == 0:
+            srv.store.add_new_messages()
+
+        wait_s = srv._admit()
+        if wait_s is not None:
+            self._send(429, b'{"success":false,"error":"rate limited"}',
+                       headers={"Retry-After": str(max(1, int(wait_s + 0.999)))})
+            return
+        cfg = srv.cfg
+        if cfg.latency_ms or cfg.jitter_ms:
+            with srv.stats_lock:
+                jitter = srv.rnd.uniform(0, cfg.jitter_ms)
+            time.sleep((cfg.latency_ms + jitter) / 1000.0)
+        fault = srv._fault()
+        if fault == "500":
+            self._send(500, b'{"success":false,"error":"internal"}')
+            return
+        if fault == "timeout":
+            time.sleep(cfg.hang_s)
+            self._send(504, b'{"success":false,"error":"gateway timeout"}')
+            return
+        if fault == "non_json":
+            self._send(200, b"<html><body>Just a moment...</body></html>", ctype="text/html")
+            return
+
+        q = urllib.parse.parse_qs(u.query)
+        try:
+            sids = [int(x) for x in q.get("steamid", [])]
+            limit = max(1, min(int(q.get("limit", ["100"])[0]), 1000))
+            offset = max(0, int(q.get("offset", ["0"])[0]))
+        except ValueError:
+            self._send(400, b'{"success":false,"error":"bad params"}')
+            return
+        after = _parse(q["after"][0]) if "after" in q else None
+        before = _parse(q["before"][0]) if "before" in q else None
+        if ("after" in q and after is None) or ("before" in q and before is None):
+            self._send(400, b'{"success":false,"error":"bad date"}')
+            return
+
+        if "category" in q and srv.bad.intersection(sids):
+            self._send(500, b'{"success":false,"error":"category query failed"}')
+            return
+        if srv.cfg.offset_cost_us and offset:
+            time.sleep(offset * srv.cfg.offset_cost_us / 1e6)
+        data = srv.store.query(sids, "category" in q, after, before, limit, offset)
+        self._send(200, json.dumps({"success": True, "data": data}).encode("utf-8"))
+
+
+def serve(cfg: Optional[StubConfig] = None, host: str = "127.0.0.1", port: int = 0) -> StubServer:
+    """Start a stub in a background thread (port 0 = pick a free one); call .shutdown() when done."""
+    srv = StubServer((host, port), cfg or StubConfig())
+    threading.Thread(target=srv.serve_forever, name="slurs-stub", daemon=True).start()
+    return srv
+
+
+def add_fault_args(p: argparse.ArgumentParser) -> None:
+    """Latency / error / rate-limit flags shared by this CLI and bench.py ingest."""
+    p.add_argument("--latency-ms", type=float, default=0.0)
+    p.add_argument("--jitter-ms", type=float, default=0.0)
+    p.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered 500")
+    p.add_argument("--timeout-rate", type=float, default=0.0, help="Share of requests that hang --hang-s")
+    p.add_argument("--non-json-rate", type=float, default=0.0, help="Share of requests answered with HTML")
+    p.add_argument("--hang-s", type=float, default=5.0)
+    p.add_argument("--bad-ids", type=int, default=0, help="First N players always 500 with category")
+    p.add_argument("--rate-limit", type=int, default=0, help="Requests per --rate-window-s (0 = off)")
+    p.add_argument("--rate-window-s", type=float, default=1.0)
+
+
+def fault_kwargs(a: argparse.Namespace) -> Dict[str, float]:
+    return {k: getattr(a, k) for k in ("latency_ms", "jitter_ms", "error_rate", "timeout_rate", "non_json_rate",
+                                       "hang_s", "bad_ids", "rate_limit", "rate_window_s")}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(prog="stub_server", description="Local slurs.tf /api/messages stub")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--players", type=int, default=10)
+    p.add_argument("--messages", type=int, default=200, help="Messages per player")
+    p.add_argument("--flagged", type=float, default=0.25)
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--offset-cost-us", type=float, default=0.0)
+    p.add_argument("--insert-every", type=int, default=0)
+    add_fault_args(p)
+    a = p.parse_args(sys.argv[1:] if argv is None else argv)
+    cfg = StubConfig(players=a.players, messages=a.messages, flagged=a.flagged, seed=a.seed,
+                     offset_cost_us=a.offset_cost_us, insert_every=a.insert_every, **fault_kwargs(a))
+    srv = StubServer((a.host, a.port), cfg)
+    print(f"stub serving {cfg.players} players x {cfg.messages} messages at {srv.base_url}/api/messages")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())